@@ -1,11 +1,20 @@
+import hashlib
 import json
 import math
+import multiprocessing
 import os
 import random
 import sys
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any
+import uuid
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar, copy_context
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterator
 
 os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
 os.environ.setdefault("OMP_NUM_THREADS", "1")
@@ -20,14 +29,36 @@ from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.stattools import adfuller, kpss
 import tensorflow as tf
 
-
-ARIMA_CANDIDATE_ORDERS: list[tuple[int, int, int]] = [
-    (1, 1, 1),
-    (2, 1, 1),
-    (1, 1, 2),
-    (2, 1, 2),
-    (0, 1, 1),
-]
+SEED = 42
+
+
+def parse_arima_order_grid(spec: str, default: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    # "p=0-3,d=0-1,q=0-3": each of p, d and q is a value or an inclusive range. Anything else keeps default.
+    bounds: dict[str, range] = {}
+    for part in spec.replace(" ", "").lower().split(","):
+        key, _, value = part.partition("=")
+        low, _, high = value.partition("-")
+        if key not in ("p", "d", "q") or not low.isdigit() or not (high or low).isdigit():
+            return default
+        bounds[key] = range(int(low), int(high or low) + 1)
+    if len(bounds) != 3:
+        return default
+    orders = [(p, d, q) for p in bounds["p"] for d in bounds["d"] for q in bounds["q"]]
+    return orders or default
+
+
+# Orders searched by the refit ARIMA; ARIMA_SCREEN_TOP_K > 0 fully fits only the k best by approximate AIC.
+ARIMA_CANDIDATE_ORDERS: list[tuple[int, int, int]] = parse_arima_order_grid(
+    os.environ.get("ARIMA_ORDER_GRID", ""),
+    [
+        (1, 1, 1),
+        (2, 1, 1),
+        (1, 1, 2),
+        (2, 1, 2),
+        (0, 1, 1),
+    ],
+)
+ARIMA_SCREEN_TOP_K = max(0, int(os.environ.get("ARIMA_SCREEN_TOP_K", "0")))
 _default_arima_workers = max(1, min(3, len(ARIMA_CANDIDATE_ORDERS), int(os.cpu_count() or 1)))
 ARIMA_ORDER_WORKERS = max(
     1,
@@ -38,8 +69,332 @@ ARIMA_ORDER_WORKERS = max(
 )
 ARIMA_EXECUTOR = ThreadPoolExecutor(max_workers=ARIMA_ORDER_WORKERS) if ARIMA_ORDER_WORKERS > 1 else None
 
+# "refit" refits every block; "incremental" filters new bars through one fit (params.arima_update).
+ARIMA_UPDATE_MODES = ("refit", "incremental")
+ARIMA_UPDATE_MODE = os.environ.get("ARIMA_UPDATE_MODE", "refit").strip().lower()
+ARIMA_REFIT_EVERY = max(1, int(os.environ.get("ARIMA_REFIT_EVERY", "10")))
+ARIMA_REFIT_ERROR_RATIO = float(os.environ.get("ARIMA_REFIT_ERROR_RATIO", "3.0"))
+
+# "batched" advances all test blocks in one predict call per step; "sequential" predicts one window per call.
+LSTM_ROLLOUT_MODE = os.environ.get("LSTM_ROLLOUT_MODE", "batched").strip().lower()
+# "numpy" runs the rollout on weights extracted from Keras, "keras" calls model.predict (params.inference_engine).
+LSTM_INFERENCE_ENGINES = ("numpy", "keras")
+LSTM_INFERENCE_ENGINE = os.environ.get("LSTM_INFERENCE_ENGINE", "numpy").strip().lower()
+LSTM_NUMPY_TOLERANCE = float(os.environ.get("LSTM_NUMPY_TOLERANCE", "1e-4"))
+# NumPy drift past the tolerance falls back to Keras (reported as progress), or raises when strict.
+LSTM_NUMPY_STRICT = os.environ.get("LSTM_NUMPY_STRICT", "0").strip().lower() in ("1", "true", "yes")
+
+# Trained LSTM models keyed by training-slice fingerprint + hyperparameters (0 disables).
+LSTM_MODEL_CACHE_SIZE = max(0, int(os.environ.get("LSTM_MODEL_CACHE_SIZE", "16")))
+_lstm_model_cache: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_lstm_model_cache_lock = threading.Lock()
+# Keys being trained right now; a request missing on one of them waits for that training.
+_lstm_model_training: dict[str, threading.Event] = {}
+_lstm_model_cache_totals = {"hits": 0, "misses": 0, "evictions": 0}
+_lstm_cache_request_stats: ContextVar[dict[str, int] | None] = ContextVar("lstm_cache_request_stats", default=None)
+
+# Optional observer for long runs (job API): receives {"stage", "message", ...} dicts.
+_progress_callback: ContextVar[Callable[[dict[str, Any]], None] | None] = ContextVar("progress_callback", default=None)
+# Optional observer for stage latencies (service metrics): (stage, seconds), not seen from pool children.
+_stage_observer: ContextVar[Callable[[str, float], None] | None] = ContextVar("stage_observer", default=None)
+# Walk-forward folds are timed as a whole; the model stages inside them are not reported again.
+WALK_FORWARD_FOLD_STAGES = ("walk_forward_fold", "walk_forward_lstm_fold")
+_walk_forward_fold_active: ContextVar[bool] = ContextVar("walk_forward_fold_active", default=False)
+# Optional observer for time spent waiting on shared resources (service metrics): called with (resource, seconds).
+_wait_observer: ContextVar[Callable[[str, float], None] | None] = ContextVar("wait_observer", default=None)
+
+# TensorFlow work enters one section at a time per process; statistics run outside it.
+_tf_section_lock = threading.Lock()
+_tf_section_active: ContextVar[bool] = ContextVar("tf_section_active", default=False)
+
+# Spawned processes for walk-forward statistics, created on first use and reused (1 = in-process).
+ML_PROCESS_WORKERS = max(1, int(os.environ.get("ML_PROCESS_WORKERS", "1")))
+_process_pool: ProcessPoolExecutor | None = None
+_process_pool_lock = threading.Lock()
+_in_pool_process = False
+
+# Threads shared by all requests that run ready analyze() stages concurrently; 1 runs them in order.
+STAGE_RESOURCES = ("tf", "process_pool", "thread")
+ANALYSIS_STAGE_THREADS = max(1, int(os.environ.get("ANALYSIS_STAGE_THREADS", "4")))
+_stage_executor = (
+    ThreadPoolExecutor(max_workers=ANALYSIS_STAGE_THREADS, thread_name_prefix="ml-stage")
+    if ANALYSIS_STAGE_THREADS > 1
+    else None
+)
+
+# Accuracy/latency trade-off per request (params.tier); models a tier skips get a zero hybrid weight.
+ANALYSIS_TIERS: dict[str, dict[str, Any]] = {
+    "fast": {
+        "lstm": False,
+        "lstm_folds": False,
+        "max_origins": 8,
+        "fixed_arima_folds": True,
+        "arima_update": "incremental",
+        "stationarity_lag": "capped",
+    },
+    "balanced": {
+        "lstm": True,
+        "lstm_folds": False,
+        "max_origins": 16,
+        "fixed_arima_folds": False,
+        "arima_update": None,
+        "stationarity_lag": None,
+    },
+    "full": {
+        "lstm": True,
+        "lstm_folds": True,
+        "max_origins": 16,
+        "fixed_arima_folds": False,
+        "arima_update": None,
+        "stationarity_lag": None,
+    },
+}
+ANALYSIS_TIER = os.environ.get("ANALYSIS_TIER", "full").strip().lower()
+
+# ADF/KPSS lags: "auto" (AIC search), "capped" (up to STATIONARITY_MAX_LAG) or "fixed" (exactly it).
+STATIONARITY_LAG_MODES = ("auto", "capped", "fixed")
+STATIONARITY_LAG_MODE = os.environ.get("STATIONARITY_LAG_MODE", "auto").strip().lower()
+STATIONARITY_MAX_LAG = max(0, int(os.environ.get("STATIONARITY_MAX_LAG", "12")))
+STATIONARITY_WINDOW = max(0, int(os.environ.get("STATIONARITY_WINDOW", "0")))
+STATIONARITY_MIN_WINDOW = 50
+STATIONARITY_CACHE_SIZE = max(0, int(os.environ.get("STATIONARITY_CACHE_SIZE", "64")))
+_stationarity_cache: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_stationarity_cache_lock = threading.Lock()
+
+# "adaptive" scores the newest origins first and stops once the fold weights settle (params.walk_forward).
+WALK_FORWARD_MODES = ("all", "adaptive")
+WALK_FORWARD_MODE = os.environ.get("WALK_FORWARD_MODE", "all").strip().lower()
+WALK_FORWARD_TOLERANCE = float(os.environ.get("WALK_FORWARD_TOLERANCE", "0.1"))
+WALK_FORWARD_MIN_ORIGINS = max(2, int(os.environ.get("WALK_FORWARD_MIN_ORIGINS", "4")))
+WALK_FORWARD_TIME_BUDGET_S = max(0.0, float(os.environ.get("WALK_FORWARD_TIME_BUDGET_S", "0")))
+
+# "fresh" trains the last 4 LSTM folds from scratch; "warm" chains every fold (params.walk_forward_lstm).
+WALK_FORWARD_LSTM_MODES = ("fresh", "warm")
+WALK_FORWARD_LSTM = os.environ.get("WALK_FORWARD_LSTM", "fresh").strip().lower()
+LSTM_WARM_START_EPOCHS = max(1, int(os.environ.get("LSTM_WARM_START_EPOCHS", "1")))
+
+# Recent analysis states for update_analysis(), by analysis_id prefixed with the owner's pid (0 disables).
+ANALYSIS_STATE_CACHE_SIZE = max(0, int(os.environ.get("ANALYSIS_STATE_CACHE_SIZE", "8")))
+LSTM_FINETUNE_EPOCHS = max(1, int(os.environ.get("LSTM_FINETUNE_EPOCHS", "2")))
+_analysis_states: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+_analysis_states_lock = threading.Lock()
+_analysis_recorder: ContextVar[dict[str, Any] | None] = ContextVar("analysis_recorder", default=None)
+
+
+class AnalysisNotFoundError(LookupError):
+    pass
+
+
+@contextmanager
+def progress_scope(callback: Callable[[dict[str, Any]], None] | None) -> Iterator[None]:
+    token = _progress_callback.set(callback)
+    try:
+        yield
+    finally:
+        _progress_callback.reset(token)
+
+
+def report_progress(stage: str, message: str, **info: Any) -> None:
+    callback = _progress_callback.get()
+    if callback is None:
+        return
+    try:
+        callback({"stage": stage, "message": message, **info})
+    except Exception:
+        pass
+
+
+@contextmanager
+def stage_observer_scope(observer: Callable[[str, float], None] | None) -> Iterator[None]:
+    token = _stage_observer.set(observer)
+    try:
+        yield
+    finally:
+        _stage_observer.reset(token)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    if _walk_forward_fold_active.get():
+        yield
+        return
+    fold_token = _walk_forward_fold_active.set(True) if stage in WALK_FORWARD_FOLD_STAGES else None
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if fold_token is not None:
+            _walk_forward_fold_active.reset(fold_token)
+        observer = _stage_observer.get()
+        if observer is not None:
+            try:
+                observer(stage, time.perf_counter() - start)
+            except Exception:
+                pass
+
+
+@contextmanager
+def wait_observer_scope(observer: Callable[[str, float], None] | None) -> Iterator[None]:
+    token = _wait_observer.set(observer)
+    try:
+        yield
+    finally:
+        _wait_observer.reset(token)
+
+
+def observe_wait(resource: str, seconds: float) -> None:
+    observer = _wait_observer.get()
+    if observer is None:
+        return
+    try:
+        observer(resource, seconds)
+    except Exception:
+        pass
+
+
+@contextmanager
+def tf_section(needed: bool = True) -> Iterator[None]:
+    # Reentrant: a nested section neither waits nor reseeds; needed=False skips the lock.
+    if not needed or _tf_section_active.get():
+        yield
+        return
+    start = time.perf_counter()
+    with _tf_section_lock:
+        observe_wait("tf", time.perf_counter() - start)
+        token = _tf_section_active.set(True)
+        try:
+            reset_seeds()
+            yield
+        finally:
+            _tf_section_active.reset(token)
+
+
+def run_stage_graph(stages: list[dict[str, Any]]) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    # stages: {"name", "resource", "after", "run"} in a sequentially valid order -> (results, timeline).
+    origin = time.perf_counter()
+    results: dict[str, Any] = {}
+    timeline: list[dict[str, Any]] = []
+
+    def execute(stage: dict[str, Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            if stage["resource"] == "tf":
+                with tf_section():
+                    return stage["run"](results)
+            return stage["run"](results)
+        finally:
+            timeline.append(
+                {
+                    "stage": stage["name"],
+                    "resource": stage["resource"],
+                    "start_s": round(start - origin, 4),
+                    "end_s": round(time.perf_counter() - origin, 4),
+                }
+            )
+
+    if _stage_executor is None:
+        for stage in stages:
+            results[stage["name"]] = execute(stage)
+    else:
+        pending = list(stages)
+        running: dict[Any, dict[str, Any]] = {}
+        try:
+            while pending or running:
+                for stage in [stage for stage in pending if all(name in results for name in stage["after"])]:
+                    pending.remove(stage)
+                    # Each stage sees the caller's progress/observer/recorder context.
+                    running[_stage_executor.submit(copy_context().run, execute, stage)] = stage
+                if not running:
+                    raise RuntimeError(f"Неразрешимые зависимости этапов: {[stage['name'] for stage in pending]}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)["name"]] = future.result()
+        finally:
+            # A failed stage does not leave the others running behind the caller's back.
+            for future in running:
+                future.cancel()
+            wait(running)
+    return results, sorted(timeline, key=lambda item: item["start_s"])
+
+
+@contextmanager
+def analysis_state_scope() -> Iterator[dict[str, Any]]:
+    recorded: dict[str, Any] = {}
+    token = _analysis_recorder.set(recorded)
+    try:
+        yield recorded
+    finally:
+        _analysis_recorder.reset(token)
+
+
+def record_analysis_state(**items: Any) -> None:
+    recorded = _analysis_recorder.get()
+    if recorded is not None:
+        recorded.update(items)
+
+
+def _mark_pool_process() -> None:
+    global _in_pool_process
+    _in_pool_process = True
+
+
+def get_process_pool() -> ProcessPoolExecutor | None:
+    global _process_pool
+    # Tasks already running in a pool process do their work inline instead of nesting pools.
+    if ML_PROCESS_WORKERS <= 1 or _in_pool_process:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=ML_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_mark_pool_process,
+            )
+        return _process_pool
+
+
+def reset_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        pool = _process_pool
+        _process_pool = None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def shared_float_array(values: np.ndarray) -> Iterator[tuple[str, int]]:
+    data = np.ascontiguousarray(values, dtype=np.float64).reshape(-1)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        yield shm.name, int(len(data))
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def read_shared_float_array(handle: tuple[str, int], stop: int | None = None) -> np.ndarray:
+    name, length = handle
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        view = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        out = np.array(view[: length if stop is None else stop], dtype=np.float64)
+        del view
+        return out
+    finally:
+        shm.close()
+
+
+def to_float_array(values: Any) -> np.ndarray:
+    # Drops non-numeric and non-finite entries; arrays and clean lists convert in one vectorized pass.
+    try:
+        array = np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        array = None
+    if array is not None and array.ndim == 1:
+        return array[np.isfinite(array)]
 
-def to_float_list(values: list[Any]) -> list[float]:
     out: list[float] = []
     for value in values:
         try:
@@ -48,7 +403,7 @@ def to_float_list(values: list[Any]) -> list[float]:
                 out.append(n)
         except Exception:
             continue
-    return out
+    return np.array(out, dtype=float)
 
 
 def moving_confidence_bounds(values: np.ndarray, std: float) -> tuple[list[float], list[float]]:
@@ -69,6 +424,11 @@ def sanitize_number(value: float) -> float:
     return float(value)
 
 
+def sanitize_list(values: np.ndarray | list[float]) -> list[float]:
+    array = np.asarray(values, dtype=float)
+    return np.where(np.isfinite(array), array, 0.0).tolist()
+
+
 def build_windows(series_scaled: np.ndarray, look_back: int):
     x = []
     y = []
@@ -125,6 +485,7 @@ def estimate_step_limit(history: list[float], window: int = 30) -> float:
     return max(1.0, 3.0 * std, abs(recent_mean) * 2.0)
 
 
+@timed_stage("baselines")
 def run_trend_baseline(
     train: np.ndarray,
     test: np.ndarray,
@@ -199,6 +560,7 @@ def project_recent_returns(history: list[float], steps: int) -> list[float]:
     return output
 
 
+@timed_stage("baselines")
 def run_returns_baseline(
     train: np.ndarray,
     test: np.ndarray,
@@ -240,91 +602,409 @@ def run_returns_baseline(
     return np.array(pred_test, dtype=float), np.array(pred_future, dtype=float), elapsed
 
 
-def run_lstm(
+def keras_step_predictor(model) -> Callable[[np.ndarray], np.ndarray]:
+    def predict(windows: np.ndarray) -> np.ndarray:
+        x_input = windows.reshape(len(windows), -1, 1)
+        return np.array(model.predict(x_input, batch_size=len(windows), verbose=0), dtype=float).reshape(-1)
+
+    return predict
+
+
+def resolve_lstm_engine(engine: str | None = None) -> str:
+    name = str(engine or LSTM_INFERENCE_ENGINE).strip().lower()
+    return name if name in LSTM_INFERENCE_ENGINES else "keras"
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 0.5 * (np.tanh(0.5 * x) + 1.0)
+
+
+def numpy_step_predictor(model) -> Callable[[np.ndarray], np.ndarray]:
+    lstm_layers: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    dense_kernel = None
+    dense_bias = None
+    for layer in model.layers:
+        if isinstance(layer, tf.keras.layers.LSTM):
+            kernel, recurrent_kernel, bias = layer.get_weights()
+            lstm_layers.append(
+                (
+                    np.asarray(kernel, dtype=np.float64),
+                    np.asarray(recurrent_kernel, dtype=np.float64),
+                    np.asarray(bias, dtype=np.float64),
+                )
+            )
+        elif isinstance(layer, tf.keras.layers.Dense):
+            kernel, bias = layer.get_weights()
+            dense_kernel = np.asarray(kernel, dtype=np.float64)
+            dense_bias = np.asarray(bias, dtype=np.float64)
+
+    if not lstm_layers or dense_kernel is None or dense_bias is None:
+        raise ValueError("Unsupported LSTM architecture for numpy inference")
+
+    def predict(windows: np.ndarray) -> np.ndarray:
+        sequence = np.asarray(windows, dtype=np.float64).reshape(len(windows), -1, 1)
+        batch, steps, _ = sequence.shape
+        for kernel, recurrent_kernel, bias in lstm_layers:
+            units = recurrent_kernel.shape[0]
+            # Input projections for all timesteps at once; only the recurrence stays in the loop.
+            projected = sequence @ kernel + bias
+            h = np.zeros((batch, units), dtype=np.float64)
+            c = np.zeros((batch, units), dtype=np.float64)
+            outputs = np.empty((batch, steps, units), dtype=np.float64)
+            for t in range(steps):
+                z = projected[:, t, :] + h @ recurrent_kernel
+                i = _sigmoid(z[:, :units])
+                f = _sigmoid(z[:, units : 2 * units])
+                g = np.tanh(z[:, 2 * units : 3 * units])
+                o = _sigmoid(z[:, 3 * units :])
+                c = f * c + i * g
+                h = o * np.tanh(c)
+                outputs[:, t, :] = h
+            sequence = outputs
+        return (sequence[:, -1, :] @ dense_kernel + dense_bias).reshape(-1)
+
+    return predict
+
+
+def build_step_predictor(model, engine: str, check_windows: np.ndarray) -> Callable[[np.ndarray], np.ndarray]:
+    keras_predict = keras_step_predictor(model)
+    if engine != "numpy":
+        return keras_predict
+
+    try:
+        numpy_predict = numpy_step_predictor(model)
+        sample = np.asarray(check_windows, dtype=float)
+        drift = float(np.max(np.abs(numpy_predict(sample) - keras_predict(sample)))) if len(sample) > 0 else 0.0
+        reason = None if math.isfinite(drift) and drift <= LSTM_NUMPY_TOLERANCE else f"drift {drift:.3g}"
+    except Exception as exc:
+        reason = f"{type(exc).__name__}: {exc}"
+    if reason is None:
+        return numpy_predict
+    if LSTM_NUMPY_STRICT:
+        raise RuntimeError(f"NumPy-инференс LSTM расходится с Keras ({reason})")
+    report_progress("lstm_engine", f"NumPy inference rejected ({reason}), using Keras", engine="keras", reason=reason)
+    return keras_predict
+
+
+def lstm_cache_key(
     train: np.ndarray,
-    test: np.ndarray,
-    full: np.ndarray,
     look_back: int,
     units1: int,
     units2: int,
     epochs: int,
     batch_size: int,
-    horizon: int,
-    block_size: int,
-) -> tuple[np.ndarray, np.ndarray, float]:
-    start = time.time()
+) -> str:
+    digest = hashlib.blake2b(np.ascontiguousarray(train, dtype=np.float64).tobytes(), digest_size=16)
+    digest.update(json.dumps([int(look_back), int(units1), int(units2), int(epochs), int(batch_size)]).encode("utf-8"))
+    return digest.hexdigest()
 
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    train_scaled = scaler.fit_transform(train.reshape(-1, 1))
 
-    x_train, y_train = build_windows(train_scaled, look_back)
-    if len(x_train) == 0:
-        last_value = float(train[-1]) if len(train) else 0.0
-        return np.full(len(test), last_value), np.full(horizon, last_value), 0.0
+def _count_lstm_cache(event: str) -> None:
+    with _lstm_model_cache_lock:
+        _lstm_model_cache_totals[event] += 1
+    request_stats = _lstm_cache_request_stats.get()
+    if request_stats is not None:
+        request_stats[event] = request_stats.get(event, 0) + 1
 
-    tf.keras.backend.clear_session()
+
+@contextmanager
+def lstm_cache_scope() -> Iterator[dict[str, int]]:
+    stats = {"hits": 0, "misses": 0}
+    token = _lstm_cache_request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _lstm_cache_request_stats.reset(token)
+
+
+def lstm_cache_summary(request_stats: dict[str, int] | None = None) -> dict[str, int]:
+    with _lstm_model_cache_lock:
+        summary = {
+            "size": len(_lstm_model_cache),
+            "capacity": LSTM_MODEL_CACHE_SIZE,
+            "total_hits": _lstm_model_cache_totals["hits"],
+            "total_misses": _lstm_model_cache_totals["misses"],
+            "evictions": _lstm_model_cache_totals["evictions"],
+        }
+    if request_stats is not None:
+        summary["hits"] = int(request_stats.get("hits", 0))
+        summary["misses"] = int(request_stats.get("misses", 0))
+    return summary
+
+
+def lstm_training_seed(x_train: np.ndarray, y_train: np.ndarray, *config: int) -> int:
+    # Seeded by the training inputs, so weights do not depend on earlier trainings or cache hits.
+    digest = hashlib.blake2b(np.ascontiguousarray(x_train, dtype=np.float64).tobytes(), digest_size=4)
+    digest.update(np.ascontiguousarray(y_train, dtype=np.float64).tobytes())
+    digest.update(json.dumps([int(value) for value in config]).encode("utf-8"))
+    return (SEED + int.from_bytes(digest.digest(), "little")) % (2**31)
+
+
+def build_lstm_model(look_back: int, units1: int, units2: int):
     model = tf.keras.Sequential(
         [
             tf.keras.layers.Input(shape=(look_back, 1)),
-            tf.keras.layers.LSTM(max(4, units1), return_sequences=True),
-            tf.keras.layers.LSTM(max(4, units2)),
+            tf.keras.layers.LSTM(units1, return_sequences=True),
+            tf.keras.layers.LSTM(units2),
             tf.keras.layers.Dense(1),
         ]
     )
     model.compile(optimizer="adam", loss="mse")
+    return model
+
+
+@timed_stage("lstm_train")
+def fit_lstm_model(
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    look_back: int,
+    units1: int,
+    units2: int,
+    epochs: int,
+    batch_size: int,
+):
+    tf.keras.backend.clear_session()
+    reset_seeds(lstm_training_seed(x_train, y_train, look_back, units1, units2, epochs, batch_size))
+    model = build_lstm_model(look_back, units1, units2)
+
+    callbacks = []
+    if _progress_callback.get() is not None:
+        callbacks.append(
+            tf.keras.callbacks.LambdaCallback(
+                on_epoch_end=lambda epoch, logs: report_progress(
+                    "lstm_epoch",
+                    f"LSTM epoch {epoch + 1}/{epochs}",
+                    epoch=epoch + 1,
+                    epochs=epochs,
+                    loss=sanitize_number(float((logs or {}).get("loss", 0.0))),
+                )
+            )
+        )
+
     model.fit(
         x_train,
         y_train,
-        epochs=max(1, epochs),
-        batch_size=max(1, batch_size),
+        epochs=epochs,
+        batch_size=batch_size,
         verbose=0,
+        callbacks=callbacks,
     )
+    return model
 
-    history_scaled = train_scaled.reshape(-1).tolist()
-    test_scaled = scaler.transform(test.reshape(-1, 1)).reshape(-1) if len(test) else np.empty((0,), dtype=float)
-    test_pred_scaled: list[float] = []
 
-    test_cursor = 0
-    while test_cursor < len(test_scaled):
-        current_block = min(block_size, len(test_scaled) - test_cursor)
-        rolling = ensure_window(history_scaled, look_back)
+def get_or_train_lstm_model(
+    train: np.ndarray,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    look_back: int,
+    units1: int,
+    units2: int,
+    epochs: int,
+    batch_size: int,
+) -> dict[str, Any]:
+    units1 = max(4, units1)
+    units2 = max(4, units2)
+    epochs = max(1, epochs)
+    batch_size = max(1, batch_size)
+
+    if LSTM_MODEL_CACHE_SIZE <= 0:
+        return {"model": fit_lstm_model(x_train, y_train, look_back, units1, units2, epochs, batch_size), "predictors": {}}
+
+    key = lstm_cache_key(train, look_back, units1, units2, epochs, batch_size)
+    while True:
+        with _lstm_model_cache_lock:
+            entry = _lstm_model_cache.get(key)
+            if entry is not None:
+                _lstm_model_cache.move_to_end(key)
+            training = _lstm_model_training.get(key)
+            if entry is None and training is None:
+                training = _lstm_model_training[key] = threading.Event()
+                break
+        if entry is not None:
+            _count_lstm_cache("hits")
+            return entry
+        # Another request is training this model; take its result (or train if it failed).
+        training.wait()
 
-        for _ in range(current_block):
-            x_input = np.array(rolling[-look_back:], dtype=float).reshape(1, look_back, 1)
-            pred_scaled = float(model.predict(x_input, verbose=0).flatten()[0])
-            test_pred_scaled.append(pred_scaled)
-            rolling.append(pred_scaled)
+    _count_lstm_cache("misses")
+    try:
+        entry = {"model": fit_lstm_model(x_train, y_train, look_back, units1, units2, epochs, batch_size), "predictors": {}}
+        with _lstm_model_cache_lock:
+            _lstm_model_cache[key] = entry
+            _lstm_model_cache.move_to_end(key)
+            while len(_lstm_model_cache) > LSTM_MODEL_CACHE_SIZE:
+                _lstm_model_cache.popitem(last=False)
+                _lstm_model_cache_totals["evictions"] += 1
+    finally:
+        with _lstm_model_cache_lock:
+            del _lstm_model_training[key]
+        training.set()
+    return entry
+
+
+def cached_step_predictor(
+    entry: dict[str, Any], engine: str, check_windows: np.ndarray
+) -> Callable[[np.ndarray], np.ndarray]:
+    # entry["predictors"] is shared by every request holding the model; the first one built wins.
+    with _lstm_model_cache_lock:
+        predict_step = entry["predictors"].get(engine)
+    if predict_step is None:
+        built = build_step_predictor(entry["model"], engine, check_windows)
+        with _lstm_model_cache_lock:
+            predict_step = entry["predictors"].setdefault(engine, built)
+    return predict_step
+
+
+@timed_stage("lstm_train")
+def finetune_lstm_model(model, x_train: np.ndarray, y_train: np.ndarray, epochs: int, batch_size: int):
+    # Trains a copy: the original may be shared through the model cache or an older analysis state.
+    reset_seeds(lstm_training_seed(x_train, y_train, epochs, batch_size))
+    tuned = tf.keras.models.clone_model(model)
+    tuned.set_weights(model.get_weights())
+    tuned.compile(optimizer="adam", loss="mse")
+    tuned.fit(x_train, y_train, epochs=max(1, epochs), batch_size=max(1, batch_size), verbose=0)
+    return tuned
+
+
+@timed_stage("lstm_train")
+def warm_start_lstm_model(
+    previous,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    look_back: int,
+    units1: int,
+    units2: int,
+    epochs: int,
+    batch_size: int,
+):
+    # LSTM weights do not depend on look_back, so any fold can start from them; previous is untouched.
+    reset_seeds(lstm_training_seed(x_train, y_train, look_back, units1, units2, epochs, batch_size))
+    model = build_lstm_model(look_back, units1, units2)
+    model.set_weights(previous.get_weights())
+    model.fit(x_train, y_train, epochs=max(1, epochs), batch_size=max(1, batch_size), verbose=0)
+    return model
+
+
+def rollout_lstm_blocks(
+    predict_step: Callable[[np.ndarray], np.ndarray],
+    start_windows: np.ndarray,
+    steps: int,
+) -> np.ndarray:
+    n_blocks, look_back = start_windows.shape
+    if n_blocks == 0 or steps <= 0:
+        return np.empty((n_blocks, max(0, steps)), dtype=float)
 
-        history_scaled.extend(test_scaled[test_cursor : test_cursor + current_block].tolist())
-        test_cursor += current_block
+    rolling = np.empty((n_blocks, look_back + steps), dtype=float)
+    rolling[:, :look_back] = start_windows
+    for step in range(steps):
+        rolling[:, look_back + step] = predict_step(rolling[:, step : look_back + step])
+    return rolling[:, look_back:]
 
-    test_pred = (
-        scaler.inverse_transform(np.array(test_pred_scaled, dtype=float).reshape(-1, 1)).flatten()
-        if test_pred_scaled
-        else np.empty((0,), dtype=float)
-    )
 
+def rollout_lstm_future(
+    predict_step: Callable[[np.ndarray], np.ndarray],
+    scaler: MinMaxScaler,
+    full: np.ndarray,
+    look_back: int,
+    horizon: int,
+    block_size: int,
+) -> np.ndarray:
     full_scaled = scaler.transform(full.reshape(-1, 1)).reshape(-1).tolist()
     future_scaled: list[float] = []
     while len(future_scaled) < horizon:
         current_block = min(block_size, horizon - len(future_scaled))
-        rolling = ensure_window(full_scaled, look_back)
-        block_predictions: list[float] = []
-
-        for _ in range(current_block):
-            x_input = np.array(rolling[-look_back:], dtype=float).reshape(1, look_back, 1)
-            pred_scaled = float(model.predict(x_input, verbose=0).flatten()[0])
-            block_predictions.append(pred_scaled)
-            rolling.append(pred_scaled)
-
+        rolling = np.array(ensure_window(full_scaled, look_back), dtype=float).reshape(1, look_back)
+        block_predictions = rollout_lstm_blocks(predict_step, rolling, current_block)[0].tolist()
         future_scaled.extend(block_predictions)
         full_scaled.extend(block_predictions)
 
-    future_values = (
-        scaler.inverse_transform(np.array(future_scaled, dtype=float).reshape(-1, 1)).flatten()
-        if future_scaled
-        else np.empty((0,), dtype=float)
-    )
+    if not future_scaled:
+        return np.empty((0,), dtype=float)
+    return scaler.inverse_transform(np.array(future_scaled, dtype=float).reshape(-1, 1)).flatten()
+
+
+def run_lstm(
+    train: np.ndarray,
+    test: np.ndarray,
+    full: np.ndarray,
+    look_back: int,
+    units1: int,
+    units2: int,
+    epochs: int,
+    batch_size: int,
+    horizon: int,
+    block_size: int,
+    engine: str | None = None,
+    warm_start: dict[str, Any] | None = None,
+    fit_state: dict[str, Any] | None = None,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    # warm_start chains {"model", "seen"} across folds; fit_state receives the model, predictors and scaler.
+    start = time.time()
+
+    scaler = MinMaxScaler(feature_range=(0, 1))
+    train_scaled = scaler.fit_transform(train.reshape(-1, 1))
+
+    x_train, y_train = build_windows(train_scaled, look_back)
+    if len(x_train) == 0:
+        last_value = float(train[-1]) if len(train) else 0.0
+        return np.full(len(test), last_value), np.full(horizon, last_value), 0.0
+
+    if warm_start is not None and warm_start.get("model") is not None:
+        tail = max(len(train) - int(warm_start["seen"]), batch_size)
+        model = warm_start_lstm_model(
+            warm_start["model"],
+            x_train[-tail:],
+            y_train[-tail:],
+            look_back,
+            max(4, units1),
+            max(4, units2),
+            LSTM_WARM_START_EPOCHS,
+            max(1, batch_size),
+        )
+        cached_model = {"model": model, "predictors": {}}
+    else:
+        cached_model = get_or_train_lstm_model(train, x_train, y_train, look_back, units1, units2, epochs, batch_size)
+        model = cached_model["model"]
+    if warm_start is not None:
+        warm_start.update(model=model, seen=len(train))
+    if fit_state is not None:
+        fit_state.update(model=model, predictors=cached_model["predictors"], scaler=scaler, seen=int(len(train)))
+
+    with timed_stage("lstm_rollout"):
+        resolved_engine = resolve_lstm_engine(engine)
+        predict_step = cached_step_predictor(cached_model, resolved_engine, x_train[-8:].reshape(-1, look_back))
+        train_flat = train_scaled.reshape(-1)
+        test_scaled = scaler.transform(test.reshape(-1, 1)).reshape(-1) if len(test) else np.empty((0,), dtype=float)
+        known_scaled = np.concatenate([train_flat, test_scaled])
+        block_starts = list(range(0, len(test_scaled), block_size))
+        # Every test block restarts from the true history, so the blocks are independent.
+        start_windows = np.array(
+            [known_scaled[len(train_flat) + cursor - look_back : len(train_flat) + cursor] for cursor in block_starts],
+            dtype=float,
+        ).reshape(len(block_starts), look_back)
+
+        if LSTM_ROLLOUT_MODE == "sequential":
+            block_paths = [
+                rollout_lstm_blocks(predict_step, start_windows[i : i + 1], min(block_size, len(test_scaled) - cursor))[0]
+                for i, cursor in enumerate(block_starts)
+            ]
+        else:
+            batched_paths = rollout_lstm_blocks(predict_step, start_windows, block_size)
+            block_paths = [
+                batched_paths[i, : min(block_size, len(test_scaled) - cursor)] for i, cursor in enumerate(block_starts)
+            ]
+
+        test_pred_scaled: list[float] = []
+        for path in block_paths:
+            test_pred_scaled.extend(path.tolist())
+
+        test_pred = (
+            scaler.inverse_transform(np.array(test_pred_scaled, dtype=float).reshape(-1, 1)).flatten()
+            if test_pred_scaled
+            else np.empty((0,), dtype=float)
+        )
+
+        future_values = rollout_lstm_future(predict_step, scaler, full, look_back, horizon, block_size)
     elapsed = time.time() - start
     return test_pred, future_values, elapsed
 
@@ -338,8 +1018,35 @@ def _fit_arima_candidate(history: np.ndarray, order: tuple[int, int, int]):
         return order, float("inf"), None
 
 
+def _screen_arima_candidate(history: np.ndarray, order: tuple[int, int, int]) -> float:
+    try:
+        model = ARIMA(history, order=order, enforce_stationarity=False, enforce_invertibility=False)
+        aic = float(model.fit(method="hannan_rissanen").aic)
+        return aic if math.isfinite(aic) else float("inf")
+    except Exception:
+        return float("inf")
+
+
+def arima_screening_enabled() -> bool:
+    return 0 < ARIMA_SCREEN_TOP_K < len(ARIMA_CANDIDATE_ORDERS)
+
+
+def screen_arima_orders(history: np.ndarray) -> list[tuple[int, int, int]]:
+    # The ARIMA_SCREEN_TOP_K best orders by Hannan-Rissanen AIC, in grid order; failed fits rank last.
+    orders = ARIMA_CANDIDATE_ORDERS
+    if not arima_screening_enabled():
+        return orders
+    with timed_stage("arima_screen"):
+        if ARIMA_EXECUTOR is None:
+            scores = [_screen_arima_candidate(history, order) for order in orders]
+        else:
+            scores = list(ARIMA_EXECUTOR.map(lambda order: _screen_arima_candidate(history, order), orders))
+    ranked = sorted(range(len(orders)), key=lambda index: (scores[index], index))[:ARIMA_SCREEN_TOP_K]
+    return [orders[index] for index in sorted(ranked)]
+
+
 def fit_best_arima_model(history: np.ndarray):
-    candidate_orders = ARIMA_CANDIDATE_ORDERS
+    candidate_orders = screen_arima_orders(history)
     best_model = None
     best_aic = float("inf")
 
@@ -363,12 +1070,11 @@ def fit_best_arima_model(history: np.ndarray):
     return best_model
 
 
-def arima_forecast(history: np.ndarray, steps: int) -> np.ndarray:
+def fitted_arima_forecast(fitted, steps: int, last_value: float) -> np.ndarray:
     if steps <= 0:
         return np.empty((0,), dtype=float)
 
     try:
-        fitted = fit_best_arima_model(history)
         if fitted is None:
             raise ValueError("Не удалось обучить модель ARIMA (все параметры не подошли)")
 
@@ -377,17 +1083,220 @@ def arima_forecast(history: np.ndarray, steps: int) -> np.ndarray:
             raise ValueError("Прогноз ARIMA содержит некорректные значения")
         return forecast
     except Exception:
-        last = float(history[-1]) if len(history) else 0.0
-        return np.full(steps, last)
+        return np.full(steps, float(last_value))
+
+
+def arima_forecast(history: np.ndarray, steps: int) -> np.ndarray:
+    if steps <= 0:
+        return np.empty((0,), dtype=float)
+
+    last = float(history[-1]) if len(history) else 0.0
+    try:
+        fitted = fit_best_arima_model(history)
+    except Exception:
+        fitted = None
+    return fitted_arima_forecast(fitted, steps, last)
+
+
+def resolve_arima_update_mode(mode: str | None = None) -> str:
+    name = str(mode or ARIMA_UPDATE_MODE).strip().lower()
+    return name if name in ARIMA_UPDATE_MODES else "refit"
 
 
-def run_arima(train: np.ndarray, test: np.ndarray, horizon: int, block_size: int) -> tuple[np.ndarray, np.ndarray, float]:
+def resolve_analysis_tier(tier: str | None = None) -> str:
+    name = str(tier or ANALYSIS_TIER).strip().lower()
+    return name if name in ANALYSIS_TIERS else "full"
+
+
+def resolve_walk_forward_mode(mode: str | None = None) -> str:
+    name = str(mode or WALK_FORWARD_MODE).strip().lower()
+    return name if name in WALK_FORWARD_MODES else "all"
+
+
+def resolve_walk_forward_lstm_mode(mode: str | None = None) -> str:
+    name = str(mode or WALK_FORWARD_LSTM).strip().lower()
+    return name if name in WALK_FORWARD_LSTM_MODES else "fresh"
+
+
+def resolve_stationarity_lag_mode(mode: str | None = None) -> str:
+    name = str(mode or STATIONARITY_LAG_MODE).strip().lower()
+    return name if name in STATIONARITY_LAG_MODES else "auto"
+
+
+def resolve_stationarity_window(window: Any = None) -> int:
+    try:
+        size = int(STATIONARITY_WINDOW if window is None else window)
+    except (TypeError, ValueError):
+        size = STATIONARITY_WINDOW
+    return 0 if size <= 0 else max(STATIONARITY_MIN_WINDOW, size)
+
+
+def arima_residual_sigma(fitted) -> float:
+    try:
+        names = list(fitted.model.param_names)
+        sigma2 = float(np.asarray(fitted.params)[names.index("sigma2")])
+    except Exception:
+        return 0.0
+    if not math.isfinite(sigma2) or sigma2 <= 0:
+        return 0.0
+    return math.sqrt(sigma2)
+
+
+def _refit_arima(history: list[float]):
+    try:
+        return fit_best_arima_model(np.array(history, dtype=float))
+    except Exception:
+        return None
+
+
+def run_arima_incremental(
+    train: np.ndarray,
+    test: np.ndarray,
+    horizon: int,
+    block_size: int,
+    fit_state: dict[str, Any] | None = None,
+) -> tuple[np.ndarray, np.ndarray, float]:
     start = time.time()
 
     history = train.tolist()
+    fitted = None
+    fitted_seen = 0
+    blocks_since_refit = ARIMA_REFIT_EVERY
     pred_test: list[float] = []
     test_cursor = 0
 
+    while test_cursor < len(test):
+        current_block = min(block_size, len(test) - test_cursor)
+        if fitted is None or blocks_since_refit >= ARIMA_REFIT_EVERY:
+            fitted = _refit_arima(history)
+            fitted_seen = len(history)
+            blocks_since_refit = 0
+
+        last_value = float(history[-1]) if history else 0.0
+        fc = fitted_arima_forecast(fitted, current_block, last_value)
+        pred_test.extend(fc.tolist())
+
+        actual = np.array(test[test_cursor : test_cursor + current_block], dtype=float)
+        history.extend(actual.tolist())
+        test_cursor += current_block
+        blocks_since_refit += 1
+
+        sigma = arima_residual_sigma(fitted)
+        block_rmse = float(np.sqrt(np.mean((actual - fc) ** 2)))
+        if fitted is None or (sigma > 0 and block_rmse > ARIMA_REFIT_ERROR_RATIO * sigma):
+            fitted = None
+            continue
+
+        try:
+            fitted = fitted.extend(actual)
+        except Exception:
+            fitted = None
+
+    pred_future = np.empty((0,), dtype=float)
+    if horizon > 0:
+        if fitted is None or blocks_since_refit >= ARIMA_REFIT_EVERY:
+            fitted = _refit_arima(history)
+            fitted_seen = len(history)
+        if fit_state is not None:
+            fit_state.update(fitted=fitted, seen=fitted_seen)
+        # Feeding a fixed-parameter model its own forecasts is the same as one multi-step forecast.
+        last_value = float(history[-1]) if history else 0.0
+        pred_future = fitted_arima_forecast(fitted, horizon, last_value)
+
+    elapsed = time.time() - start
+    return np.array(pred_test, dtype=float), np.array(pred_future, dtype=float), elapsed
+
+
+def _arima_block_task(
+    shared_values: tuple[str, int],
+    stop: int,
+    order: tuple[int, int, int],
+    steps: int,
+) -> tuple[bool, float, np.ndarray | None]:
+    # One (test block, candidate order) fit: (fitted, AIC, forecast or None if forecasting failed).
+    _, aic, model = _fit_arima_candidate(read_shared_float_array(shared_values, stop=stop), order)
+    if model is None:
+        return False, aic, None
+    try:
+        return True, aic, np.array(model.forecast(steps=steps), dtype=float)
+    except Exception:
+        return True, aic, None
+
+
+def _arima_block_forecast_task(shared_values: tuple[str, int], stop: int, steps: int) -> np.ndarray:
+    return arima_forecast(read_shared_float_array(shared_values, stop=stop), steps)
+
+
+def arima_test_blocks_on_pool(
+    pool: ProcessPoolExecutor,
+    train: np.ndarray,
+    test: np.ndarray,
+    block_size: int,
+) -> list[float] | None:
+    # Picks each block's order as fit_best_arima_model() does; None if the pool broke.
+    known = np.concatenate([np.asarray(train, dtype=float), np.asarray(test, dtype=float)])
+    blocks = [
+        (len(train) + cursor, min(block_size, len(test) - cursor)) for cursor in range(0, len(test), block_size)
+    ]
+    with shared_float_array(known) as shared_values:
+        futures: list[list[Any]] = []
+        try:
+            if arima_screening_enabled():
+                futures = [[pool.submit(_arima_block_forecast_task, shared_values, stop, steps)] for stop, steps in blocks]
+                return [value for block_futures in futures for value in block_futures[0].result().tolist()]
+            for stop, steps in blocks:
+                futures.append(
+                    [pool.submit(_arima_block_task, shared_values, stop, order, steps) for order in ARIMA_CANDIDATE_ORDERS]
+                )
+            pred_test: list[float] = []
+            for (stop, steps), block_futures in zip(blocks, futures):
+                chosen = None
+                best_aic = float("inf")
+                for future in block_futures:
+                    fitted, aic, forecast = future.result()
+                    if fitted and aic < best_aic:
+                        best_aic, chosen = aic, forecast
+                if chosen is None or len(chosen) != steps or not np.all(np.isfinite(chosen)):
+                    chosen = np.full(steps, float(known[stop - 1]))
+                pred_test.extend(chosen.tolist())
+            return pred_test
+        except BrokenProcessPool:
+            reset_process_pool()
+            return None
+        finally:
+            pending = [future for block_futures in futures for future in block_futures]
+            for future in pending:
+                future.cancel()
+            wait(pending)
+
+
+@timed_stage("arima")
+def run_arima(
+    train: np.ndarray,
+    test: np.ndarray,
+    horizon: int,
+    block_size: int,
+    update_mode: str | None = None,
+    fit_state: dict[str, Any] | None = None,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    # fit_state receives {"fitted", "seen"}: the model behind the future path and the bars its parameters saw.
+    if resolve_arima_update_mode(update_mode) == "incremental":
+        return run_arima_incremental(train, test, horizon, block_size, fit_state)
+
+    start = time.time()
+
+    history = train.tolist()
+    pred_test: list[float] = []
+    test_cursor = 0
+
+    pool = get_process_pool()
+    if pool is not None and len(test) > block_size:
+        pooled = arima_test_blocks_on_pool(pool, train, test, block_size)
+        if pooled is not None:
+            pred_test = pooled
+            history.extend(test.tolist())
+            test_cursor = len(test)
+
     while test_cursor < len(test):
         current_block = min(block_size, len(test) - test_cursor)
         fc = arima_forecast(np.array(history, dtype=float), current_block)
@@ -398,7 +1307,13 @@ def run_arima(train: np.ndarray, test: np.ndarray, horizon: int, block_size: int
     pred_future: list[float] = []
     while len(pred_future) < horizon:
         current_block = min(block_size, horizon - len(pred_future))
-        fc = arima_forecast(np.array(history, dtype=float), current_block)
+        if pred_future:
+            fc = arima_forecast(np.array(history, dtype=float), current_block)
+        else:
+            fitted = _refit_arima(history)
+            if fit_state is not None:
+                fit_state.update(fitted=fitted, seen=len(history))
+            fc = fitted_arima_forecast(fitted, current_block, float(history[-1]) if history else 0.0)
         values = fc.tolist()
         pred_future.extend(values)
         history.extend(values)
@@ -407,21 +1322,65 @@ def run_arima(train: np.ndarray, test: np.ndarray, horizon: int, block_size: int
     return np.array(pred_test, dtype=float), np.array(pred_future, dtype=float), elapsed
 
 
-def stationarity_report(series: np.ndarray) -> dict[str, Any]:
-    adf_stat, adf_p = 0.0, 1.0
-    kpss_stat, kpss_p = 0.0, 1.0
+def _stationarity_cache_key(tested: np.ndarray, lag_mode: str) -> str:
+    digest = hashlib.blake2b(tested.tobytes(), digest_size=16)
+    digest.update(json.dumps([lag_mode, STATIONARITY_MAX_LAG]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _stationarity_input(series: np.ndarray, window: int) -> np.ndarray:
+    tested = series[-window:] if 0 < window < len(series) else series
+    return np.ascontiguousarray(tested, dtype=np.float64)
+
+
+def cached_stationarity_report(series: np.ndarray, lag_mode: str, window: int) -> dict[str, Any] | None:
+    key = _stationarity_cache_key(_stationarity_input(series, window), lag_mode)
+    with _stationarity_cache_lock:
+        report = _stationarity_cache.get(key)
+        if report is None:
+            return None
+        _stationarity_cache.move_to_end(key)
+    return {**report, "mode": {**report["mode"], "cached": True}}
+
+
+def store_stationarity_report(series: np.ndarray, lag_mode: str, window: int, report: dict[str, Any]) -> None:
+    if STATIONARITY_CACHE_SIZE <= 0:
+        return
+    key = _stationarity_cache_key(_stationarity_input(series, window), lag_mode)
+    with _stationarity_cache_lock:
+        _stationarity_cache[key] = report
+        _stationarity_cache.move_to_end(key)
+        while len(_stationarity_cache) > STATIONARITY_CACHE_SIZE:
+            _stationarity_cache.popitem(last=False)
+
+
+@timed_stage("stationarity")
+def stationarity_report(series: np.ndarray, lag_mode: str | None = None, window: int | None = None) -> dict[str, Any]:
+    lag_mode = resolve_stationarity_lag_mode(lag_mode)
+    window = resolve_stationarity_window(window)
+    cached = cached_stationarity_report(series, lag_mode, window)
+    if cached is not None:
+        return cached
+
+    tested = _stationarity_input(series, window)
+    # adfuller requires maxlag < nobs / 2 - 2 with a constant.
+    max_lag = None if lag_mode == "auto" else max(0, min(STATIONARITY_MAX_LAG, len(tested) // 2 - 3))
+    adf_stat, adf_p, adf_lag = 0.0, 1.0, None
+    kpss_stat, kpss_p, kpss_lags = 0.0, 1.0, None
 
     try:
-        adf_res = adfuller(series, autolag="AIC")
+        adf_res = adfuller(tested, maxlag=max_lag, autolag=None if lag_mode == "fixed" else "AIC")
         adf_stat = float(adf_res[0])
         adf_p = float(adf_res[1])
+        adf_lag = int(adf_res[2])
     except Exception:
         pass
 
     try:
-        kpss_res = kpss(series, regression="c", nlags="auto")
+        kpss_res = kpss(tested, regression="c", nlags=max_lag if lag_mode == "fixed" else "auto")
         kpss_stat = float(kpss_res[0])
         kpss_p = float(kpss_res[1])
+        kpss_lags = int(kpss_res[2])
     except Exception:
         pass
 
@@ -435,20 +1394,31 @@ def stationarity_report(series: np.ndarray) -> dict[str, Any]:
     else:
         stationarity_type = "Пограничная стационарность (нужна дополнительная проверка)"
 
-    return {
+    report = {
         "adf": {
             "test_statistic": sanitize_number(adf_stat),
             "p_value": sanitize_number(adf_p),
             "is_stationary": adf_stationary,
             "interpretation": "Стационарен (p < 0.05)" if adf_stationary else "Нестационарен (p >= 0.05)",
+            "lags": adf_lag,
         },
         "kpss": {
             "test_statistic": sanitize_number(kpss_stat),
             "p_value": sanitize_number(kpss_p),
             "is_stationary": kpss_stationary,
+            "lags": kpss_lags,
         },
         "stationarity_type": stationarity_type,
+        "mode": {
+            "lag": lag_mode,
+            "max_lag": max_lag,
+            "window": window or None,
+            "observations": int(len(tested)),
+            "cached": False,
+        },
     }
+    store_stationarity_report(series, lag_mode, window, report)
+    return report
 
 
 def evaluate_model(name: str, y_true: np.ndarray, y_pred: np.ndarray, elapsed: float):
@@ -642,30 +1612,319 @@ def select_walk_forward_origins(
         selected.append(origins[idx])
         used.add(idx)
 
-    if origins[-1] not in selected:
-        selected.append(origins[-1])
+    if origins[-1] not in selected:
+        selected.append(origins[-1])
+
+    return sorted(selected)
+
+
+@timed_stage("walk_forward_fold")
+def walk_forward_statistical_paths(
+    values: np.ndarray,
+    origin: int,
+    horizon: int,
+    forecast_block: int,
+    arima_update: str | None = None,
+) -> dict[str, np.ndarray]:
+    train_fold = np.array(values[:origin], dtype=float)
+    empty_test = np.empty((0,), dtype=float)
+    last_value = float(train_fold[-1])
+    model_paths: dict[str, np.ndarray] = {}
+
+    _, arima_future_fold, _ = run_arima(
+        train_fold,
+        empty_test,
+        horizon,
+        forecast_block,
+        update_mode=arima_update,
+    )
+    model_paths["arima"] = sanitize_future_path(arima_future_fold, horizon, last_value)
+    model_paths.update(baseline_fold_paths(train_fold, horizon, forecast_block))
+    return model_paths
+
+
+def baseline_fold_paths(train_fold: np.ndarray, horizon: int, forecast_block: int) -> dict[str, np.ndarray]:
+    empty_test = np.empty((0,), dtype=float)
+    last_value = float(train_fold[-1])
+    _, trend_future_fold, _ = run_trend_baseline(train_fold, empty_test, horizon, forecast_block)
+    _, returns_future_fold, _ = run_returns_baseline(train_fold, empty_test, horizon, forecast_block)
+    return {
+        "trend": sanitize_future_path(trend_future_fold, horizon, last_value),
+        "returns": sanitize_future_path(returns_future_fold, horizon, last_value),
+    }
+
+
+def fixed_arima_fold_path(fitted_arima, train_fold: np.ndarray, horizon: int) -> np.ndarray:
+    # Keeps the fitted ARIMA parameters and only re-filters the state up to the origin (no refit).
+    last_value = float(train_fold[-1])
+    try:
+        fold_fitted = fitted_arima.apply(train_fold) if fitted_arima is not None else None
+    except Exception:
+        fold_fitted = None
+    return sanitize_future_path(fitted_arima_forecast(fold_fitted, horizon, last_value), horizon, last_value)
+
+
+def iter_walk_forward_fixed_arima_paths(
+    values: np.ndarray,
+    origins: list[int],
+    horizon: int,
+    forecast_block: int,
+) -> Iterator[dict[str, np.ndarray]]:
+    # One fit before the earliest origin serves every fold without seeing any fold's test bars.
+    fitted = _refit_arima(values[: min(origins)].tolist()) if origins else None
+    record_analysis_state(fold_arima=fitted)
+    for done, origin in enumerate(origins, start=1):
+        train_fold = np.array(values[:origin], dtype=float)
+        with timed_stage("walk_forward_fold"):
+            model_paths = {"arima": fixed_arima_fold_path(fitted, train_fold, horizon)}
+            model_paths.update(baseline_fold_paths(train_fold, horizon, forecast_block))
+        report_fold_progress(done, len(origins))
+        yield model_paths
+
+
+def walk_forward_fixed_arima_paths(
+    values: np.ndarray,
+    origins: list[int],
+    horizon: int,
+    forecast_block: int,
+) -> list[dict[str, np.ndarray]]:
+    return list(iter_walk_forward_fixed_arima_paths(values, origins, horizon, forecast_block))
+
+
+def _walk_forward_fixed_arima_task(
+    shared_values: tuple[str, int],
+    origins: list[int],
+    horizon: int,
+    forecast_block: int,
+) -> list[dict[str, np.ndarray]]:
+    values = read_shared_float_array(shared_values, stop=max(origins) if origins else 0)
+    return walk_forward_fixed_arima_paths(values, origins, horizon, forecast_block)
+
+
+def _walk_forward_statistical_task(
+    shared_values: tuple[str, int],
+    origin: int,
+    horizon: int,
+    forecast_block: int,
+    arima_update: str | None,
+) -> dict[str, np.ndarray]:
+    values = read_shared_float_array(shared_values, stop=origin)
+    return walk_forward_statistical_paths(values, origin, horizon, forecast_block, arima_update)
+
+
+def report_fold_progress(done: int, total: int) -> None:
+    report_progress("walk_forward_fold", f"walk-forward fold {done}/{total}", fold=done, folds=total)
+
+
+@contextmanager
+def walk_forward_statistical_paths_pool(
+    values: np.ndarray,
+    origins: list[int],
+    horizon: int,
+    forecast_block: int,
+    arima_update: str | None,
+    ahead: int | None = None,
+) -> Iterator[Callable[[], Iterator[dict[str, np.ndarray]]]]:
+    # collect() yields paths in origin order with at most ahead folds in flight; unrequested folds never run.
+    def compute_inline(skip: int = 0) -> Iterator[dict[str, np.ndarray]]:
+        for done, origin in enumerate(origins[skip:], start=skip + 1):
+            paths = walk_forward_statistical_paths(values, origin, horizon, forecast_block, arima_update)
+            report_fold_progress(done, len(origins))
+            yield paths
+
+    pool = get_process_pool()
+    if pool is None or len(origins) <= 1:
+        yield compute_inline
+        return
+
+    with shared_float_array(values) as shared_values:
+        futures: list[Any] = []
+
+        def submit_up_to(count: int) -> None:
+            while len(futures) < min(count, len(origins)):
+                origin = origins[len(futures)]
+                futures.append(
+                    pool.submit(_walk_forward_statistical_task, shared_values, origin, horizon, forecast_block, arima_update)
+                )
+
+        try:
+            submit_up_to(len(origins) if ahead is None else ahead)
+        except BrokenProcessPool:
+            reset_process_pool()
+            futures = []
+
+        def collect() -> Iterator[dict[str, np.ndarray]]:
+            done = 0
+            try:
+                while done < len(futures):
+                    paths = futures[done].result()
+                    done += 1
+                    if ahead is not None:
+                        submit_up_to(done + ahead)
+                    report_fold_progress(done, len(origins))
+                    yield paths
+            except BrokenProcessPool:
+                reset_process_pool()
+            yield from compute_inline(skip=done)
+
+        try:
+            yield collect
+        finally:
+            # Keep the segment alive until no worker can still be reading it.
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+
+def score_walk_forward_fold(
+    train_fold: np.ndarray,
+    test_fold: np.ndarray,
+    model_paths: dict[str, np.ndarray],
+    horizon: int,
+) -> dict[str, Any] | None:
+    rmse_weight = 0.62
+    flatness_weight = 0.2
+    monotonic_weight = 0.12
+    zigzag_weight = 0.06
+    monotonic_penalty_value = 1.35
+    zigzag_threshold = 0.7
+    zigzag_scale = 1.5
+    zigzag_penalty_cap = 1.75
+
+    last_value = float(train_fold[-1])
+    rmse_values: dict[str, float] = {}
+    flatness_values: dict[str, float] = {}
+    monotonic_values: dict[str, float] = {}
+    zigzag_values: dict[str, float] = {}
+
+    for model_name, pred in model_paths.items():
+        rmse = sanitize_number(math.sqrt(mean_squared_error(test_fold, pred)))
+        flatness = sanitize_number(flatness_penalty(test_fold, pred))
+        is_monotonic = monotonic_flag(pred)
+        flip_rate = sign_flip_rate(pred)
+
+        monotonic_penalty = monotonic_penalty_value if is_monotonic >= 1.0 else 1.0
+        zigzag_penalty = 1.0
+        if flip_rate > zigzag_threshold:
+            zigzag_penalty += (float(flip_rate) - zigzag_threshold) * zigzag_scale
+        zigzag_penalty = min(zigzag_penalty_cap, zigzag_penalty)
+
+        rmse_values[model_name] = rmse
+        flatness_values[model_name] = flatness
+        monotonic_values[model_name] = sanitize_number(monotonic_penalty)
+        zigzag_values[model_name] = sanitize_number(zigzag_penalty)
+
+    rmse_norm = min_max_normalize(rmse_values)
+    flatness_norm = min_max_normalize(flatness_values)
+    monotonic_norm = min_max_normalize(monotonic_values)
+    zigzag_norm = min_max_normalize(zigzag_values)
+
+    composite_scores: dict[str, float] = {}
+    for model_name in model_paths.keys():
+        score = (
+            rmse_weight * rmse_norm.get(model_name, 0.0)
+            + flatness_weight * flatness_norm.get(model_name, 0.0)
+            + monotonic_weight * monotonic_norm.get(model_name, 0.0)
+            + zigzag_weight * zigzag_norm.get(model_name, 0.0)
+        )
+        composite_scores[model_name] = sanitize_number(max(0.0, score))
+
+    origin_weights = ensemble_weights_from_rmse(composite_scores, min_weight=0.0)
+    if not origin_weights:
+        return None
+
+    fallback_path = np.full(horizon, last_value, dtype=float)
+    hybrid_future_fold = build_hybrid_future_levels(
+        last_close=last_value,
+        history=train_fold,
+        horizon=horizon,
+        arima_future=model_paths.get("arima", fallback_path),
+        lstm_future=model_paths.get("lstm", fallback_path),
+        trend_future=model_paths.get("trend", fallback_path),
+        returns_future=model_paths.get("returns", fallback_path),
+        arima_weight=float(origin_weights.get("arima", 0.0)),
+        lstm_weight=float(origin_weights.get("lstm", 0.0)),
+        trend_weight=float(origin_weights.get("trend", 0.0)),
+        returns_weight=float(origin_weights.get("returns", 0.0)),
+    )
+
+    return {
+        "weights": origin_weights,
+        "rmse": sanitize_number(math.sqrt(mean_squared_error(test_fold, hybrid_future_fold))),
+        "monotonic": sanitize_number(monotonic_flag(hybrid_future_fold)),
+        "diff_vol_ratio": sanitize_number(
+            diff_vol_ratio(hybrid_future_fold, train_fold, history_window=max(20, min(60, len(train_fold))))
+        ),
+        "sign_flip_rate": sanitize_number(sign_flip_rate(hybrid_future_fold)),
+    }
+
+
+def merge_walk_forward_weights(
+    fold_scores: list[dict[str, Any]],
+    model_keys: list[str],
+    min_floors: dict[str, float],
+) -> dict[str, float]:
+    weight_sums = {key: 0.0 for key in model_keys}
+    weight_counts = {key: 0 for key in model_keys}
+    for fold_score in fold_scores:
+        for model_name, weight in fold_score["weights"].items():
+            weight_sums[model_name] += float(weight)
+            weight_counts[model_name] += 1
+
+    averaged_weights: dict[str, float] = {}
+    for model_name in model_keys:
+        count = int(weight_counts.get(model_name, 0))
+        if count <= 0:
+            averaged_weights[model_name] = 0.0
+        else:
+            averaged_weights[model_name] = sanitize_number(weight_sums[model_name] / float(count))
+
+    avg_total = sum(averaged_weights.values())
+    if avg_total <= 0:
+        equal_weight = 1.0 / float(len(model_keys))
+        averaged_weights = {key: equal_weight for key in model_keys}
+    else:
+        averaged_weights = {key: value / avg_total for key, value in averaged_weights.items()}
+
+    for key, floor in min_floors.items():
+        if key in averaged_weights:
+            averaged_weights[key] = max(float(floor), float(averaged_weights[key]))
+
+    floored_total = sum(averaged_weights.values())
+    if floored_total <= 0:
+        equal_weight = 1.0 / float(len(model_keys))
+        return {key: equal_weight for key in model_keys}
+    return {key: value / floored_total for key, value in averaged_weights.items()}
+
+
+def mean_of_fold_metric(fold_scores: list[dict[str, Any]], key: str) -> float:
+    if not fold_scores:
+        return 0.0
+    return sanitize_number(float(np.mean([float(fold_score[key]) for fold_score in fold_scores])))
 
-    return sorted(selected)
 
+WALK_FORWARD_MODEL_KEYS = ["arima", "lstm", "trend", "returns"]
 
-def walk_forward_weight_selection(
-    values: np.ndarray,
+
+def complete_model_weights(weights: dict[str, float]) -> dict[str, float]:
+    # Models left out by the tier keep an explicit zero weight.
+    return {key: float(weights.get(key, 0.0)) for key in WALK_FORWARD_MODEL_KEYS}
+
+
+def plan_walk_forward(
+    total_len: int,
     future_days: int,
-    forecast_block: int,
     look_back: int,
-    units1: int,
-    units2: int,
     epochs: int,
-    batch_size: int,
-    min_floors: dict[str, float],
-) -> tuple[dict[str, float], dict[str, Any]]:
-    model_keys = ["arima", "lstm", "trend", "returns"]
+    tier: str = "full",
+    walk_forward_mode: str = "all",
+    walk_forward_lstm: str = "fresh",
+) -> dict[str, Any]:
+    tier_settings = ANALYSIS_TIERS[tier]
     horizon = max(1, int(future_days))
-    total_len = int(len(values))
-
     min_train_size = max(70, look_back + 12, horizon * 2)
     origin_step = max(5, min(10, max(5, horizon // 4)))
-    max_origins = 16
+    max_origins = int(tier_settings["max_origins"])
     origins = select_walk_forward_origins(
         total_len=total_len,
         horizon=horizon,
@@ -675,194 +1934,283 @@ def walk_forward_weight_selection(
         look_back=look_back,
     )
 
-    if not origins:
+    lstm_warm_start = bool(tier_settings["lstm_folds"]) and walk_forward_lstm == "warm"
+    if not tier_settings["lstm_folds"]:
+        lstm_origins_target = 0
+    else:
+        lstm_origins_target = len(origins) if lstm_warm_start else min(4, len(origins))
+    lstm_start_idx = max(0, len(origins) - lstm_origins_target)
+    fold_plan = [
+        (fold_idx, origin)
+        for fold_idx, origin in enumerate(origins)
+        if origin > 1 and origin + horizon <= total_len
+    ]
+
+    fold_origins = [origin for _, origin in fold_plan]
+    adaptive = walk_forward_mode == "adaptive"
+    return {
+        "horizon": horizon,
+        "origin_step": origin_step,
+        "origins": origins,
+        "fold_origins": fold_origins,
+        # Order in which folds are computed and scored; adaptive runs start from the most recent.
+        "evaluation_origins": fold_origins[::-1] if adaptive else fold_origins,
+        "adaptive": adaptive,
+        "lstm_fold_origins": [origin for fold_idx, origin in fold_plan if fold_idx >= lstm_start_idx],
+        "lstm_origins_target": lstm_origins_target,
+        "lstm_epochs": max(1, min(6, int(max(1, epochs // 4)))) if lstm_origins_target else 0,
+        "lstm_warm_start": lstm_warm_start,
+        "max_origins": max_origins,
+        "tier": tier,
+        "model_keys": [key for key in WALK_FORWARD_MODEL_KEYS if key != "lstm" or tier_settings["lstm"]],
+        "fixed_arima_folds": bool(tier_settings["fixed_arima_folds"]),
+    }
+
+
+def walk_forward_lstm_fold_path(
+    values: np.ndarray,
+    plan: dict[str, Any],
+    origin: int,
+    forecast_block: int,
+    look_back: int,
+    units1: int,
+    units2: int,
+    batch_size: int,
+    lstm_engine: str | None = None,
+    warm_start: dict[str, Any] | None = None,
+) -> np.ndarray:
+    horizon = plan["horizon"]
+    train_fold = np.array(values[:origin], dtype=float)
+    fold_max_look_back = max(10, min(60, len(train_fold) // 4))
+    fold_look_back = max(5, min(look_back, fold_max_look_back))
+    with timed_stage("walk_forward_lstm_fold"):
+        _, lstm_future_fold, _ = run_lstm(
+            train_fold,
+            np.empty((0,), dtype=float),
+            train_fold,
+            fold_look_back,
+            units1,
+            units2,
+            plan["lstm_epochs"],
+            batch_size,
+            horizon,
+            forecast_block,
+            engine=lstm_engine,
+            warm_start=warm_start,
+        )
+    return sanitize_future_path(lstm_future_fold, horizon, float(train_fold[-1]))
+
+
+def report_walk_forward_lstm_progress(plan: dict[str, Any], done: int) -> None:
+    report_progress(
+        "walk_forward_lstm",
+        f"walk-forward LSTM fold {done}/{plan['lstm_origins_target']}",
+        fold=done,
+        folds=plan["lstm_origins_target"],
+    )
+
+
+def walk_forward_lstm_paths(
+    values: np.ndarray,
+    plan: dict[str, Any],
+    forecast_block: int,
+    look_back: int,
+    units1: int,
+    units2: int,
+    batch_size: int,
+    lstm_engine: str | None = None,
+) -> Callable[[int], np.ndarray | None]:
+    # The LSTM fold path of an origin, or None; fresh adaptive folds train only when scored.
+    fold_args = (forecast_block, look_back, units1, units2, batch_size, lstm_engine)
+    lstm_fold_origins = set(plan["lstm_fold_origins"])
+    if plan["adaptive"] and not plan["lstm_warm_start"]:
+        trained = [0]
+
+        def lazy_lstm_path(origin: int) -> np.ndarray | None:
+            if origin not in lstm_fold_origins:
+                return None
+            with tf_section():
+                path = walk_forward_lstm_fold_path(values, plan, origin, *fold_args)
+            trained[0] += 1
+            report_walk_forward_lstm_progress(plan, trained[0])
+            return path
+
+        return lazy_lstm_path
+
+    lstm_paths: dict[int, np.ndarray] = {}
+    warm_start: dict[str, Any] | None = {} if plan["lstm_warm_start"] else None
+    for origin in plan["lstm_fold_origins"]:
+        lstm_paths[origin] = walk_forward_lstm_fold_path(values, plan, origin, *fold_args, warm_start=warm_start)
+        report_walk_forward_lstm_progress(plan, len(lstm_paths))
+    return lstm_paths.get
+
+
+def finish_walk_forward(
+    values: np.ndarray,
+    plan: dict[str, Any],
+    statistical_paths: list[dict[str, np.ndarray]],
+    lstm_path: Callable[[int], np.ndarray | None],
+    min_floors: dict[str, float],
+    started: float | None = None,
+) -> tuple[dict[str, float], dict[str, Any]]:
+    # started: perf_counter() at the beginning of the walk-forward, the origin of the time budget.
+    model_keys = plan["model_keys"]
+    horizon = plan["horizon"]
+
+    if not plan["origins"]:
+        record_analysis_state(plan=plan, fold_scores=[])
         equal_weight = 1.0 / float(len(model_keys))
         return (
-            {key: equal_weight for key in model_keys},
+            complete_model_weights({key: equal_weight for key in model_keys}),
             {
                 "origins": 0,
                 "rmse_mean": 0.0,
                 "monotonic_rate": 0.0,
                 "diff_vol_ratio_mean": 0.0,
                 "sign_flip_rate_mean": 0.0,
-                "origin_step": int(origin_step),
+                "origin_step": int(plan["origin_step"]),
                 "horizon": int(horizon),
                 "lstm_origins": 0,
                 "lstm_epochs": 0,
+                "lstm_warm_start": bool(plan["lstm_warm_start"]),
+                "origins_planned": 0,
+                "mode": "adaptive" if plan["adaptive"] else "all",
+                "stopped": None,
             },
         )
 
-    lstm_origins_target = min(4, len(origins))
-    lstm_start_idx = max(0, len(origins) - lstm_origins_target)
-    lstm_epochs = max(1, min(6, int(max(1, epochs // 4))))
-
-    rmse_weight = 0.62
-    flatness_weight = 0.2
-    monotonic_weight = 0.12
-    zigzag_weight = 0.06
-    monotonic_penalty_value = 1.35
-    zigzag_threshold = 0.7
-    zigzag_scale = 1.5
-    zigzag_penalty_cap = 1.75
-
-    weight_sums = {key: 0.0 for key in model_keys}
-    weight_counts = {key: 0 for key in model_keys}
-    origin_rmse_values: list[float] = []
-    origin_monotonic_flags: list[float] = []
-    origin_diff_vol_ratios: list[float] = []
-    origin_sign_flip_rates: list[float] = []
-    lstm_used = 0
-
-    empty_test = np.empty((0,), dtype=float)
+    start = time.perf_counter() if started is None else started
+    scored: list[tuple[int, dict[str, Any]]] = []
+    moments: dict[str, tuple[int, float, float]] = {}
+    lstm_origins = 0
+    stopped = None
+    # statistical_paths may be lazy: folds after an adaptive stop are never computed.
+    for origin, model_paths in zip(plan["evaluation_origins"], statistical_paths):
+        model_paths = dict(model_paths)
+        lstm_fold_path = lstm_path(origin)
+        if lstm_fold_path is not None:
+            model_paths["lstm"] = lstm_fold_path
+            lstm_origins += 1
 
-    for fold_idx, origin in enumerate(origins):
         train_fold = np.array(values[:origin], dtype=float)
         test_fold = np.array(values[origin : origin + horizon], dtype=float)
-        if len(train_fold) <= 1 or len(test_fold) != horizon:
-            continue
-
-        last_value = float(train_fold[-1])
-        model_paths: dict[str, np.ndarray] = {}
-
-        _, arima_future_fold, _ = run_arima(train_fold, empty_test, horizon, forecast_block)
-        model_paths["arima"] = sanitize_future_path(arima_future_fold, horizon, last_value)
-
-        _, trend_future_fold, _ = run_trend_baseline(train_fold, empty_test, horizon, forecast_block)
-        model_paths["trend"] = sanitize_future_path(trend_future_fold, horizon, last_value)
-
-        _, returns_future_fold, _ = run_returns_baseline(train_fold, empty_test, horizon, forecast_block)
-        model_paths["returns"] = sanitize_future_path(returns_future_fold, horizon, last_value)
-
-        evaluate_lstm = fold_idx >= lstm_start_idx
-        if evaluate_lstm:
-            fold_max_look_back = max(10, min(60, len(train_fold) // 4))
-            fold_look_back = max(5, min(look_back, fold_max_look_back))
-            _, lstm_future_fold, _ = run_lstm(
-                train_fold,
-                empty_test,
-                train_fold,
-                fold_look_back,
-                units1,
-                units2,
-                lstm_epochs,
-                batch_size,
-                horizon,
-                forecast_block,
-            )
-            model_paths["lstm"] = sanitize_future_path(lstm_future_fold, horizon, last_value)
-            lstm_used += 1
-
-        rmse_values: dict[str, float] = {}
-        flatness_values: dict[str, float] = {}
-        monotonic_values: dict[str, float] = {}
-        zigzag_values: dict[str, float] = {}
-
-        for model_name, pred in model_paths.items():
-            rmse = sanitize_number(math.sqrt(mean_squared_error(test_fold, pred)))
-            flatness = sanitize_number(flatness_penalty(test_fold, pred))
-            is_monotonic = monotonic_flag(pred)
-            flip_rate = sign_flip_rate(pred)
-
-            monotonic_penalty = monotonic_penalty_value if is_monotonic >= 1.0 else 1.0
-            zigzag_penalty = 1.0
-            if flip_rate > zigzag_threshold:
-                zigzag_penalty += (float(flip_rate) - zigzag_threshold) * zigzag_scale
-            zigzag_penalty = min(zigzag_penalty_cap, zigzag_penalty)
-
-            rmse_values[model_name] = rmse
-            flatness_values[model_name] = flatness
-            monotonic_values[model_name] = sanitize_number(monotonic_penalty)
-            zigzag_values[model_name] = sanitize_number(zigzag_penalty)
-
-        rmse_norm = min_max_normalize(rmse_values)
-        flatness_norm = min_max_normalize(flatness_values)
-        monotonic_norm = min_max_normalize(monotonic_values)
-        zigzag_norm = min_max_normalize(zigzag_values)
-
-        composite_scores: dict[str, float] = {}
-        for model_name in model_paths.keys():
-            score = (
-                rmse_weight * rmse_norm.get(model_name, 0.0)
-                + flatness_weight * flatness_norm.get(model_name, 0.0)
-                + monotonic_weight * monotonic_norm.get(model_name, 0.0)
-                + zigzag_weight * zigzag_norm.get(model_name, 0.0)
-            )
-            composite_scores[model_name] = sanitize_number(max(0.0, score))
-
-        origin_weights = ensemble_weights_from_rmse(composite_scores, min_weight=0.0)
-        if not origin_weights:
-            continue
-
-        for model_name, weight in origin_weights.items():
-            weight_sums[model_name] += float(weight)
-            weight_counts[model_name] += 1
-
-        fallback_path = np.full(horizon, last_value, dtype=float)
-        hybrid_future_fold = build_hybrid_future_levels(
-            last_close=last_value,
-            history=train_fold,
-            horizon=horizon,
-            arima_future=model_paths.get("arima", fallback_path),
-            lstm_future=model_paths.get("lstm", fallback_path),
-            trend_future=model_paths.get("trend", fallback_path),
-            returns_future=model_paths.get("returns", fallback_path),
-            arima_weight=float(origin_weights.get("arima", 0.0)),
-            lstm_weight=float(origin_weights.get("lstm", 0.0)),
-            trend_weight=float(origin_weights.get("trend", 0.0)),
-            returns_weight=float(origin_weights.get("returns", 0.0)),
-        )
-
-        fold_rmse = sanitize_number(math.sqrt(mean_squared_error(test_fold, hybrid_future_fold)))
-        fold_monotonic = sanitize_number(monotonic_flag(hybrid_future_fold))
-        fold_diff_vol_ratio = sanitize_number(
-            diff_vol_ratio(hybrid_future_fold, train_fold, history_window=max(20, min(60, len(train_fold))))
-        )
-        fold_sign_flip_rate = sanitize_number(sign_flip_rate(hybrid_future_fold))
+        fold_score = score_walk_forward_fold(train_fold, test_fold, model_paths, horizon)
+        if fold_score is not None:
+            scored.append((origin, fold_score))
+            track_weight_moments(moments, fold_score["weights"])
+        if plan["adaptive"]:
+            stopped = walk_forward_stop_reason(moments, len(scored), time.perf_counter() - start)
+            if stopped is not None:
+                break
 
-        origin_rmse_values.append(fold_rmse)
-        origin_monotonic_flags.append(fold_monotonic)
-        origin_diff_vol_ratios.append(fold_diff_vol_ratio)
-        origin_sign_flip_rates.append(fold_sign_flip_rate)
+    fold_scores = [fold_score for _, fold_score in sorted(scored, key=lambda item: item[0])]
+    record_analysis_state(plan=plan, fold_scores=fold_scores)
+    final_weights = complete_model_weights(merge_walk_forward_weights(fold_scores, model_keys, min_floors))
+    return final_weights, summarize_walk_forward(plan, fold_scores, lstm_origins, stopped)
+
+
+def track_weight_moments(moments: dict[str, tuple[int, float, float]], weights: dict[str, float]) -> None:
+    # Welford's running mean and sum of squared deviations per model.
+    for model_name, weight in weights.items():
+        count, mean, m2 = moments.get(model_name, (0, 0.0, 0.0))
+        count += 1
+        delta = float(weight) - mean
+        mean += delta / count
+        m2 += delta * (float(weight) - mean)
+        moments[model_name] = (count, mean, m2)
+
+
+def walk_forward_stop_reason(
+    moments: dict[str, tuple[int, float, float]],
+    folds: int,
+    elapsed: float,
+) -> str | None:
+    if WALK_FORWARD_TIME_BUDGET_S > 0 and folds > 0 and elapsed >= WALK_FORWARD_TIME_BUDGET_S:
+        return "time_budget"
+    if folds < WALK_FORWARD_MIN_ORIGINS:
+        return None
+    # Standard error of each model's mean weight; models seen in a single fold have none yet.
+    errors = [math.sqrt(m2 / (count - 1) / count) for count, _, m2 in moments.values() if count >= 2]
+    if errors and max(errors) <= WALK_FORWARD_TOLERANCE:
+        return "converged"
+    return None
+
+
+def summarize_walk_forward(
+    plan: dict[str, Any],
+    fold_scores: list[dict[str, Any]],
+    lstm_origins: int,
+    stopped: str | None = None,
+) -> dict[str, Any]:
+    return {
+        "origins": int(len(fold_scores)),
+        "rmse_mean": mean_of_fold_metric(fold_scores, "rmse"),
+        "monotonic_rate": mean_of_fold_metric(fold_scores, "monotonic"),
+        "diff_vol_ratio_mean": mean_of_fold_metric(fold_scores, "diff_vol_ratio"),
+        "sign_flip_rate_mean": mean_of_fold_metric(fold_scores, "sign_flip_rate"),
+        "origin_step": int(plan["origin_step"]),
+        "horizon": int(plan["horizon"]),
+        "lstm_origins": int(lstm_origins),
+        "lstm_epochs": int(plan["lstm_epochs"]),
+        "lstm_warm_start": bool(plan["lstm_warm_start"]),
+        "origins_planned": int(len(plan["fold_origins"])),
+        "mode": "adaptive" if plan["adaptive"] else "all",
+        "stopped": stopped,
+    }
 
-    averaged_weights: dict[str, float] = {}
-    for model_name in model_keys:
-        count = int(weight_counts.get(model_name, 0))
-        if count <= 0:
-            averaged_weights[model_name] = 0.0
-        else:
-            averaged_weights[model_name] = sanitize_number(weight_sums[model_name] / float(count))
 
-    avg_total = sum(averaged_weights.values())
-    if avg_total <= 0:
-        equal_weight = 1.0 / float(len(model_keys))
-        averaged_weights = {key: equal_weight for key in model_keys}
-    else:
-        averaged_weights = {key: value / avg_total for key, value in averaged_weights.items()}
+def walk_forward_weight_selection(
+    values: np.ndarray,
+    future_days: int,
+    forecast_block: int,
+    look_back: int,
+    units1: int,
+    units2: int,
+    epochs: int,
+    batch_size: int,
+    min_floors: dict[str, float],
+    lstm_engine: str | None = None,
+    arima_update: str | None = None,
+    tier: str = "full",
+    walk_forward_mode: str = "all",
+    walk_forward_lstm: str = "fresh",
+) -> tuple[dict[str, float], dict[str, Any]]:
+    plan = plan_walk_forward(
+        int(len(values)), future_days, look_back, epochs, tier, walk_forward_mode, walk_forward_lstm
+    )
 
-    for key, floor in min_floors.items():
-        averaged_weights[key] = max(float(floor), float(averaged_weights.get(key, 0.0)))
+    with walk_forward_statistical_source(values, plan, forecast_block, arima_update) as statistical_paths:
+        # The statistical folds run on the pool while the LSTM folds train here.
+        started = time.perf_counter()
+        with tf_section(bool(plan["lstm_fold_origins"])):
+            lstm_path = walk_forward_lstm_paths(
+                values, plan, forecast_block, look_back, units1, units2, batch_size, lstm_engine
+            )
+        return finish_walk_forward(values, plan, statistical_paths(), lstm_path, min_floors, started)
 
-    floored_total = sum(averaged_weights.values())
-    if floored_total <= 0:
-        equal_weight = 1.0 / float(len(model_keys))
-        final_weights = {key: equal_weight for key in model_keys}
-    else:
-        final_weights = {key: value / floored_total for key, value in averaged_weights.items()}
-
-    evaluated_origins = len(origin_rmse_values)
-    walk_forward_summary = {
-        "origins": int(evaluated_origins),
-        "rmse_mean": sanitize_number(float(np.mean(origin_rmse_values))) if origin_rmse_values else 0.0,
-        "monotonic_rate": sanitize_number(float(np.mean(origin_monotonic_flags))) if origin_monotonic_flags else 0.0,
-        "diff_vol_ratio_mean": sanitize_number(float(np.mean(origin_diff_vol_ratios))) if origin_diff_vol_ratios else 0.0,
-        "sign_flip_rate_mean": sanitize_number(float(np.mean(origin_sign_flip_rates))) if origin_sign_flip_rates else 0.0,
-        "origin_step": int(origin_step),
-        "horizon": int(horizon),
-        "lstm_origins": int(lstm_used),
-        "lstm_epochs": int(lstm_epochs),
-    }
 
-    return final_weights, walk_forward_summary
+@contextmanager
+def walk_forward_statistical_source(
+    values: np.ndarray,
+    plan: dict[str, Any],
+    forecast_block: int,
+    arima_update: str | None,
+) -> Iterator[Callable[[], Iterator[dict[str, np.ndarray]]]]:
+    # The statistical fold paths of a plan, lazily and in plan["evaluation_origins"] order.
+    if plan["fixed_arima_folds"]:
+        yield lambda: iter_walk_forward_fixed_arima_paths(
+            values, plan["evaluation_origins"], plan["horizon"], forecast_block
+        )
+        return
+    with walk_forward_statistical_paths_pool(
+        values,
+        plan["evaluation_origins"],
+        plan["horizon"],
+        forecast_block,
+        arima_update,
+        ahead=ML_PROCESS_WORKERS if plan["adaptive"] else None,
+    ) as collect_statistical_paths:
+        yield collect_statistical_paths
 
 
 def align_forecast_to_last_value(forecast: np.ndarray, last_value: float, half_life: float = 6.0) -> np.ndarray:
@@ -1073,9 +2421,16 @@ def build_hybrid_future_levels(
     return levels
 
 
-def analyze(payload: dict[str, Any]) -> dict[str, Any]:
-    closes = to_float_list(payload.get("close", []))
-    dates = payload.get("dates", [])
+HYBRID_MIN_FLOORS = {
+    "arima": 0.1,
+    "lstm": 0.1,
+    "trend": 0.2,
+    "returns": 0.2,
+}
+
+
+def parse_analysis_options(payload: dict[str, Any]) -> dict[str, Any]:
+    closes = to_float_array(payload.get("close", []))
     params = payload.get("params", {})
 
     if len(closes) < 120:
@@ -1089,32 +2444,301 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
     batch_size = int(params.get("batch_size", 32) or 32)
     future_days = int(payload.get("days", 30) or 30)
     include_forecast = bool(payload.get("include_forecast", True))
-    forecast_horizon = future_days if include_forecast else 0
     forecast_block = int(params.get("forecast_block", 5) or 5)
     forecast_block = max(1, min(forecast_block, 5))
 
+    tier = resolve_analysis_tier(params.get("tier"))
     values = np.array(closes, dtype=float)
     train_size = int(len(values) * 0.8)
-    train = values[:train_size]
-    test = values[train_size:]
-    max_look_back = max(20, min(60, len(train) // 4))
+    max_look_back = max(20, min(60, train_size // 4))
     look_back = max(10, min(look_back, max_look_back))
 
-    arima_test, arima_future, arima_time = run_arima(train, test, forecast_horizon, forecast_block)
-    lstm_test, lstm_future, lstm_time = run_lstm(
-        train,
-        test,
+    return {
+        "values": values,
+        "dates": payload.get("dates", []),
+        "train_size": train_size,
+        "look_back": look_back,
+        "units1": units1,
+        "units2": units2,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "future_days": future_days,
+        "include_forecast": include_forecast,
+        "forecast_horizon": future_days if include_forecast else 0,
+        "forecast_block": forecast_block,
+        "lstm_engine": resolve_lstm_engine(params.get("inference_engine")),
+        "arima_update": resolve_arima_update_mode(params.get("arima_update") or ANALYSIS_TIERS[tier]["arima_update"]),
+        "tier": tier,
+        "use_lstm": bool(ANALYSIS_TIERS[tier]["lstm"]),
+        "stationarity_lag": resolve_stationarity_lag_mode(
+            params.get("stationarity_lag") or ANALYSIS_TIERS[tier]["stationarity_lag"]
+        ),
+        "stationarity_window": resolve_stationarity_window(params.get("stationarity_window")),
+        "walk_forward_mode": resolve_walk_forward_mode(params.get("walk_forward")),
+        "walk_forward_lstm": resolve_walk_forward_lstm_mode(params.get("walk_forward_lstm")),
+    }
+
+
+def run_options_lstm(options: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, float]:
+    values = options["values"]
+    train_size = options["train_size"]
+    fit_state: dict[str, Any] = {}
+    lstm_run = run_lstm(
+        values[:train_size],
+        values[train_size:],
         values,
-        look_back,
-        units1,
-        units2,
-        epochs,
-        batch_size,
-        forecast_horizon,
-        forecast_block,
+        options["look_back"],
+        options["units1"],
+        options["units2"],
+        options["epochs"],
+        options["batch_size"],
+        options["forecast_horizon"],
+        options["forecast_block"],
+        engine=options["lstm_engine"],
+        fit_state=fit_state,
+    )
+    record_analysis_state(lstm=fit_state or None)
+    return lstm_run
+
+
+def run_options_stationarity(options: dict[str, Any]) -> dict[str, Any]:
+    return stationarity_report(options["values"], options["stationarity_lag"], options["stationarity_window"])
+
+
+def plan_options_walk_forward(options: dict[str, Any]) -> dict[str, Any]:
+    return plan_walk_forward(
+        int(len(options["values"])),
+        options["future_days"],
+        options["look_back"],
+        options["epochs"],
+        options["tier"],
+        options["walk_forward_mode"],
+        options["walk_forward_lstm"],
+    )
+
+
+def run_options_walk_forward_lstm(
+    options: dict[str, Any], plan: dict[str, Any]
+) -> Callable[[int], np.ndarray | None]:
+    return walk_forward_lstm_paths(
+        options["values"],
+        plan,
+        options["forecast_block"],
+        options["look_back"],
+        options["units1"],
+        options["units2"],
+        options["batch_size"],
+        options["lstm_engine"],
+    )
+
+
+def run_options_lstm_and_walk_forward(
+    options: dict[str, Any],
+    run_final_lstm: Callable[[], tuple[np.ndarray, np.ndarray, float]] | None,
+) -> tuple[tuple[np.ndarray, np.ndarray, float] | None, dict[str, float], dict[str, Any]]:
+    # The LSTM trainings share one TF section; the statistical folds run outside it.
+    plan = plan_options_walk_forward(options)
+    with walk_forward_statistical_source(
+        options["values"], plan, options["forecast_block"], options["arima_update"]
+    ) as statistical_paths:
+        lstm_run = None
+        with tf_section(run_final_lstm is not None or bool(plan["lstm_fold_origins"])):
+            if run_final_lstm is not None:
+                lstm_run = run_final_lstm()
+                report_progress("lstm", "LSTM done", seconds=sanitize_number(lstm_run[2]))
+            walk_forward_started = time.perf_counter()
+            lstm_path = run_options_walk_forward_lstm(options, plan)
+        weights, walk_forward_summary = finish_walk_forward(
+            options["values"], plan, statistical_paths(), lstm_path, HYBRID_MIN_FLOORS, walk_forward_started
+        )
+    return lstm_run, weights, walk_forward_summary
+
+
+def build_future_forecast(
+    payload: dict[str, Any],
+    values: np.ndarray,
+    future_days: int,
+    future_paths: dict[str, np.ndarray],
+    weights: dict[str, float],
+    residual_std: float,
+) -> tuple[dict[str, Any], np.ndarray]:
+    future_dates = payload.get("future_dates") or []
+    if len(future_dates) != future_days:
+        future_dates = [f"D+{i + 1}" for i in range(future_days)]
+
+    last_close = float(values[-1]) if len(values) else 0.0
+    hybrid_future_levels = build_hybrid_future_levels(
+        last_close=last_close,
+        history=values,
+        horizon=future_days,
+        arima_future=future_paths["arima"],
+        lstm_future=future_paths["lstm"],
+        trend_future=future_paths["trend"],
+        returns_future=future_paths["returns"],
+        arima_weight=weights.get("arima", 0.25),
+        lstm_weight=weights.get("lstm", 0.25),
+        trend_weight=weights.get("trend", 0.25),
+        returns_weight=weights.get("returns", 0.25),
     )
-    trend_test, trend_future, trend_time = run_trend_baseline(train, test, forecast_horizon, forecast_block)
-    returns_test, returns_future, returns_time = run_returns_baseline(train, test, forecast_horizon, forecast_block)
+
+    if not math.isfinite(residual_std) or residual_std <= 1e-8:
+        residual_std = 1.0
+    lower, upper = moving_confidence_bounds(hybrid_future_levels, residual_std)
+
+    forecast = {
+        "dates": future_dates,
+        "hybrid": sanitize_list(hybrid_future_levels),
+        "arima": sanitize_list(future_paths["arima"]),
+        "conf_int_lower": sanitize_list(lower),
+        "conf_int_upper": sanitize_list(upper),
+    }
+    return forecast, hybrid_future_levels
+
+
+def hybrid_weights_summary(weights: dict[str, float]) -> dict[str, float]:
+    return {
+        "arima": sanitize_number(weights.get("arima", 0.25)),
+        "lstm": sanitize_number(weights.get("lstm", 0.25)),
+        "trend": sanitize_number(weights.get("trend", 0.25)),
+        "returns": sanitize_number(weights.get("returns", 0.25)),
+    }
+
+
+def analyze(payload: dict[str, Any]) -> dict[str, Any]:
+    with lstm_cache_scope() as cache_stats, analysis_state_scope() as recorded:
+        result = _analyze(payload)
+    result["lstm_cache"] = lstm_cache_summary(cache_stats)
+    result["analysis_id"] = remember_analysis(recorded)
+    return result
+
+
+def _analyze(payload: dict[str, Any]) -> dict[str, Any]:
+    options = parse_analysis_options(payload)
+    record_analysis_state(options=options)
+    values = options["values"]
+    train_size = options["train_size"]
+    forecast_horizon = options["forecast_horizon"]
+    forecast_block = options["forecast_block"]
+
+    train = values[:train_size]
+    test = values[train_size:]
+    plan = plan_options_walk_forward(options)
+
+    def run_arima_stage(_: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, float]:
+        fit_state: dict[str, Any] = {}
+        arima_run = run_arima(
+            train, test, forecast_horizon, forecast_block, update_mode=options["arima_update"], fit_state=fit_state
+        )
+        record_analysis_state(arima=fit_state.get("fitted"), arima_seen=fit_state.get("seen", 0))
+        report_progress("arima", "ARIMA done", seconds=sanitize_number(arima_run[2]))
+        return arima_run
+
+    def run_baselines_stage(_: dict[str, Any]) -> dict[str, tuple[np.ndarray, np.ndarray, float]]:
+        baseline_runs = {
+            "trend": run_trend_baseline(train, test, forecast_horizon, forecast_block),
+            "returns": run_returns_baseline(train, test, forecast_horizon, forecast_block),
+        }
+        report_progress(
+            "baselines",
+            "baselines done",
+            seconds=sanitize_number(baseline_runs["trend"][2] + baseline_runs["returns"][2]),
+        )
+        return baseline_runs
+
+    def run_lstm_stage(
+        _: dict[str, Any],
+    ) -> tuple[tuple[np.ndarray, np.ndarray, float] | None, Callable[[int], np.ndarray | None], float]:
+        # Adaptive runs train their LSTM folds later, from the walk_forward stage.
+        lstm_run = None
+        if options["use_lstm"]:
+            lstm_run = run_options_lstm(options)
+            report_progress("lstm", "LSTM done", seconds=sanitize_number(lstm_run[2]))
+        walk_forward_started = time.perf_counter()
+        return lstm_run, run_options_walk_forward_lstm(options, plan), walk_forward_started
+
+    def run_stationarity_stage(_: dict[str, Any]) -> dict[str, Any]:
+        stationarity = run_options_stationarity(options)
+        report_progress("stationarity", "stationarity tests done")
+        return stationarity
+
+    with walk_forward_statistical_source(values, plan, forecast_block, options["arima_update"]) as statistical_paths:
+        # Adaptive runs score folds as they arrive; otherwise the statistics are a stage of their own.
+        eager_statistics = not plan["adaptive"]
+
+        def run_walk_forward_stage(results: dict[str, Any]) -> tuple[dict[str, float], dict[str, Any]]:
+            paths = results["walk_forward_statistics"] if eager_statistics else statistical_paths()
+            _, lstm_path, walk_forward_started = results["lstm"]
+            weights, walk_forward_summary = finish_walk_forward(
+                values, plan, paths, lstm_path, HYBRID_MIN_FLOORS, walk_forward_started
+            )
+            report_progress(
+                "walk_forward",
+                "walk-forward done",
+                hybrid_weights=hybrid_weights_summary(weights),
+                walk_forward=walk_forward_summary,
+            )
+            return weights, walk_forward_summary
+
+        stages = [
+            {"name": "arima", "resource": "thread", "after": [], "run": run_arima_stage},
+            {"name": "baselines", "resource": "thread", "after": [], "run": run_baselines_stage},
+            {"name": "lstm", "resource": "tf" if options["use_lstm"] else "thread", "after": [], "run": run_lstm_stage},
+        ]
+        if eager_statistics:
+            pooled = get_process_pool() is not None and not plan["fixed_arima_folds"]
+            stages.append(
+                {
+                    "name": "walk_forward_statistics",
+                    "resource": "process_pool" if pooled else "thread",
+                    "after": [],
+                    "run": lambda _: list(statistical_paths()),
+                }
+            )
+        stages += [
+            {"name": "stationarity", "resource": "thread", "after": [], "run": run_stationarity_stage},
+            {
+                "name": "walk_forward",
+                "resource": "thread",
+                "after": ["lstm", "walk_forward_statistics"] if eager_statistics else ["lstm"],
+                "run": run_walk_forward_stage,
+            },
+        ]
+        results, timeline = run_stage_graph(stages)
+
+    lstm_run, _, _ = results["lstm"]
+    model_runs = {"arima": results["arima"], **results["baselines"]}
+    if lstm_run is not None:
+        model_runs["lstm"] = lstm_run
+    weights, walk_forward_summary = results["walk_forward"]
+    result = assemble_analysis(payload, options, model_runs, weights, walk_forward_summary, results["stationarity"])
+    result["timeline"] = timeline
+    return result
+
+
+def assemble_analysis(
+    payload: dict[str, Any],
+    options: dict[str, Any],
+    model_runs: dict[str, tuple[np.ndarray, np.ndarray, float]],
+    weights: dict[str, float],
+    walk_forward_summary: dict[str, Any],
+    stationarity: dict[str, Any],
+) -> dict[str, Any]:
+    values = options["values"]
+    dates = options["dates"]
+    train_size = options["train_size"]
+    future_days = options["future_days"]
+    test = values[train_size:]
+    has_lstm = "lstm" in model_runs
+
+    arima_test, arima_future, arima_time = model_runs["arima"]
+    trend_test, trend_future, trend_time = model_runs["trend"]
+    returns_test, returns_future, returns_time = model_runs["returns"]
+    if has_lstm:
+        lstm_test, lstm_future, lstm_time = model_runs["lstm"]
+    else:
+        # Tier without LSTM: its weight is zero, so a flat path never enters the hybrid.
+        last_close = float(values[-1]) if len(values) else 0.0
+        lstm_test, lstm_future, lstm_time = np.full(len(test), last_close), np.full(len(arima_future), last_close), 0.0
 
     min_len = min(len(test), len(arima_test), len(lstm_test), len(trend_test), len(returns_test))
     if min_len <= 0:
@@ -1127,29 +2751,11 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
     returns_pred = returns_test[:min_len]
 
     weight_window = max(10, min(30, min_len))
-    min_floors = {
-        "arima": 0.1,
-        "lstm": 0.1,
-        "trend": 0.2,
-        "returns": 0.2,
-    }
-    weights, walk_forward_summary = walk_forward_weight_selection(
-        values=values,
-        future_days=future_days,
-        forecast_block=forecast_block,
-        look_back=look_back,
-        units1=units1,
-        units2=units2,
-        epochs=epochs,
-        batch_size=batch_size,
-        min_floors=min_floors,
-    )
 
     arima_weight = weights.get("arima", 0.25)
-    lstm_weight = weights.get("lstm", 0.25)
+    lstm_weight = weights.get("lstm", 0.25) if has_lstm else 0.0
     trend_weight = weights.get("trend", 0.25)
     returns_weight = weights.get("returns", 0.25)
-
     hybrid_pred = (
         arima_pred * arima_weight
         + lstm_pred * lstm_weight
@@ -1158,23 +2764,23 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
     )
 
     arima_metrics = evaluate_model("ARIMA", y_true, arima_pred, arima_time)
-    lstm_metrics = evaluate_model("LSTM", y_true, lstm_pred, lstm_time)
+    lstm_metrics = evaluate_model("LSTM", y_true, lstm_pred, lstm_time) if has_lstm else None
     hybrid_metrics = evaluate_model(
         "Гибридная",
         y_true,
         hybrid_pred,
         arima_time + lstm_time + trend_time + returns_time,
     )
-    metrics = [arima_metrics, lstm_metrics, hybrid_metrics]
+    metrics = [arima_metrics, lstm_metrics, hybrid_metrics] if has_lstm else [arima_metrics, hybrid_metrics]
     best_model = min(metrics, key=lambda row: row["RMSE"])["Model"]
 
     test_dates = dates[train_size : train_size + min_len]
     predictions = {
         "dates": test_dates,
-        "actual": [sanitize_number(v) for v in y_true.tolist()],
-        "arima": [sanitize_number(v) for v in arima_pred.tolist()],
-        "lstm": [sanitize_number(v) for v in lstm_pred.tolist()],
-        "hybrid": [sanitize_number(v) for v in hybrid_pred.tolist()],
+        "actual": sanitize_list(y_true),
+        "arima": sanitize_list(arima_pred),
+        "lstm": sanitize_list(lstm_pred) if has_lstm else [None] * min_len,
+        "hybrid": sanitize_list(hybrid_pred),
     }
 
     history_window = max(20, min(60, len(values)))
@@ -1186,38 +2792,16 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
         "diff_vol_ratio": 0.0,
         "sign_flip_rate": 0.0,
     }
-    if include_forecast and future_days > 0:
-        future_dates = payload.get("future_dates") or []
-        if len(future_dates) != future_days:
-            future_dates = [f"D+{i + 1}" for i in range(future_days)]
-
-        last_close = float(values[-1]) if len(values) else 0.0
-        hybrid_future_levels = build_hybrid_future_levels(
-            last_close=last_close,
-            history=values,
-            horizon=future_days,
-            arima_future=arima_future,
-            lstm_future=lstm_future,
-            trend_future=trend_future,
-            returns_future=returns_future,
-            arima_weight=arima_weight,
-            lstm_weight=lstm_weight,
-            trend_weight=trend_weight,
-            returns_weight=returns_weight,
-        )
-
+    if options["include_forecast"] and future_days > 0:
         residual_std = float(np.std(y_true - hybrid_pred)) if len(y_true) else 1.0
-        if not math.isfinite(residual_std) or residual_std <= 1e-8:
-            residual_std = 1.0
-        lower, upper = moving_confidence_bounds(hybrid_future_levels, residual_std)
-
-        forecast = {
-            "dates": future_dates,
-            "hybrid": [sanitize_number(v) for v in hybrid_future_levels.tolist()],
-            "arima": [sanitize_number(v) for v in arima_future.tolist()],
-            "conf_int_lower": [sanitize_number(v) for v in lower],
-            "conf_int_upper": [sanitize_number(v) for v in upper],
-        }
+        forecast, hybrid_future_levels = build_future_forecast(
+            payload,
+            values,
+            future_days,
+            {"arima": arima_future, "lstm": lstm_future, "trend": trend_future, "returns": returns_future},
+            weights,
+            residual_std,
+        )
 
         future_realism_metrics = {
             "monotonic_flag": sanitize_number(monotonic_flag(hybrid_future_levels)),
@@ -1243,6 +2827,7 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
 
     return {
         "success": True,
+        "tier": options["tier"],
         "data_info": {
             "total_records": int(len(values)),
             "train_records": int(train_size),
@@ -1251,23 +2836,522 @@ def analyze(payload: dict[str, Any]) -> dict[str, Any]:
         "comparison_table": metrics,
         "best_model": best_model,
         "predictions": predictions,
-        "stationarity": stationarity_report(values),
+        "stationarity": stationarity,
         "forecast": forecast,
         "realism_metrics": realism_metrics,
         "walk_forward": walk_forward_summary,
-        "hybrid_weights": {
-            "arima": sanitize_number(arima_weight),
-            "lstm": sanitize_number(lstm_weight),
-            "trend": sanitize_number(trend_weight),
-            "returns": sanitize_number(returns_weight),
+        "hybrid_weights": hybrid_weights_summary(weights),
+    }
+
+
+def forecast_future(payload: dict[str, Any]) -> dict[str, Any]:
+    with lstm_cache_scope() as cache_stats, analysis_state_scope() as recorded:
+        result = _forecast_future(payload)
+    result["lstm_cache"] = lstm_cache_summary(cache_stats)
+    result["analysis_id"] = remember_analysis(recorded)
+    return result
+
+
+def _forecast_future(payload: dict[str, Any]) -> dict[str, Any]:
+    # Only the future paths and walk-forward weights of analyze(); no test-set runs or stationarity.
+    options = parse_analysis_options(payload)
+    record_analysis_state(options=options)
+    values = options["values"]
+    future_days = options["future_days"]
+    forecast_horizon = options["forecast_horizon"]
+    forecast_block = options["forecast_block"]
+    empty_test = np.empty((0,), dtype=float)
+
+    # Same call order and training slices as analyze(), so the LSTM matches (and hits its cache entry).
+    arima_state: dict[str, Any] = {}
+    _, arima_future, _ = run_arima(
+        values,
+        empty_test,
+        forecast_horizon,
+        forecast_block,
+        update_mode=options["arima_update"],
+        fit_state=arima_state,
+    )
+    record_analysis_state(arima=arima_state.get("fitted"), arima_seen=arima_state.get("seen", 0))
+    report_progress("arima", "ARIMA done")
+    _, trend_future, _ = run_trend_baseline(values, empty_test, forecast_horizon, forecast_block)
+    _, returns_future, _ = run_returns_baseline(values, empty_test, forecast_horizon, forecast_block)
+    report_progress("baselines", "baselines done")
+
+    def run_final_lstm() -> tuple[np.ndarray, np.ndarray, float]:
+        lstm_state: dict[str, Any] = {}
+        lstm_run = run_lstm(
+            values[: options["train_size"]],
+            empty_test,
+            values,
+            options["look_back"],
+            options["units1"],
+            options["units2"],
+            options["epochs"],
+            options["batch_size"],
+            forecast_horizon,
+            forecast_block,
+            engine=options["lstm_engine"],
+            fit_state=lstm_state,
+        )
+        record_analysis_state(lstm=lstm_state or None)
+        return lstm_run
+
+    lstm_run, weights, walk_forward_summary = run_options_lstm_and_walk_forward(
+        options, run_final_lstm if options["use_lstm"] else None
+    )
+    lstm_future = lstm_run[1] if lstm_run is not None else np.full(forecast_horizon, float(values[-1]))
+    report_progress(
+        "walk_forward",
+        "walk-forward done",
+        hybrid_weights=hybrid_weights_summary(weights),
+        walk_forward=walk_forward_summary,
+    )
+
+    forecast = None
+    if options["include_forecast"] and future_days > 0:
+        # Without a test set the band width comes from the walk-forward hybrid RMSE.
+        forecast, _ = build_future_forecast(
+            payload,
+            values,
+            future_days,
+            {"arima": arima_future, "lstm": lstm_future, "trend": trend_future, "returns": returns_future},
+            weights,
+            float(walk_forward_summary.get("rmse_mean", 0.0)),
+        )
+
+    return {
+        "success": True,
+        "tier": options["tier"],
+        "forecast": forecast,
+        "walk_forward": walk_forward_summary,
+        "hybrid_weights": hybrid_weights_summary(weights),
+    }
+
+
+def new_analysis_id() -> str:
+    return f"{os.getpid():x}-{uuid.uuid4().hex}"
+
+
+def store_analysis_state(state: dict[str, Any]) -> str | None:
+    if ANALYSIS_STATE_CACHE_SIZE <= 0:
+        return None
+    analysis_id = new_analysis_id()
+    with _analysis_states_lock:
+        _analysis_states[analysis_id] = state
+        while len(_analysis_states) > ANALYSIS_STATE_CACHE_SIZE:
+            _analysis_states.popitem(last=False)
+    return analysis_id
+
+
+def remember_analysis(recorded: dict[str, Any]) -> str | None:
+    if "options" not in recorded or "plan" not in recorded:
+        return None
+    plan = recorded["plan"]
+    return store_analysis_state(
+        {
+            "options": recorded["options"],
+            "plan": plan,
+            "fold_scores": list(recorded["fold_scores"]),
+            "last_fold_origin": plan["fold_origins"][-1] if plan["fold_origins"] else 0,
+            "lstm": recorded.get("lstm"),
+            "arima": recorded.get("arima"),
+            "arima_seen": recorded.get("arima_seen", 0),
+            # Parameters estimated before the last fold origin: scores new folds without a refit.
+            "fold_arima": recorded.get("fold_arima"),
+            "arima_updates": 0,
+        }
+    )
+
+
+def get_analysis_state(analysis_id: str) -> dict[str, Any]:
+    with _analysis_states_lock:
+        state = _analysis_states.get(analysis_id)
+        if state is not None:
+            _analysis_states.move_to_end(analysis_id)
+    if state is None:
+        raise AnalysisNotFoundError("Анализ не найден или вытеснен из памяти, выполните полный анализ")
+    return state
+
+
+@timed_stage("walk_forward_fold")
+def score_update_fold(
+    values: np.ndarray,
+    origin: int,
+    plan: dict[str, Any],
+    options: dict[str, Any],
+    fitted_arima,
+    lstm_state: dict[str, Any] | None,
+) -> dict[str, Any] | None:
+    horizon = plan["horizon"]
+    forecast_block = options["forecast_block"]
+    look_back = options["look_back"]
+    train_fold = np.array(values[:origin], dtype=float)
+    test_fold = np.array(values[origin : origin + horizon], dtype=float)
+    last_value = float(train_fold[-1])
+
+    model_paths = {"arima": fixed_arima_fold_path(fitted_arima, train_fold, horizon)}
+    model_paths.update(baseline_fold_paths(train_fold, horizon, forecast_block))
+
+    # An LSTM that has already trained on bars past the origin would leak the fold's test data.
+    if lstm_state is not None and lstm_state["seen"] <= origin:
+        scaler = lstm_state["scaler"]
+        check_windows, _ = build_windows(scaler.transform(train_fold[-(look_back + 8) :].reshape(-1, 1)), look_back)
+        with tf_section():
+            predict_step = cached_step_predictor(lstm_state, options["lstm_engine"], check_windows.reshape(-1, look_back))
+            lstm_future_fold = rollout_lstm_future(predict_step, scaler, train_fold, look_back, horizon, forecast_block)
+        model_paths["lstm"] = sanitize_future_path(lstm_future_fold, horizon, last_value)
+
+    return score_walk_forward_fold(train_fold, test_fold, model_paths, horizon)
+
+
+def update_analysis(payload: dict[str, Any]) -> dict[str, Any]:
+    with lstm_cache_scope() as cache_stats:
+        result = _update_analysis(payload)
+    result["lstm_cache"] = lstm_cache_summary(cache_stats)
+    return result
+
+
+def _update_analysis(payload: dict[str, Any]) -> dict[str, Any]:
+    # Appends bars to a remembered analysis; the work scales with the new bars, not the history.
+    base_id = str(payload.get("analysis_id") or "")
+    state = get_analysis_state(base_id)
+    new_values = to_float_array(payload.get("close", []))
+    if len(new_values) == 0:
+        raise ValueError("Нет новых данных для обновления")
+
+    base_options = state["options"]
+    values = np.concatenate([base_options["values"], new_values])
+    options = {
+        **base_options,
+        "values": values,
+        "dates": list(base_options["dates"]) + list(payload.get("dates") or []),
+    }
+    plan = state["plan"]
+    look_back = options["look_back"]
+    future_days = options["future_days"]
+    forecast_horizon = options["forecast_horizon"]
+    forecast_block = options["forecast_block"]
+    last_value = float(values[-1])
+    empty_test = np.empty((0,), dtype=float)
+
+    arima_updates = state["arima_updates"] + 1
+    fitted = state["arima"]
+    # Number of bars the ARIMA parameters were estimated on; extending only re-filters the state.
+    arima_seen = state["arima_seen"]
+    arima_refit = fitted is None or arima_updates >= ARIMA_REFIT_EVERY
+    with timed_stage("arima"):
+        if not arima_refit:
+            try:
+                fitted = fitted.extend(new_values)
+            except Exception:
+                arima_refit = True
+        if arima_refit:
+            fitted = _refit_arima(values.tolist())
+            arima_seen = int(len(values))
+            arima_updates = 0
+        arima_future = fitted_arima_forecast(fitted, forecast_horizon, last_value)
+    report_progress("arima", "ARIMA updated", refit=arima_refit)
+
+    base_lstm = state["lstm"]
+    lstm_state = base_lstm
+    lstm_future = np.full(forecast_horizon, last_value)
+    if base_options["use_lstm"]:
+        with tf_section():
+            if base_lstm is not None:
+                scaler = base_lstm["scaler"]
+                tail = values[-(look_back + max(len(new_values), options["batch_size"])) :]
+                x_tune, y_tune = build_windows(scaler.transform(tail.reshape(-1, 1)), look_back)
+                tuned = finetune_lstm_model(
+                    base_lstm["model"], x_tune, y_tune, LSTM_FINETUNE_EPOCHS, options["batch_size"]
+                )
+                lstm_state = {"model": tuned, "predictors": {}, "scaler": scaler, "seen": int(len(values))}
+                with timed_stage("lstm_rollout"):
+                    predict_step = cached_step_predictor(
+                        lstm_state, options["lstm_engine"], x_tune[-8:].reshape(-1, look_back)
+                    )
+                    lstm_future = rollout_lstm_future(
+                        predict_step, scaler, values, look_back, forecast_horizon, forecast_block
+                    )
+                report_progress("lstm", "LSTM fine-tuned", epochs=LSTM_FINETUNE_EPOCHS)
+
+    _, trend_future, _ = run_trend_baseline(values, empty_test, forecast_horizon, forecast_block)
+    _, returns_future, _ = run_returns_baseline(values, empty_test, forecast_horizon, forecast_block)
+    report_progress("baselines", "baselines done")
+
+    fold_scores = list(state["fold_scores"])
+    last_fold_origin = state["last_fold_origin"]
+    fold_arima = state["fold_arima"]
+    new_folds = 0
+    origin = int(len(values) - plan["horizon"])
+    if origin > look_back and origin - last_fold_origin >= plan["origin_step"]:
+        fold_lstm = base_lstm if plan["lstm_origins_target"] else None
+        with timed_stage("walk_forward_fold"):
+            # ARIMA parameters estimated on bars past the origin would leak the fold's test data.
+            if arima_seen <= origin:
+                fold_arima = fitted
+            elif state["arima"] is not None and state["arima_seen"] <= origin:
+                fold_arima = state["arima"]
+            elif fold_arima is None:
+                fold_arima = _refit_arima(values[:origin].tolist())
+            fold_score = score_update_fold(values, origin, plan, options, fold_arima, fold_lstm)
+        if fold_score is not None:
+            fold_scores = (fold_scores + [fold_score])[-plan["max_origins"] :]
+            new_folds = 1
+        last_fold_origin = origin
+
+    weights = complete_model_weights(merge_walk_forward_weights(fold_scores, plan["model_keys"], HYBRID_MIN_FLOORS))
+    lstm_origins = sum(1 for fold_score in fold_scores if "lstm" in fold_score["weights"])
+    walk_forward_summary = summarize_walk_forward(plan, fold_scores, lstm_origins)
+    report_progress(
+        "walk_forward",
+        "walk-forward updated",
+        hybrid_weights=hybrid_weights_summary(weights),
+        walk_forward=walk_forward_summary,
+    )
+
+    forecast = None
+    if options["include_forecast"] and future_days > 0:
+        forecast, _ = build_future_forecast(
+            payload,
+            values,
+            future_days,
+            {"arima": arima_future, "lstm": lstm_future, "trend": trend_future, "returns": returns_future},
+            weights,
+            float(walk_forward_summary.get("rmse_mean", 0.0)),
+        )
+
+    analysis_id = store_analysis_state(
+        {
+            "options": options,
+            "plan": plan,
+            "fold_scores": fold_scores,
+            "last_fold_origin": last_fold_origin,
+            "lstm": lstm_state,
+            "arima": fitted,
+            "arima_seen": arima_seen,
+            "fold_arima": fold_arima,
+            "arima_updates": arima_updates,
+        }
+    )
+    return {
+        "success": True,
+        "tier": options["tier"],
+        "analysis_id": analysis_id,
+        "forecast": forecast,
+        "walk_forward": walk_forward_summary,
+        "hybrid_weights": hybrid_weights_summary(weights),
+        "update": {
+            "base_analysis_id": base_id,
+            "new_points": int(len(new_values)),
+            "total_records": int(len(values)),
+            "new_folds": new_folds,
+            "arima_refit": bool(arima_refit),
+            "lstm_finetune_epochs": LSTM_FINETUNE_EPOCHS if base_lstm is not None else 0,
         },
     }
 
 
+def _analysis_models_task(
+    shared_values: tuple[str, int],
+    train_size: int,
+    forecast_horizon: int,
+    forecast_block: int,
+    arima_update: str | None,
+) -> dict[str, tuple[np.ndarray, np.ndarray, float]]:
+    values = read_shared_float_array(shared_values)
+    train = values[:train_size]
+    test = values[train_size:]
+    return {
+        "arima": run_arima(train, test, forecast_horizon, forecast_block, update_mode=arima_update),
+        "trend": run_trend_baseline(train, test, forecast_horizon, forecast_block),
+        "returns": run_returns_baseline(train, test, forecast_horizon, forecast_block),
+    }
+
+
+def _stationarity_task(shared_values: tuple[str, int], lag_mode: str, window: int) -> dict[str, Any]:
+    return stationarity_report(read_shared_float_array(shared_values), lag_mode, window)
+
+
+def _submit_batch_series(
+    pool: ProcessPoolExecutor,
+    stack: ExitStack,
+    options: dict[str, Any],
+    plan: dict[str, Any],
+) -> dict[str, Any]:
+    shared_values = stack.enter_context(shared_float_array(options["values"]))
+    futures = {
+        "models": pool.submit(
+            _analysis_models_task,
+            shared_values,
+            options["train_size"],
+            options["forecast_horizon"],
+            options["forecast_block"],
+            options["arima_update"],
+        ),
+        "walk_forward": (
+            [
+                pool.submit(
+                    _walk_forward_fixed_arima_task,
+                    shared_values,
+                    plan["evaluation_origins"],
+                    plan["horizon"],
+                    options["forecast_block"],
+                )
+            ]
+            if plan["fixed_arima_folds"]
+            else [
+                pool.submit(
+                    _walk_forward_statistical_task,
+                    shared_values,
+                    origin,
+                    plan["horizon"],
+                    options["forecast_block"],
+                    options["arima_update"],
+                )
+                for origin in plan["evaluation_origins"]
+            ]
+        ),
+        # Skipped when this process already holds the report; see _batch_statistical_results.
+        "stationarity": (
+            None
+            if cached_stationarity_report(options["values"], options["stationarity_lag"], options["stationarity_window"])
+            else pool.submit(_stationarity_task, shared_values, options["stationarity_lag"], options["stationarity_window"])
+        ),
+    }
+
+    def cancel_pending() -> None:
+        pending = [
+            future
+            for future in [futures["models"], futures["stationarity"], *futures["walk_forward"]]
+            if future is not None
+        ]
+        for future in pending:
+            future.cancel()
+        wait(pending)
+
+    stack.callback(cancel_pending)
+    return futures
+
+
+def _batch_statistical_results(
+    options: dict[str, Any],
+    plan: dict[str, Any],
+    futures: dict[str, Any] | None,
+) -> tuple[dict[str, tuple[np.ndarray, np.ndarray, float]], list[dict[str, np.ndarray]], dict[str, Any]]:
+    if futures is not None:
+        try:
+            statistical_paths = [future.result() for future in futures["walk_forward"]]
+            if plan["fixed_arima_folds"]:
+                statistical_paths = statistical_paths[0]
+            if futures["stationarity"] is None:
+                stationarity = run_options_stationarity(options)
+            else:
+                # Computed (and cached) in a pool process; keep it here too for the next request.
+                stationarity = futures["stationarity"].result()
+                store_stationarity_report(
+                    options["values"], options["stationarity_lag"], options["stationarity_window"], stationarity
+                )
+            return futures["models"].result(), statistical_paths, stationarity
+        except BrokenProcessPool:
+            reset_process_pool()
+
+    values = options["values"]
+    train = values[: options["train_size"]]
+    test = values[options["train_size"] :]
+    horizon = options["forecast_horizon"]
+    block = options["forecast_block"]
+    arima_state: dict[str, Any] = {}
+    model_runs = {
+        "arima": run_arima(train, test, horizon, block, update_mode=options["arima_update"], fit_state=arima_state),
+        "trend": run_trend_baseline(train, test, horizon, block),
+        "returns": run_returns_baseline(train, test, horizon, block),
+    }
+    record_analysis_state(arima=arima_state.get("fitted"), arima_seen=arima_state.get("seen", 0))
+    if plan["fixed_arima_folds"]:
+        statistical_paths = walk_forward_fixed_arima_paths(values, plan["evaluation_origins"], plan["horizon"], block)
+    else:
+        statistical_paths = [
+            walk_forward_statistical_paths(values, origin, plan["horizon"], block, options["arima_update"])
+            for origin in plan["evaluation_origins"]
+        ]
+    return model_runs, statistical_paths, run_options_stationarity(options)
+
+
+def analyze_batch(
+    payloads: list[Any],
+    resolve: Callable[[Any], dict[str, Any]] | None = None,
+) -> Iterator[dict[str, Any]]:
+    # Results in input order, as analyze() would return them but without a timeline; failures are per series.
+    pool = get_process_pool()
+    with ExitStack() as stack:
+        prepared: list[tuple[int, Any, dict[str, Any] | None, dict[str, Any] | None, Any]] = []
+        for index, payload in enumerate(payloads):
+            try:
+                if resolve is not None:
+                    payload = resolve(payload)
+                if not isinstance(payload, dict):
+                    raise ValueError("Некорректные данные ряда: ожидается объект")
+                options = parse_analysis_options(payload)
+                plan = plan_options_walk_forward(options)
+            except Exception as exc:
+                prepared.append((index, payload, None, None, str(exc)))
+                continue
+
+            futures = None
+            if pool is not None:
+                try:
+                    futures = _submit_batch_series(pool, stack, options, plan)
+                except BrokenProcessPool:
+                    reset_process_pool()
+                    pool = None
+            prepared.append((index, payload, options, plan, futures))
+
+        for done, (index, payload, options, plan, futures) in enumerate(prepared, start=1):
+            series_id = payload.get("id") if isinstance(payload, dict) else None
+            if options is None or plan is None:
+                yield {"success": False, "index": index, "id": series_id, "error": futures}
+                continue
+
+            try:
+                with lstm_cache_scope() as cache_stats, analysis_state_scope() as recorded:
+                    record_analysis_state(options=options)
+                    with tf_section(options["use_lstm"]):
+                        lstm_run = run_options_lstm(options) if options["use_lstm"] else None
+                        walk_forward_started = time.perf_counter()
+                        lstm_path = run_options_walk_forward_lstm(options, plan)
+
+                    model_runs, statistical_paths, stationarity = _batch_statistical_results(options, plan, futures)
+                    if lstm_run is not None:
+                        model_runs["lstm"] = lstm_run
+                    weights, walk_forward_summary = finish_walk_forward(
+                        options["values"],
+                        plan,
+                        statistical_paths,
+                        lstm_path,
+                        HYBRID_MIN_FLOORS,
+                        walk_forward_started,
+                    )
+                result = assemble_analysis(payload, options, model_runs, weights, walk_forward_summary, stationarity)
+                result["lstm_cache"] = lstm_cache_summary(cache_stats)
+                result["analysis_id"] = remember_analysis(recorded)
+            except Exception as exc:
+                result = {"success": False, "error": str(exc)}
+
+            result["index"] = index
+            result["id"] = series_id
+            report_progress("batch_series", f"series {done}/{len(prepared)} done", series=done, total=len(prepared))
+            yield result
+
+
+def reset_seeds(seed: int = SEED) -> None:
+    random.seed(seed)
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+
 def main():
-    random.seed(42)
-    np.random.seed(42)
-    tf.random.set_seed(42)
+    reset_seeds()
 
     raw = sys.stdin.read().strip()
     if not raw:
@@ -1277,9 +3361,7 @@ def main():
     action = payload.get("action")
 
     if action in ("analyze", "forecast"):
-        result = analyze(payload)
-        if action == "forecast":
-            result = {"success": True, "forecast": result["forecast"]}
+        result = analyze(payload) if action == "analyze" else forecast_future(payload)
         print(json.dumps(result, ensure_ascii=False))
         return
 
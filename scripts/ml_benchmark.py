@@ -0,0 +1,273 @@
+"""
+Stage-level benchmark for the ml_backend hot paths.
+
+Times build_windows, run_arima, run_lstm, the trend/returns baselines,
+build_hybrid_future_levels, walk_forward_weight_selection and the full analyze
+on deterministic synthetic price series of several lengths, writes the results
+as JSON and optionally compares them with a stored baseline:
+
+    python scripts/ml_benchmark.py --output bench.json
+    python scripts/ml_benchmark.py --baseline scripts/benchmarks/baseline.json
+    python scripts/ml_benchmark.py --baseline scripts/benchmarks/baseline.json --update-baseline
+
+Exit code 1 when any stage is slower than the baseline by more than
+--tolerance (relative) and --min-delta (absolute seconds).
+
+The stage benchmarks evaluate a fixed tail of --test-points bars so they
+measure how each stage scales with history length. walk_forward_weight_selection
+and analyze use the real 80/20 split and are skipped above --e2e-max-size
+unless --full is given (refit-mode ARIMA over 20k points takes tens of minutes).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+# Every run_lstm/analyze call must train: a model-cache hit would time a dictionary lookup.
+os.environ["LSTM_MODEL_CACHE_SIZE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import ml_backend  # noqa: E402
+
+DEFAULT_SIZES = [500, 2000, 10000, 20000]
+STAGES = [
+    "build_windows",
+    "run_trend_baseline",
+    "run_returns_baseline",
+    "build_hybrid_future_levels",
+    "run_arima",
+    "run_lstm",
+    "walk_forward_weight_selection",
+    "analyze",
+]
+# Millisecond-scale stages are repeated and reported by their fastest run; the rest run once.
+FAST_STAGES = {"build_windows", "run_trend_baseline", "run_returns_baseline", "build_hybrid_future_levels"}
+END_TO_END_STAGES = {"walk_forward_weight_selection", "analyze"}
+
+
+def synthetic_series(length: int, seed: int = ml_backend.SEED) -> np.ndarray:
+    # Geometric random walk with slow drift changes, volatility regimes and a weekly cycle.
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.normal(0.0002, 0.0006, length // 250 + 1), 250)[:length]
+    volatility = np.repeat(rng.uniform(0.006, 0.025, length // 120 + 1), 120)[:length]
+    weekly = 0.002 * np.sin(2.0 * np.pi * np.arange(length) / 5.0)
+    log_returns = drift + volatility * rng.standard_normal(length) + weekly
+    return 100.0 * np.exp(np.cumsum(log_returns))
+
+
+def benchmark_params(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "look_back": args.look_back,
+        "lstm_units": [args.units1, args.units2],
+        "epochs": args.epochs,
+        "batch_size": args.batch_size,
+        "forecast_block": args.forecast_block,
+    }
+
+
+def build_stages(values: np.ndarray, args: argparse.Namespace) -> dict[str, Callable[[], Any]]:
+    # Inputs are prepared here so only the stage itself is timed.
+    params = benchmark_params(args)
+    horizon = args.days
+    block = args.forecast_block
+    test_points = max(1, min(args.test_points, len(values) // 5))
+    train, test = values[:-test_points], values[-test_points:]
+    scaled = MinMaxScaler(feature_range=(0, 1)).fit_transform(values.reshape(-1, 1))
+
+    last_close = float(values[-1])
+    steps = np.arange(1, horizon + 1, dtype=float)
+    arima_path = last_close + 0.1 * steps
+    lstm_path = last_close - 0.05 * steps
+    trend_path = last_close + 0.02 * steps**1.2
+    returns_path = last_close + np.sin(steps)
+
+    payload = {
+        "close": values.tolist(),
+        "dates": [f"D{i}" for i in range(len(values))],
+        "params": params,
+        "days": horizon,
+    }
+
+    return {
+        "build_windows": lambda: ml_backend.build_windows(scaled, args.look_back),
+        "run_trend_baseline": lambda: ml_backend.run_trend_baseline(train, test, horizon, block),
+        "run_returns_baseline": lambda: ml_backend.run_returns_baseline(train, test, horizon, block),
+        "build_hybrid_future_levels": lambda: ml_backend.build_hybrid_future_levels(
+            last_close, values, horizon, arima_path, lstm_path, trend_path, returns_path, 0.25, 0.25, 0.25, 0.25
+        ),
+        "run_arima": lambda: ml_backend.run_arima(train, test, horizon, block),
+        "run_lstm": lambda: ml_backend.run_lstm(
+            train, test, values, args.look_back, args.units1, args.units2, args.epochs, args.batch_size, horizon, block
+        ),
+        "walk_forward_weight_selection": lambda: ml_backend.walk_forward_weight_selection(
+            values,
+            horizon,
+            block,
+            args.look_back,
+            args.units1,
+            args.units2,
+            args.epochs,
+            args.batch_size,
+            ml_backend.HYBRID_MIN_FLOORS,
+        ),
+        "analyze": lambda: ml_backend.analyze(payload),
+    }
+
+
+def time_stage(run: Callable[[], Any], repeat: int) -> dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        ml_backend.reset_seeds()
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return {
+        "seconds": min(timings),
+        "median": statistics.median(timings),
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict[str, Any]:
+    results: dict[str, dict[str, Any]] = {}
+    for size in args.sizes:
+        values = synthetic_series(size)
+        stages = build_stages(values, args)
+        size_results: dict[str, Any] = {}
+        for stage in args.stages:
+            if stage in END_TO_END_STAGES and size > args.e2e_max_size and not args.full:
+                size_results[stage] = {"skipped": f"size > --e2e-max-size ({args.e2e_max_size})"}
+                continue
+            repeat = args.repeat if stage in FAST_STAGES else 1
+            print(f"[{size}] {stage} ...", file=sys.stderr, flush=True)
+            size_results[stage] = time_stage(stages[stage], repeat)
+            print(f"[{size}] {stage}: {size_results[stage]['seconds']:.4f}s", file=sys.stderr, flush=True)
+        results[str(size)] = size_results
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "tensorflow": ml_backend.tf.__version__,
+            "params": {
+                **benchmark_params(args),
+                "days": args.days,
+                "test_points": args.test_points,
+            },
+            "backend": {
+                "arima_update_mode": ml_backend.ARIMA_UPDATE_MODE,
+                "arima_order_workers": ml_backend.ARIMA_ORDER_WORKERS,
+                "lstm_rollout_mode": ml_backend.LSTM_ROLLOUT_MODE,
+                "lstm_inference_engine": ml_backend.LSTM_INFERENCE_ENGINE,
+                "ml_process_workers": ml_backend.ML_PROCESS_WORKERS,
+            },
+        },
+        "results": results,
+    }
+
+
+def compare_with_baseline(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float,
+    min_delta: float,
+) -> list[str]:
+    if baseline.get("meta", {}).get("params") != current["meta"]["params"]:
+        print("warning: benchmark params differ from the baseline", file=sys.stderr)
+    if baseline.get("meta", {}).get("backend") != current["meta"]["backend"]:
+        print("warning: backend configuration differs from the baseline", file=sys.stderr)
+
+    regressions: list[str] = []
+    print(f"{'size':>6}  {'stage':<30} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for size, stages in current["results"].items():
+        for stage, entry in stages.items():
+            base_entry = baseline.get("results", {}).get(size, {}).get(stage)
+            if "seconds" not in entry or not base_entry or "seconds" not in base_entry:
+                continue
+            base_seconds = float(base_entry["seconds"])
+            seconds = float(entry["seconds"])
+            ratio = seconds / base_seconds if base_seconds > 0 else float("inf")
+            regressed = ratio > 1.0 + tolerance and seconds - base_seconds > min_delta
+            flag = "  REGRESSION" if regressed else ""
+            print(f"{size:>6}  {stage:<30} {base_seconds:>10.4f} {seconds:>10.4f} {ratio:>7.2f}{flag}")
+            if regressed:
+                regressions.append(f"{stage} @ {size}: {base_seconds:.4f}s -> {seconds:.4f}s")
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ml_backend stages on synthetic price series.")
+    parser.add_argument("--sizes", type=lambda raw: [int(v) for v in raw.split(",") if v], default=DEFAULT_SIZES)
+    parser.add_argument("--stages", type=lambda raw: [v for v in raw.split(",") if v], default=STAGES)
+    parser.add_argument("--output", default="ml-benchmark.json")
+    parser.add_argument("--baseline", help="Stored benchmark JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns below this many seconds")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of each millisecond-scale stage")
+    parser.add_argument("--test-points", type=int, default=50)
+    parser.add_argument("--e2e-max-size", type=int, default=2000)
+    parser.add_argument("--full", action="store_true", help="Run end-to-end stages at every size")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--look-back", type=int, default=60)
+    parser.add_argument("--units1", type=int, default=32)
+    parser.add_argument("--units2", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--forecast-block", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    if args.update_baseline and not args.baseline:
+        parser.error("--update-baseline requires --baseline")
+    args.repeat = max(1, args.repeat)
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    warnings.filterwarnings("ignore")
+
+    current = run_benchmarks(args)
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(current, handle, indent=2)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(current, handle, indent=2)
+        print(f"baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"baseline not found: {args.baseline}", file=sys.stderr)
+        return 2
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare_with_baseline(current, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print("performance regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
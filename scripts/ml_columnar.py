@@ -0,0 +1,138 @@
+"""
+Binary columnar encoding for ml_service.py requests and responses
+
+JSON stays the default; clients opt in with Content-Type (request) and
+Accept (response) set to MEDIA_TYPE. A message is
+
+    b"MLC1" | uint32 LE header length | UTF-8 JSON header | column buffers
+
+The header holds the usual payload/result object in which large arrays are
+replaced by {"$column": i} references into header["columns"]:
+
+    {"dtype": "<f8", "offset": o, "count": n}    little-endian float64 values
+    {"dtype": "utf8", "offset": o, "nbytes": b}  "\\n"-separated strings (dates)
+
+Offsets are relative to the start of the buffer area, which begins 8-byte
+aligned, so float64 columns decode with np.frombuffer without a copy. In
+responses NaN stands for null (e.g. predictions.lstm when the tier skips it).
+"""
+
+import json
+import math
+import struct
+from typing import Any
+
+import numpy as np
+
+MEDIA_TYPE = "application/vnd.ml-columnar"
+MAGIC = b"MLC1"
+# Shorter arrays stay inline in the JSON header.
+MIN_COLUMN_LENGTH = 16
+
+_PREFIX = struct.Struct("<4sI")
+
+
+class ColumnarError(ValueError):
+    pass
+
+
+def _is_numeric_list(value: list[Any]) -> bool:
+    return all(item is None or (isinstance(item, (int, float)) and not isinstance(item, bool)) for item in value)
+
+
+def _is_string_list(value: list[Any]) -> bool:
+    return all(isinstance(item, str) and "\n" not in item for item in value)
+
+
+def encode(content: dict[str, Any]) -> bytes:
+    columns: list[dict[str, Any]] = []
+    buffers: list[bytes] = []
+    offset = 0
+
+    def add_column(column: dict[str, Any], data: bytes) -> dict[str, int]:
+        nonlocal offset
+        column["offset"] = offset
+        columns.append(column)
+        buffers.append(data)
+        padding = -len(data) % 8
+        if padding:
+            buffers.append(b"\0" * padding)
+        offset += len(data) + padding
+        return {"$column": len(columns) - 1}
+
+    def convert(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, np.ndarray) and value.ndim == 1 and value.dtype.kind in "fiu":
+            data = np.ascontiguousarray(value, dtype="<f8")
+            return add_column({"dtype": "<f8", "count": int(len(data))}, data.tobytes())
+        if isinstance(value, list):
+            if len(value) >= MIN_COLUMN_LENGTH and _is_numeric_list(value):
+                data = np.array([math.nan if item is None else item for item in value], dtype="<f8")
+                return add_column({"dtype": "<f8", "count": int(len(data))}, data.tobytes())
+            if len(value) >= MIN_COLUMN_LENGTH and _is_string_list(value):
+                data = "\n".join(value).encode("utf-8")
+                return add_column({"dtype": "utf8", "nbytes": len(data), "count": len(value)}, data)
+            return [convert(item) for item in value]
+        return value
+
+    body = convert(content)
+    header = json.dumps(
+        {"columns": columns, "body": body},
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+    header += b" " * (-(_PREFIX.size + len(header)) % 8)
+    return b"".join([_PREFIX.pack(MAGIC, len(header)), header, *buffers])
+
+
+def decode(data: bytes) -> Any:
+    """Decode a message; float64 columns are read-only NumPy views into data."""
+    if len(data) < _PREFIX.size:
+        raise ColumnarError("Truncated columnar message")
+    magic, header_len = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ColumnarError("Not a columnar message")
+    base = _PREFIX.size + header_len
+    if base > len(data):
+        raise ColumnarError("Truncated columnar header")
+    try:
+        header = json.loads(bytes(data[_PREFIX.size : base]))
+        columns = header["columns"]
+        body = header["body"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise ColumnarError(f"Invalid columnar header: {exc}") from exc
+
+    def column(index: Any) -> Any:
+        if not isinstance(index, int) or isinstance(index, bool) or index < 0:
+            raise ColumnarError(f"Invalid column reference: {index!r}")
+        try:
+            spec = columns[index]
+            dtype = spec["dtype"]
+            start = base + int(spec["offset"])
+            size = 8 * int(spec["count"]) if dtype == "<f8" else int(spec["nbytes"])
+        except (IndexError, KeyError, TypeError, ValueError) as exc:
+            raise ColumnarError(f"Invalid column {index}: {exc}") from exc
+        if size < 0 or start < base or start + size > len(data):
+            raise ColumnarError(f"Column {index} runs past the end of the message")
+        if dtype == "<f8":
+            return np.frombuffer(data, dtype="<f8", count=size // 8, offset=start)
+        if dtype == "utf8":
+            try:
+                text = bytes(data[start : start + size]).decode("utf-8")
+            except UnicodeDecodeError as exc:
+                raise ColumnarError(f"Invalid column {index}: {exc}") from exc
+            return text.split("\n") if text else []
+        raise ColumnarError(f"Unsupported column dtype: {dtype}")
+
+    def resolve(value: Any) -> Any:
+        if isinstance(value, dict):
+            if len(value) == 1 and "$column" in value:
+                return column(value["$column"])
+            return {key: resolve(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [resolve(item) for item in value]
+        return value
+
+    return resolve(body)
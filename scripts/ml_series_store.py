@@ -0,0 +1,210 @@
+"""
+Append-only, memory-mapped series store for ml_service.py
+
+Each series (keyed by ticker) is a pair of files in ML_SERIES_STORE_DIR:
+<series_id>.f64 holds the closes as raw little-endian float64 and
+<series_id>.dates holds one date per line. POST /series/{series_id} appends
+bars; requests then send {"series_id", "start"?, "end"?} instead of
+close/dates, and whichever process computes them (the service or a worker)
+maps the file and slices it without copying or deserializing.
+
+Appends write the dates before the closes, and readers size a series by its
+close file, so a reader never sees a close without its date. Appending is
+serialized within the service process, which is the only writer.
+"""
+
+import os
+import re
+import tempfile
+import threading
+from typing import Any
+
+import numpy as np
+
+STORE_DIR = os.environ.get("ML_SERIES_STORE_DIR", os.path.join(tempfile.gettempdir(), "ml-series"))
+
+_SERIES_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+_ITEM_SIZE = 8
+
+_write_lock = threading.Lock()
+# Parsed dates per series: (inode, bytes parsed, dates); appends only parse the new tail.
+_dates_cache: dict[str, tuple[int, int, list[str]]] = {}
+_dates_cache_lock = threading.Lock()
+
+
+class SeriesNotFoundError(LookupError):
+    pass
+
+
+def validate_series_id(series_id: Any) -> str:
+    if not isinstance(series_id, str) or not _SERIES_ID.match(series_id):
+        raise ValueError("Некорректный series_id: допустимы латинские буквы, цифры, '.', '_' и '-' (до 64 символов)")
+    return series_id
+
+
+def _paths(series_id: str) -> tuple[str, str]:
+    base = os.path.join(STORE_DIR, validate_series_id(series_id))
+    return base + ".f64", base + ".dates"
+
+
+def series_length(series_id: str) -> int:
+    close_path, _ = _paths(series_id)
+    try:
+        return os.stat(close_path).st_size // _ITEM_SIZE
+    except FileNotFoundError:
+        raise SeriesNotFoundError(f"Ряд '{series_id}' не найден в хранилище") from None
+
+
+def series_version(series_id: str) -> str:
+    """Changes whenever the series is appended to or replaced."""
+    close_path, _ = _paths(series_id)
+    try:
+        stat = os.stat(close_path)
+    except FileNotFoundError:
+        raise SeriesNotFoundError(f"Ряд '{series_id}' не найден в хранилище") from None
+    return f"{stat.st_ino}-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def _read_dates(series_id: str, count: int) -> list[str]:
+    _, dates_path = _paths(series_id)
+    try:
+        handle = open(dates_path, "rb")
+    except FileNotFoundError:
+        return []
+    with handle:
+        stat = os.fstat(handle.fileno())
+        with _dates_cache_lock:
+            inode, parsed, dates = _dates_cache.get(series_id, (-1, 0, []))
+        if inode != stat.st_ino or parsed > stat.st_size:
+            parsed, dates = 0, []
+        if parsed < stat.st_size:
+            handle.seek(parsed)
+            tail = handle.read(stat.st_size - parsed)
+            # Only complete lines count; a concurrent append may still be writing the last one.
+            complete = tail[: tail.rfind(b"\n") + 1]
+            dates = dates + complete.decode("utf-8").splitlines()
+            parsed += len(complete)
+            with _dates_cache_lock:
+                _dates_cache[series_id] = (stat.st_ino, parsed, dates)
+    return dates[:count]
+
+
+def read_series(series_id: str, start: int | None = None, end: int | None = None) -> tuple[np.ndarray, list[str]]:
+    """Closes as a read-only memory-mapped view of [start:end) (Python slice semantics) and their dates."""
+    length = series_length(series_id)
+    if length == 0:
+        return np.empty((0,), dtype=np.float64), []
+    close_path, _ = _paths(series_id)
+    closes = np.memmap(close_path, dtype="<f8", mode="r", shape=(length,))
+    window = slice(start, end)
+    dates = _read_dates(series_id, length)
+    return closes[window], dates[window] if dates else []
+
+
+def append_series(
+    series_id: str,
+    close: Any,
+    dates: list[str] | None = None,
+    replace: bool = False,
+) -> dict[str, Any]:
+    values = np.ascontiguousarray(np.asarray(close, dtype=np.float64), dtype="<f8").reshape(-1)
+    if len(values) == 0:
+        raise ValueError("Нет данных для добавления")
+    if not np.all(np.isfinite(values)):
+        raise ValueError("Ряд содержит нечисловые или бесконечные значения")
+    if dates:
+        dates = [str(date) for date in dates]
+        if len(dates) != len(values):
+            raise ValueError("Длины close и dates не совпадают")
+        if any("\n" in date for date in dates):
+            raise ValueError("Даты не должны содержать переводов строки")
+
+    close_path, dates_path = _paths(series_id)
+    with _write_lock:
+        os.makedirs(STORE_DIR, exist_ok=True)
+        if replace:
+            # New files replace the old ones atomically; readers keep the mapping they already hold.
+            if dates:
+                _write_atomic(dates_path, _encode_dates(dates))
+            else:
+                _remove(dates_path)
+            _write_atomic(close_path, values.tobytes())
+            return {"series_id": series_id, "length": int(len(values)), "appended": int(len(values))}
+
+        length = os.stat(close_path).st_size // _ITEM_SIZE if os.path.exists(close_path) else 0
+        has_dates = os.path.exists(dates_path)
+        if length > 0 and has_dates != bool(dates):
+            raise ValueError(
+                "Ряд хранится с датами, передайте dates" if has_dates else "Ряд хранится без дат, dates не поддерживаются"
+            )
+        if dates:
+            if has_dates and len(_read_dates(series_id, length + 1)) > length:
+                # An earlier append stopped between the dates and the closes: drop the orphaned dates.
+                _write_atomic(dates_path, _encode_dates(_read_dates(series_id, length)) or b"")
+            with open(dates_path, "ab") as handle:
+                handle.write(_encode_dates(dates))
+        with open(close_path, "ab") as handle:
+            handle.write(values.tobytes())
+    return {"series_id": series_id, "length": int(length + len(values)), "appended": int(len(values))}
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+
+def _encode_dates(dates: list[str] | None) -> bytes | None:
+    if not dates:
+        return None
+    return ("\n".join(dates) + "\n").encode("utf-8")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def describe_series(series_id: str) -> dict[str, Any]:
+    length = series_length(series_id)
+    dates = _read_dates(series_id, length)
+    return {
+        "series_id": series_id,
+        "length": length,
+        "first_date": dates[0] if dates else None,
+        "last_date": dates[-1] if dates else None,
+    }
+
+
+def list_series() -> list[str]:
+    try:
+        names = os.listdir(STORE_DIR)
+    except FileNotFoundError:
+        return []
+    return sorted(name[: -len(".f64")] for name in names if name.endswith(".f64"))
+
+
+def series_reference(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """{"id", "start", "end"} of a payload that refers to the store, else None."""
+    if payload.get("series_id") is None:
+        return None
+    reference = {"id": validate_series_id(payload["series_id"]), "start": None, "end": None}
+    for key in ("start", "end"):
+        value = payload.get(key)
+        if value is not None:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f"'{key}' должен быть целым числом")
+            reference[key] = value
+    return reference
+
+
+def resolve_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    """Fill close/dates of a series_id payload from the store; other payloads are returned as-is."""
+    reference = series_reference(payload)
+    if reference is None:
+        return payload
+    closes, dates = read_series(reference["id"], reference["start"], reference["end"])
+    return {**payload, "close": closes, "dates": dates}
@@ -5,141 +5,913 @@ Eliminates per-request Python process spawn overhead by keeping
 TensorFlow/sklearn/statsmodels loaded in a long-running process.
 
 Guardrails:
-- Seeds (random, numpy, tf) are reset before every /analyze and /forecast call
+- Seeds (random, numpy, tf) are reset at the start of every TF section
 - tf.keras.backend.clear_session() is called before training
-- asyncio.Lock serializes TF operations (no concurrent GPU/CPU races)
-- Single uvicorn worker enforced at startup (--workers 1)
+- Computations run on ML_COMPUTE_THREADS threads, so the event loop (and
+  /health) stays responsive during long runs; only the TF sections
+  (ml_backend.tf_section) are serialized, so one request's ARIMA and
+  walk-forward statistics run while another trains its LSTM
+- GET /health reports liveness, readiness and the computations in progress
+- POST /jobs runs an analysis in the background; GET /jobs/{id} and
+  GET /jobs/{id}/events (SSE) report status, progress and the result
+- POST /batch analyzes many series in one request and streams NDJSON results
+- POST /update appends new bars to a previous analysis (by analysis_id) and
+  refreshes its forecast and weights incrementally
+- Identical payloads are answered from a TTL/byte-bounded response cache, and
+  concurrent identical requests share one in-flight computation
+- /analyze, /forecast, /update and /jobs also accept a binary columnar body
+  (Content-Type: application/vnd.ml-columnar, see ml_columnar.py) and return
+  one when it is accepted; JSON stays the default
+- "X-ML-Profile: 1" (or ML_PROFILE_SAMPLE_RATE) profiles /analyze, /forecast and
+  /update with cProfile + tracemalloc; the response links the written reports.
+  A profiled request runs alone in its process
+- POST /series/{id} appends bars to a memory-mapped series store
+  (ml_series_store.py); requests may then send "series_id" (+ start/end)
+  instead of the full close/dates history
+- GET /metrics exports stage latency histograms, per-resource wait times, queue depth,
+  in-flight requests, cache counters and RSS in Prometheus text format
+- Single uvicorn worker enforced at startup (--workers 1); with ML_SERVICE_WORKERS > 1
+  the service runs as a supervisor and computes in isolated spawned worker processes
+  (see ml_workers.py)
 """
 
 import asyncio
+import hashlib
+import itertools
 import json
 import logging
 import os
 import random
 import sys
+import threading
 import time
 import traceback
-from typing import Any
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator
 
 # Suppress TF noise before importing
 os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
 
 import numpy as np
-import tensorflow as tf
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 
 # Import analyze from ml_backend (same directory)
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-import ml_backend  # noqa: E402
+import ml_columnar  # noqa: E402
+import ml_metrics  # noqa: E402
+import ml_series_store  # noqa: E402
+import ml_workers  # noqa: E402
+from ml_workers import encode_json as _encode  # noqa: E402
+
+if ml_workers.SERVICE_WORKERS == 1:
+    # In-process mode: keep TF/statsmodels loaded here. A supervisor never imports them.
+    import ml_backend  # noqa: E402
 
-app = FastAPI(title="ML Service", version="1.0.0")
 logger = logging.getLogger("ml_service")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
-# Global lock: serializes all TF operations to prevent race conditions
-_tf_lock = asyncio.Lock()
+# Supervisor mode: created at startup when ML_SERVICE_WORKERS > 1.
+_worker_pool: ml_workers.WorkerPool | None = None
 
-SEED = 42
+# Content-addressed response cache: analyze() is deterministic under the fixed SEED,
+# so identical payloads are served from memory until the TTL expires.
+RESPONSE_CACHE_TTL_S = float(os.environ.get("ML_RESPONSE_CACHE_TTL_S", "600"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("ML_RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+_response_cache: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+_response_cache_bytes = 0
+_cache_stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0}
+# Identical concurrent requests await one shared computation.
+_in_flight: dict[str, "asyncio.Future[tuple[int, bytes]]"] = {}
 
+# Opt-in profiling: "X-ML-Profile: 1" or a random sample of requests. Profiled
+# requests bypass the response cache so the computation really runs.
+PROFILE_SAMPLE_RATE = min(1.0, max(0.0, float(os.environ.get("ML_PROFILE_SAMPLE_RATE", "0"))))
+PROFILE_HEADER = "x-ml-profile"
 
-def _reset_seeds() -> None:
-    """Reset all random seeds for deterministic results on every request."""
-    random.seed(SEED)
-    np.random.seed(SEED)
-    tf.random.set_seed(SEED)
+# Async job API: bounded number of queued+running jobs, finished jobs kept for a TTL.
+JOBS_MAX_PENDING = max(1, int(os.environ.get("ML_JOBS_MAX_PENDING", "16")))
+JOBS_RESULT_TTL_S = float(os.environ.get("ML_JOBS_RESULT_TTL_S", "3600"))
+JOBS_MAX_STORED = max(1, int(os.environ.get("ML_JOBS_MAX_STORED", "256")))
+JOBS_MAX_EVENTS = 500
+_jobs: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+# In-process mode: compute runs off the event loop so progress can be streamed while a job trains
+# and /health answers during long runs. With several compute threads one request's ARIMA, baselines,
+# walk-forward statistics and stationarity tests overlap another's LSTM training; TF work itself
+# still runs one section at a time (ml_backend.tf_section).
+COMPUTE_THREADS = max(1, int(os.environ.get("ML_COMPUTE_THREADS", "2")))
+_compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_THREADS, thread_name_prefix="ml-compute")
+# Computations queued or running, for /health: {"action", "kind", "queued_at", "started_at", ...}.
+_computations: dict[int, dict[str, Any]] = {}
+_computation_ids = itertools.count(1)
 
+BATCH_MAX_SERIES = max(1, int(os.environ.get("ML_BATCH_MAX_SERIES", "64")))
 
-@app.get("/health")
-async def health() -> dict[str, str]:
-    return {"status": "ok"}
+_metrics = ml_metrics.Registry()
+_stage_seconds = _metrics.histogram(
+    "ml_stage_duration_seconds",
+    "Latency of ml_backend stages; walk-forward folds include their own ARIMA/LSTM/baseline stages",
+    ("stage",),
+)
+_compute_seconds = _metrics.histogram(
+    "ml_compute_duration_seconds", "Computation latency including queueing, cache misses only", ("action",)
+)
+_computations_total = _metrics.counter("ml_computations_total", "Finished computations", ("action", "status"))
+_resource_wait_seconds = _metrics.histogram(
+    "ml_resource_wait_seconds",
+    "Time spent waiting for a compute thread, the TF section or an idle worker",
+    ("resource",),
+)
+_queue_depth = _metrics.gauge("ml_queue_depth", "Computations waiting for a compute thread or an idle worker")
+_in_flight_requests = _metrics.gauge("ml_in_flight_requests", "HTTP requests being handled")
+_in_flight_computations = _metrics.gauge("ml_in_flight_computations", "Distinct cacheable computations in flight")
+_jobs_gauge = _metrics.gauge("ml_jobs", "Stored background jobs", ("status",))
+_response_cache_events = _metrics.counter("ml_response_cache_events_total", "Response cache lookups and evictions", ("event",))
+_response_cache_size = _metrics.gauge("ml_response_cache_bytes", "Bytes held by the response cache")
+_response_cache_entries = _metrics.gauge("ml_response_cache_entries", "Entries in the response cache")
+_lstm_cache_events = _metrics.counter("ml_lstm_model_cache_events_total", "LSTM model cache events (in-process mode)", ("event",))
+_process_rss = _metrics.gauge("ml_process_resident_memory_bytes", "Resident memory of the service process")
+_worker_rss = _metrics.gauge("ml_worker_resident_memory_bytes", "Resident memory of each worker after its last job", ("pid",))
+_workers_gauge = _metrics.gauge("ml_workers", "Worker processes by state", ("state",))
+_worker_events = _metrics.counter("ml_worker_events_total", "Worker jobs, recycles and crashes", ("event",))
 
 
-@app.post("/analyze")
-async def analyze(request: Request) -> JSONResponse:
-    """
-    Run full ML analysis pipeline.
+def _observe_stage(stage: str, seconds: float) -> None:
+    _stage_seconds.observe(seconds, stage=stage)
 
-    Expects JSON body with:
-      - close: number[]
-      - dates: string[]
-      - params: { look_back, lstm_units, epochs, batch_size, forecast_block }
-      - days: number (default 30)
-      - future_dates: string[] (optional)
+
+def _observe_wait(resource: str, seconds: float) -> None:
+    _resource_wait_seconds.observe(seconds, resource=resource)
+
+
+def _observe_computation(action: str, status_code: int, start: float) -> None:
+    _compute_seconds.observe(time.perf_counter() - start, action=action)
+    _computations_total.inc(action=action, status=str(status_code))
+
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI) -> AsyncIterator[None]:
+    global _worker_pool
+    if ml_workers.SERVICE_WORKERS > 1:
+        _worker_pool = ml_workers.WorkerPool(on_stage=_observe_stage, on_wait=_observe_wait)
+        await _worker_pool.start()
+    try:
+        yield
+    finally:
+        if _worker_pool is not None:
+            await _worker_pool.shutdown()
+            _worker_pool = None
+
+
+app = FastAPI(title="ML Service", version="1.0.0", lifespan=_lifespan)
+
+
+@app.middleware("http")
+async def _count_in_flight(request: Request, call_next: Any) -> Any:
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    _in_flight_requests.inc()
+    try:
+        return await call_next(request)
+    finally:
+        _in_flight_requests.dec()
+
+
+@contextmanager
+def _tracked(action: str, kind: str, **info: Any) -> Iterator[dict[str, Any]]:
+    """Register a computation for /health; set entry["started_at"] once it leaves the queue."""
+    computation_id = next(_computation_ids)
+    entry = {"action": action, "kind": kind, "queued_at": time.monotonic(), "started_at": None, **info}
+    _computations[computation_id] = entry
+    try:
+        yield entry
+    finally:
+        del _computations[computation_id]
+
+
+def _mark_started(entry: dict[str, Any]) -> None:
+    entry["started_at"] = time.monotonic()
+    _observe_wait("worker" if _worker_pool is not None else "compute_thread", entry["started_at"] - entry["queued_at"])
+
+
+async def _in_compute_thread(on_start: Callable[[], None], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run func on a compute thread; on_start runs on the event loop once a thread
+    picks it up. A cancelled caller still waits for func to finish, so a
+    computation is never reported gone while it may still hold the TF section.
     """
+    loop = asyncio.get_running_loop()
+
+    def run() -> Any:
+        loop.call_soon_threadsafe(on_start)
+        return func(*args, **kwargs)
+
+    future = loop.run_in_executor(_compute_executor, run)
     try:
-        payload = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid JSON body")
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        await asyncio.wait({future})
+        raise
+
+
+def _hashable(value: Any) -> Any:
+    # Columnar requests carry NumPy arrays; they are keyed by a digest of their bytes.
+    if isinstance(value, np.ndarray):
+        return {"float64_sha256": hashlib.sha256(np.ascontiguousarray(value, dtype="<f8").tobytes()).hexdigest()}
+    return value
+
+
+def _series_key(payload: dict[str, Any]) -> dict[str, Any] | None:
+    reference = ml_series_store.series_reference(payload)
+    if reference is None:
+        return None
+    return {**reference, "version": ml_series_store.series_version(reference["id"])}
+
+
+def _cache_key(action: str, payload: dict[str, Any], response_format: str = "json") -> str:
+    canonical = json.dumps(
+        {
+            "action": action,
+            "format": response_format,
+            "close": _hashable(payload.get("close")),
+            "series": _series_key(payload),
+            "dates": payload.get("dates"),
+            "params": payload.get("params"),
+            "days": payload.get("days"),
+            "future_dates": payload.get("future_dates"),
+            "include_forecast": payload.get("include_forecast", True),
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _cache_get(key: str) -> bytes | None:
+    global _response_cache_bytes
+    entry = _response_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, body = entry
+    if expires_at <= time.monotonic():
+        del _response_cache[key]
+        _response_cache_bytes -= len(body)
+        return None
+    _response_cache.move_to_end(key)
+    return body
+
+
+def _cache_put(key: str, body: bytes) -> None:
+    global _response_cache_bytes
+    if RESPONSE_CACHE_TTL_S <= 0 or len(body) > RESPONSE_CACHE_MAX_BYTES:
+        return
+    previous = _response_cache.pop(key, None)
+    if previous is not None:
+        _response_cache_bytes -= len(previous[1])
+    _response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL_S, body)
+    _response_cache_bytes += len(body)
+    while _response_cache_bytes > RESPONSE_CACHE_MAX_BYTES and _response_cache:
+        _, (_, evicted) = _response_cache.popitem(last=False)
+        _response_cache_bytes -= len(evicted)
+        _cache_stats["evictions"] += 1
+
+
+def _with_request_fields(body: bytes, response_format: str = "json") -> bytes:
+    # analysis_id and lstm_cache describe one computation: a body served from the cache or shared
+    # with a coalesced request gets no analysis state and zero LSTM cache traffic of its own.
+    content = ml_columnar.decode(body) if response_format == "columnar" else json.loads(body)
+    content["analysis_id"] = None
+    content["lstm_cache"] = ml_backend.lstm_cache_summary({"hits": 0, "misses": 0}) if _worker_pool is None else None
+    return ml_workers.encode_result(content, response_format)
+
+
+def _is_columnar(media_type: str) -> bool:
+    return media_type.split(";", 1)[0].strip().lower() == ml_columnar.MEDIA_TYPE
+
+
+async def _read_body(request: Request) -> dict[str, Any]:
+    if _is_columnar(request.headers.get("content-type", "")):
+        try:
+            payload = ml_columnar.decode(await request.body())
+        except ml_columnar.ColumnarError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid columnar body: {exc}")
+    else:
+        try:
+            payload = await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid JSON body")
 
     if not isinstance(payload, dict):
         raise HTTPException(status_code=400, detail="Body must be a JSON object")
+    return payload
+
+
+def _pin_series_window(payload: dict[str, Any]) -> dict[str, Any]:
+    """
+    Check a series_id reference and replace start/end by absolute bounds, so
+    bars appended while the request waits do not change what it (and its
+    cache entry) covers.
+    """
+    try:
+        reference = ml_series_store.series_reference(payload)
+        if reference is None:
+            return payload
+        length = ml_series_store.series_length(reference["id"])
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    start, end, _ = slice(reference["start"], reference["end"]).indices(length)
+    if end <= start:
+        raise HTTPException(status_code=400, detail=f"Empty window of series '{reference['id']}'")
+    return {**payload, "start": start, "end": end}
+
+
+async def _read_payload(request: Request) -> dict[str, Any]:
+    payload = await _read_body(request)
+    if payload.get("series_id") is not None:
+        return _pin_series_window(payload)
 
     close = payload.get("close", [])
-    if not close or not isinstance(close, list):
+    if not isinstance(close, (list, np.ndarray)) or len(close) == 0:
         raise HTTPException(status_code=400, detail="Missing or empty 'close' array")
 
-    async with _tf_lock:
-        _reset_seeds()
-        start = time.perf_counter()
-        try:
-            result = ml_backend.analyze(payload)
-        except ValueError as exc:
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "error": str(exc)},
+    return payload
+
+
+def _response_format(request: Request) -> str:
+    """Columnar when the client accepts it explicitly, or sent a columnar body without asking for JSON."""
+    accept = request.headers.get("accept", "").lower()
+    if ml_columnar.MEDIA_TYPE in accept:
+        return "columnar"
+    if _is_columnar(request.headers.get("content-type", "")) and "application/json" not in accept:
+        return "columnar"
+    return "json"
+
+
+def _media_type(status_code: int, response_format: str) -> str:
+    # Errors are always JSON.
+    return ml_columnar.MEDIA_TYPE if status_code == 200 and response_format == "columnar" else "application/json"
+
+
+def _should_profile(request: Request) -> bool:
+    if request.headers.get(PROFILE_HEADER, "").strip().lower() in ("1", "true", "yes"):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+async def _compute(
+    action: str,
+    payload: dict[str, Any],
+    worker_pid: int | None = None,
+    profile: bool = False,
+    response_format: str = "json",
+) -> tuple[int, bytes]:
+    start = time.perf_counter()
+    with _tracked(action, "request") as entry:
+        if _worker_pool is not None:
+            status_code, body = await _worker_pool.run(
+                action,
+                payload,
+                on_start=lambda: _mark_started(entry),
+                worker_pid=worker_pid,
+                profile=profile,
+                response_format=response_format,
             )
-        except Exception as exc:
-            logger.error("analyze failed: %s\n%s", exc, traceback.format_exc())
-            return JSONResponse(
-                status_code=500,
-                content={"success": False, "error": str(exc)},
+        else:
+            status_code, body = await _in_compute_thread(
+                lambda: _mark_started(entry),
+                ml_workers.execute_job,
+                action,
+                payload,
+                on_stage=_observe_stage,
+                profile=profile,
+                response_format=response_format,
+                on_wait=_observe_wait,
             )
-        elapsed = time.perf_counter() - start
-        logger.info("analyze completed in %.2fs", elapsed)
+    _observe_computation(action, status_code, start)
+    return status_code, body
 
-    return JSONResponse(content=result)
 
+async def _run_cached(
+    action: str,
+    payload: dict[str, Any],
+    profile: bool = False,
+    response_format: str = "json",
+) -> Response:
+    """
+    Serve from the response cache, join an identical in-flight computation,
+    or compute and cache. Only successful responses are cached; profiled
+    requests always compute and are never cached.
+    """
+    if profile:
+        status_code, body = await _compute(action, payload, profile=True, response_format=response_format)
+        return Response(
+            content=body,
+            status_code=status_code,
+            media_type=_media_type(status_code, response_format),
+            headers={"X-Cache": "BYPASS"},
+        )
 
-@app.post("/forecast")
-async def forecast(request: Request) -> JSONResponse:
+    key = _cache_key(action, payload, response_format)
+    body = _cache_get(key)
+    if body is not None:
+        _cache_stats["hits"] += 1
+        return Response(
+            content=_with_request_fields(body, response_format),
+            media_type=_media_type(200, response_format),
+            headers={"X-Cache": "HIT"},
+        )
+
+    task = _in_flight.get(key)
+    if task is not None:
+        _cache_stats["coalesced"] += 1
+        cache_status = "COALESCED"
+    else:
+        _cache_stats["misses"] += 1
+        cache_status = "MISS"
+
+        async def compute_and_cache() -> tuple[int, bytes]:
+            status_code, computed = await _compute(action, payload, response_format=response_format)
+            if status_code == 200:
+                _cache_put(key, _with_request_fields(computed, response_format))
+            return status_code, computed
+
+        task = asyncio.ensure_future(compute_and_cache())
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    # shield: a disconnecting client must not cancel the computation other waiters share.
+    status_code, body = await asyncio.shield(task)
+    if cache_status == "COALESCED" and status_code == 200:
+        body = _with_request_fields(body, response_format)
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type=_media_type(status_code, response_format),
+        headers={"X-Cache": cache_status},
+    )
+
+
+def _prune_jobs() -> None:
+    now = time.monotonic()
+    for job_id in list(_jobs.keys()):
+        job = _jobs[job_id]
+        finished_at = job["finished_at"]
+        if finished_at is not None and now - finished_at > JOBS_RESULT_TTL_S:
+            del _jobs[job_id]
+
+    finished = [job_id for job_id, job in _jobs.items() if job["finished_at"] is not None]
+    while len(_jobs) > JOBS_MAX_STORED and finished:
+        del _jobs[finished.pop(0)]
+
+
+def _notify(job: dict[str, Any]) -> None:
+    changed = job["changed"]
+    job["changed"] = asyncio.Event()
+    changed.set()
+
+
+def _append_job_event(job: dict[str, Any], event: dict[str, Any]) -> None:
+    job["seq"] += 1
+    job["events"].append({"seq": job["seq"], "elapsed": round(time.monotonic() - job["created_at"], 3), **event})
+    _notify(job)
+
+
+def _finish_job(job: dict[str, Any], status_code: int, body: bytes) -> None:
+    content = json.loads(body)
+    job["status_code"] = status_code
+    job["status"] = "succeeded" if status_code == 200 else "failed"
+    if status_code == 200:
+        job["result"] = content
+    else:
+        job["error"] = content.get("error", "Unknown error")
+    job["finished_at"] = time.monotonic()
+    _append_job_event(job, {"stage": "done", "message": job["status"]})
+
+
+async def _run_job(job: dict[str, Any], payload: dict[str, Any]) -> None:
+    loop = asyncio.get_running_loop()
+
+    def on_progress(event: dict[str, Any]) -> None:
+        loop.call_soon_threadsafe(_append_job_event, job, event)
+
+    key = _cache_key(job["action"], payload)
+    cached = _cache_get(key)
+    if cached is not None:
+        _cache_stats["hits"] += 1
+        _finish_job(job, 200, _with_request_fields(cached))
+        return
+
+    start = time.perf_counter()
+    try:
+        with _tracked(job["action"], "job", job_id=job["id"]) as entry:
+
+            def mark_started() -> None:
+                job["status"] = "running"
+                job["started_at"] = time.monotonic()
+                _mark_started(entry)
+                _append_job_event(job, {"stage": "started", "message": "started"})
+
+            if _worker_pool is not None:
+                status_code, body = await _worker_pool.run(job["action"], payload, on_progress, on_start=mark_started)
+            else:
+                status_code, body = await _in_compute_thread(
+                    mark_started,
+                    ml_workers.execute_job,
+                    job["action"],
+                    payload,
+                    on_progress,
+                    _observe_stage,
+                    on_wait=_observe_wait,
+                )
+    except Exception as exc:
+        logger.error("job %s failed: %s\n%s", job["id"], exc, traceback.format_exc())
+        status_code, body = 500, _encode({"success": False, "error": str(exc)})
+    _observe_computation(job["action"], status_code, start)
+
+    if status_code == 200:
+        _cache_put(key, _with_request_fields(body))
+    _finish_job(job, status_code, body)
+
+
+def _job_view(job: dict[str, Any]) -> dict[str, Any]:
+    view: dict[str, Any] = {
+        "success": True,
+        "job_id": job["id"],
+        "action": job["action"],
+        "status": job["status"],
+        "progress": job["events"][-1] if job["events"] else None,
+    }
+    if job["status"] == "succeeded":
+        view["result"] = job["result"]
+    elif job["status"] == "failed":
+        view["error"] = job["error"]
+        view["status_code"] = job["status_code"]
+    return view
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request) -> dict[str, Any]:
     """
-    Run forecast-only pipeline (reuses analyze internally, returns only forecast).
+    Start an analysis in the background and return its id immediately.
 
-    Expects same payload as /analyze.
+    Expects the /analyze payload plus optional "action": "analyze" | "forecast".
+    Responds 429 when ML_JOBS_MAX_PENDING jobs are already queued or running.
+    """
+    payload = await _read_payload(request)
+    action = payload.get("action", "analyze")
+    if action not in ("analyze", "forecast"):
+        raise HTTPException(status_code=400, detail=f"Unknown action: {action}")
+
+    _prune_jobs()
+    pending = sum(1 for job in _jobs.values() if job["finished_at"] is None)
+    if pending >= JOBS_MAX_PENDING:
+        raise HTTPException(status_code=429, detail="Too many pending jobs")
+
+    job_id = uuid.uuid4().hex
+    job: dict[str, Any] = {
+        "id": job_id,
+        "action": action,
+        "status": "queued",
+        "created_at": time.monotonic(),
+        "started_at": None,
+        "finished_at": None,
+        "seq": 0,
+        "events": deque(maxlen=JOBS_MAX_EVENTS),
+        "changed": asyncio.Event(),
+        "result": None,
+        "error": None,
+        "status_code": None,
+    }
+    _jobs[job_id] = job
+    job["task"] = asyncio.ensure_future(_run_job(job, payload))
+    return {"success": True, "job_id": job_id, "status": job["status"]}
+
+
+def _get_job(job_id: str) -> dict[str, Any]:
+    _prune_jobs()
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str) -> dict[str, Any]:
+    return _job_view(_get_job(job_id))
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request) -> StreamingResponse:
+    """
+    Server-sent events: one "progress" event per pipeline step, then a final
+    "done" event carrying the job status. Resumes after Last-Event-ID.
     """
+    job = _get_job(job_id)
     try:
-        payload = await request.json()
+        last_seq = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_seq = 0
+
+    async def stream() -> AsyncIterator[bytes]:
+        nonlocal last_seq
+        while True:
+            changed = job["changed"]
+            for event in list(job["events"]):
+                if event["seq"] <= last_seq:
+                    continue
+                last_seq = event["seq"]
+                name = "done" if event["stage"] == "done" else "progress"
+                yield f"id: {event['seq']}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+            if job["finished_at"] is not None:
+                return
+            if await request.is_disconnected():
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=15.0)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+async def _batch_on_workers(pool: ml_workers.WorkerPool, series: list[dict[str, Any]]) -> AsyncIterator[bytes]:
+    start = time.perf_counter()
+
+    async def run_one(index: int, item: dict[str, Any]) -> bytes:
+        with _tracked("analyze", "batch") as entry:
+            _, body = await pool.run("analyze", item, on_start=lambda: _mark_started(entry))
+        result = json.loads(body)
+        result["index"] = index
+        result["id"] = item.get("id")
+        return _encode(result) + b"\n"
+
+    tasks = [asyncio.ensure_future(run_one(index, item)) for index, item in enumerate(series)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # A disconnected client drops the series still waiting for a worker.
+        for task in tasks:
+            task.cancel()
+        logger.info("batch of %d series completed in %.2fs", len(series), time.perf_counter() - start)
+
+
+@app.post("/batch")
+async def batch(request: Request) -> StreamingResponse:
+    """
+    Analyze many series in one request.
+
+    Expects JSON body { "series": [ <analyze payload + optional "id">, ... ] };
+    items may reference stored series by series_id like /analyze.
+    Streams one NDJSON line per series, in input order, as each finishes;
+    every line carries "index" and "id". Statistical work for all series runs
+    on the ml_backend process pool (ML_PROCESS_WORKERS) while LSTMs train here.
+    In supervisor mode the series are spread over the worker processes instead
+    and lines arrive in completion order.
+    """
+    try:
+        body = await request.json()
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid JSON body")
 
-    if not isinstance(payload, dict):
-        raise HTTPException(status_code=400, detail="Body must be a JSON object")
+    series = body.get("series") if isinstance(body, dict) else None
+    if not series or not isinstance(series, list) or not all(isinstance(item, dict) for item in series):
+        raise HTTPException(status_code=400, detail="Missing or empty 'series' array of objects")
+    if len(series) > BATCH_MAX_SERIES:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_SERIES} series per batch")
+    series = [_pin_series_window(item) for item in series]
 
-    close = payload.get("close", [])
-    if not close or not isinstance(close, list):
-        raise HTTPException(status_code=400, detail="Missing or empty 'close' array")
+    if _worker_pool is not None:
+        return StreamingResponse(_batch_on_workers(_worker_pool, series), media_type="application/x-ndjson")
+
+    loop = asyncio.get_running_loop()
+    lines: "asyncio.Queue[bytes | None]" = asyncio.Queue()
+    cancelled = threading.Event()
 
-    async with _tf_lock:
-        _reset_seeds()
+    def produce() -> None:
         start = time.perf_counter()
         try:
-            result = ml_backend.analyze(payload)
-        except ValueError as exc:
-            return JSONResponse(
-                status_code=400,
-                content={"success": False, "error": str(exc)},
-            )
+            with (
+                ml_workers.unprofiled_computation(),
+                ml_backend.stage_observer_scope(_observe_stage),
+                ml_backend.wait_observer_scope(_observe_wait),
+            ):
+                for result in ml_backend.analyze_batch(series, resolve=ml_series_store.resolve_payload):
+                    loop.call_soon_threadsafe(lines.put_nowait, _encode(result) + b"\n")
+                    if cancelled.is_set():
+                        break
         except Exception as exc:
-            logger.error("forecast failed: %s\n%s", exc, traceback.format_exc())
-            return JSONResponse(
-                status_code=500,
-                content={"success": False, "error": str(exc)},
-            )
-        elapsed = time.perf_counter() - start
-        logger.info("forecast completed in %.2fs", elapsed)
+            logger.error("batch failed: %s\n%s", exc, traceback.format_exc())
+            loop.call_soon_threadsafe(lines.put_nowait, _encode({"success": False, "error": str(exc)}) + b"\n")
+        finally:
+            logger.info("batch of %d series completed in %.2fs", len(series), time.perf_counter() - start)
+            loop.call_soon_threadsafe(lines.put_nowait, None)
+
+    async def stream() -> AsyncIterator[bytes]:
+        with _tracked("batch", "batch", series=len(series)) as entry:
+            producer = asyncio.ensure_future(_in_compute_thread(lambda: _mark_started(entry), produce))
+            try:
+                while True:
+                    line = await lines.get()
+                    if line is None:
+                        break
+                    yield line
+            finally:
+                # A disconnected client stops the batch after the series in progress.
+                cancelled.set()
+                await producer
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.post("/series/{series_id}")
+async def append_series(series_id: str, request: Request) -> dict[str, Any]:
+    """
+    Append bars to a stored series (created on first use).
+
+    Expects JSON or columnar body with:
+      - close: number[]
+      - dates: string[] (optional; required once the series has dates)
+      - replace: bool (optional, overwrite the series instead of appending)
+    /analyze, /forecast, /jobs and /batch then accept
+    { "series_id", "start"?, "end"? } in place of close/dates.
+    """
+    payload = await _read_body(request)
+    try:
+        stored = ml_series_store.append_series(
+            series_id,
+            payload.get("close", []),
+            payload.get("dates"),
+            replace=bool(payload.get("replace", False)),
+        )
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return {"success": True, **stored}
+
+
+@app.get("/series")
+async def list_series() -> dict[str, Any]:
+    return {"series": ml_series_store.list_series()}
+
+
+@app.get("/series/{series_id}")
+async def describe_series(series_id: str) -> dict[str, Any]:
+    try:
+        return ml_series_store.describe_series(series_id)
+    except LookupError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _refresh_gauges() -> None:
+    if _worker_pool is not None:
+        _queue_depth.set(_worker_pool.waiting)
+    else:
+        _queue_depth.set(sum(1 for entry in _computations.values() if entry["started_at"] is None))
+    _in_flight_computations.set(len(_in_flight))
+
+    _prune_jobs()
+    job_counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+    for job in _jobs.values():
+        job_counts[job["status"]] = job_counts.get(job["status"], 0) + 1
+    for status, count in job_counts.items():
+        _jobs_gauge.set(count, status=status)
+
+    for event, total in _cache_stats.items():
+        _response_cache_events.set(total, event=event)
+    _response_cache_size.set(_response_cache_bytes)
+    _response_cache_entries.set(len(_response_cache))
+    _process_rss.set(ml_workers.current_rss_bytes())
+
+    if _worker_pool is None:
+        summary = ml_backend.lstm_cache_summary()
+        _lstm_cache_events.set(summary["total_hits"], event="hits")
+        _lstm_cache_events.set(summary["total_misses"], event="misses")
+        _lstm_cache_events.set(summary["evictions"], event="evictions")
+        return
+
+    pool = _worker_pool.describe()
+    _workers_gauge.set(pool["idle"], state="idle")
+    _workers_gauge.set(pool["busy"], state="busy")
+    for event in ("jobs", "recycled", "crashed"):
+        _worker_events.set(pool[event], event=event)
+    _worker_rss.clear()
+    for pid, rss in _worker_pool.worker_rss().items():
+        _worker_rss.set(rss, pid=str(pid))
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Prometheus text-format metrics."""
+    _refresh_gauges()
+    return Response(content=_metrics.render(), media_type=ml_metrics.CONTENT_TYPE)
+
+
+@app.get("/health")
+async def health() -> dict[str, Any]:
+    """
+    Liveness and readiness. Answers from the event loop without touching the
+    compute threads or the workers, so it stays fast under full load.
+
+    "ready" is false while no worker process is up (supervisor mode).
+    "current_job" is the longest-running computation, if any.
+    """
+    now = time.monotonic()
+    entries = list(_computations.values())
+    running = sorted((entry for entry in entries if entry["started_at"] is not None), key=lambda entry: entry["started_at"])
+    current_job = None
+    if running:
+        entry = running[0]
+        current_job = {
+            key: value for key, value in entry.items() if key not in ("queued_at", "started_at")
+        }
+        current_job["running_s"] = round(now - entry["started_at"], 3)
+    health_info: dict[str, Any] = {
+        "status": "ok",
+        "live": True,
+        "ready": True,
+        "mode": "in-process" if _worker_pool is None else "workers",
+        "running": len(running),
+        "queued": len(entries) - len(running),
+        "current_job": current_job,
+    }
+    if _worker_pool is not None:
+        pool = _worker_pool.describe()
+        health_info["ready"] = pool["idle"] + pool["busy"] > 0
+        health_info["workers"] = pool
+    return health_info
+
+
+@app.post("/analyze")
+async def analyze(request: Request) -> Response:
+    """
+    Run full ML analysis pipeline.
+
+    Expects JSON body with:
+      - close: number[]
+      - dates: string[]
+        (or series_id + optional start/end: a window of a series stored via POST /series/{series_id})
+      - params: { look_back, lstm_units, epochs, batch_size, forecast_block, inference_engine?, arima_update?,
+                  tier?: "fast" | "balanced" | "full", walk_forward?: "all" | "adaptive",
+                  walk_forward_lstm?: "fresh" | "warm",
+                  stationarity_lag?: "auto" | "capped" | "fixed", stationarity_window? }
+      - days: number (default 30)
+      - future_dates: string[] (optional)
+
+    With "X-ML-Profile: 1" the response carries a "profile" entry with the
+    paths of the .pstats and allocation reports in ML_PROFILE_DIR.
+    """
+    payload = await _read_payload(request)
+    return await _run_cached("analyze", payload, _should_profile(request), _response_format(request))
+
+
+@app.post("/forecast")
+async def forecast(request: Request) -> Response:
+    """
+    Run the lean forecast-only pipeline (future paths + walk-forward weights,
+    no test-set evaluation or stationarity tests). The path matches /analyze;
+    the confidence band is 1.96 x the walk-forward hybrid RMSE instead of the
+    test-residual std.
+
+    Expects same payload as /analyze.
+    """
+    payload = await _read_payload(request)
+    return await _run_cached("forecast", payload, _should_profile(request), _response_format(request))
+
+
+@app.post("/update")
+async def update(request: Request) -> Response:
+    """
+    Append new bars to a previous analysis instead of re-running it.
+
+    Expects JSON body with:
+      - analysis_id: string (from an /analyze, /forecast, /batch or /update response)
+      - close: number[] (only the new bars)
+      - dates: string[] (optional, dates of the new bars)
+      - future_dates: string[] (optional)
+    Returns the refreshed forecast, weights and a new analysis_id; 404 when
+    the analysis state has been evicted and a full /analyze is needed.
+    """
+    payload = await _read_payload(request)
+    analysis_id = payload.get("analysis_id")
+    if not analysis_id or not isinstance(analysis_id, str):
+        raise HTTPException(status_code=400, detail="Missing 'analysis_id'")
 
-    return JSONResponse(content={"success": True, "forecast": result["forecast"]})
+    worker_pid = None
+    if _worker_pool is not None:
+        worker_pid = ml_workers.analysis_owner_pid(analysis_id)
+        if worker_pid is None:
+            raise HTTPException(status_code=404, detail="Unknown analysis_id")
+    response_format = _response_format(request)
+    status_code, body = await _compute("update", payload, worker_pid, _should_profile(request), response_format)
+    return Response(content=body, status_code=status_code, media_type=_media_type(status_code, response_format))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,508 @@
+"""
+Isolated ML worker processes for ml_service.py
+
+In supervisor mode (ML_SERVICE_WORKERS > 1) the service keeps no TensorFlow
+state of its own: every /analyze, /forecast, job and batch series is handed
+to one of N spawn-started worker processes. Each worker imports ml_backend
+once, runs one job at a time and reports progress over its pipe, so several
+analyses train in parallel without sharing a TF runtime.
+
+Workers are recycled (stopped and replaced by a fresh process) after
+ML_WORKER_MAX_JOBS jobs or when their resident memory exceeds
+ML_WORKER_MAX_RSS_MB, which bounds the slow growth of long-lived TF processes.
+A worker that dies mid-job fails only that job and is replaced.
+
+execute_job(profile=True) runs the job under cProfile and tracemalloc and
+writes a .pstats file plus the top allocation sites to ML_PROFILE_DIR; the
+response gets a "profile" entry pointing at them. Unprofiled jobs skip both.
+tracemalloc is process-wide, so a profiled job runs alone in its process: it
+waits for running jobs to finish and holds new ones back until it is done.
+"""
+
+import asyncio
+import cProfile
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import tracemalloc
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Iterator
+
+import ml_columnar
+import ml_series_store
+
+logger = logging.getLogger("ml_service")
+
+SERVICE_WORKERS = max(1, int(os.environ.get("ML_SERVICE_WORKERS", "1")))
+WORKER_MAX_JOBS = max(0, int(os.environ.get("ML_WORKER_MAX_JOBS", "200")))
+WORKER_MAX_RSS_MB = max(0, int(os.environ.get("ML_WORKER_MAX_RSS_MB", "0")))
+WORKER_START_TIMEOUT_S = 300.0
+WORKER_STOP_TIMEOUT_S = 10.0
+
+PROFILE_DIR = os.environ.get("ML_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ml-profiles"))
+PROFILE_TOP_ALLOCATIONS = 25
+PROFILE_TRACE_FRAMES = 10
+# tracemalloc is process-wide: a profiled run excludes every other computation in the process.
+_profile_gate = threading.Condition()
+_profile_gate_state = {"running": 0, "profiling": False, "profiles_waiting": 0}
+
+
+def encode_json(content: dict[str, Any]) -> bytes:
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_result(content: dict[str, Any], response_format: str = "json") -> bytes:
+    return ml_columnar.encode(content) if response_format == "columnar" else encode_json(content)
+
+
+def current_rss_bytes() -> int:
+    try:
+        import psutil
+
+        return int(psutil.Process().memory_info().rss)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+
+def _write_allocations(path: str, snapshot: tracemalloc.Snapshot, peak_bytes: int) -> list[dict[str, Any]]:
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+    )
+    top = snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(f"peak traced memory: {peak_bytes / (1024 * 1024):.1f} MiB\n\n")
+        for index, stat in enumerate(top, 1):
+            frame = stat.traceback[0]
+            handle.write(f"#{index} {frame.filename}:{frame.lineno}: {stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+    return [
+        {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}", "size_bytes": stat.size, "count": stat.count}
+        for stat in top[:5]
+    ]
+
+
+@contextmanager
+def unprofiled_computation() -> Iterator[None]:
+    """Run alongside other unprofiled computations; waits while a profiled run is active or queued."""
+    with _profile_gate:
+        _profile_gate.wait_for(
+            lambda: not _profile_gate_state["profiling"] and not _profile_gate_state["profiles_waiting"]
+        )
+        _profile_gate_state["running"] += 1
+    try:
+        yield
+    finally:
+        with _profile_gate:
+            _profile_gate_state["running"] -= 1
+            _profile_gate.notify_all()
+
+
+def _run_profiled(action: str, run: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    # cProfile sees the calling thread only: ARIMA order fits on ARIMA_EXECUTOR threads
+    # and work sent to the ML_PROCESS_WORKERS pool show up as time waiting on futures.
+    with _profile_gate:
+        _profile_gate_state["profiles_waiting"] += 1
+        _profile_gate.wait_for(lambda: not _profile_gate_state["profiling"] and not _profile_gate_state["running"])
+        _profile_gate_state["profiles_waiting"] -= 1
+        _profile_gate_state["profiling"] = True
+    try:
+        return _run_profiled_locked(action, run)
+    finally:
+        with _profile_gate:
+            _profile_gate_state["profiling"] = False
+            _profile_gate.notify_all()
+
+
+def _run_profiled_locked(action: str, run: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+    profile_id = f"{action}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    pstats_path = os.path.join(PROFILE_DIR, f"{profile_id}.pstats")
+    allocations_path = os.path.join(PROFILE_DIR, f"{profile_id}.allocations.txt")
+
+    owns_tracing = not tracemalloc.is_tracing()
+    if owns_tracing:
+        tracemalloc.start(PROFILE_TRACE_FRAMES)
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        result = run()
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        if owns_tracing:
+            tracemalloc.stop()
+        profiler.dump_stats(pstats_path)
+        top_allocations = _write_allocations(allocations_path, snapshot, peak_bytes)
+    logger.info("%s profiled in %.2fs: %s", action, elapsed, pstats_path)
+
+    result["profile"] = {
+        "id": profile_id,
+        "pstats": pstats_path,
+        "allocations": allocations_path,
+        "seconds": round(elapsed, 3),
+        "peak_traced_bytes": peak_bytes,
+        "top_allocations": top_allocations,
+    }
+    return result
+
+
+def execute_job(
+    action: str,
+    payload: dict[str, Any],
+    on_progress: Callable[[dict[str, Any]], None] | None = None,
+    on_stage: Callable[[str, float], None] | None = None,
+    profile: bool = False,
+    response_format: str = "json",
+    on_wait: Callable[[str, float], None] | None = None,
+) -> tuple[int, bytes]:
+    """
+    Run one analyze/forecast/update call; returns (status code, body). Seeds are reset
+    by each TF section (ml_backend.tf_section), so concurrent calls stay deterministic.
+    Payloads that name a stored series_id are resolved from the series store here.
+    Successful results are encoded as response_format ("json" or "columnar"), errors as JSON.
+    """
+    import ml_backend
+
+    runners = {
+        "analyze": ml_backend.analyze,
+        "forecast": ml_backend.forecast_future,
+        "update": ml_backend.update_analysis,
+    }
+    run = runners[action]
+    start = time.perf_counter()
+    try:
+        with (
+            ml_backend.progress_scope(on_progress),
+            ml_backend.stage_observer_scope(on_stage),
+            ml_backend.wait_observer_scope(on_wait),
+        ):
+            payload = ml_series_store.resolve_payload(payload)
+            if profile:
+                result = _run_profiled(action, lambda: run(payload))
+            else:
+                with unprofiled_computation():
+                    result = run(payload)
+    except LookupError as exc:
+        return 404, encode_json({"success": False, "error": str(exc)})
+    except ValueError as exc:
+        return 400, encode_json({"success": False, "error": str(exc)})
+    except Exception as exc:
+        logger.error("%s failed: %s\n%s", action, exc, traceback.format_exc())
+        return 500, encode_json({"success": False, "error": str(exc)})
+    elapsed = time.perf_counter() - start
+    logger.info("%s completed in %.2fs", action, elapsed)
+    return 200, encode_result(result, response_format)
+
+
+def analysis_owner_pid(analysis_id: str) -> int | None:
+    # ml_backend.new_analysis_id() prefixes ids with the hex pid of the process holding the state.
+    try:
+        return int(str(analysis_id).split("-", 1)[0], 16)
+    except ValueError:
+        return None
+
+
+def _worker_main(conn: Connection, scripts_dir: str) -> None:
+    # Messages in:  ("job", action, payload, profile, response_format) or None to stop.
+    # Messages out: ("ready", pid), ("progress", event), ("stage", stage, seconds),
+    #               ("wait", resource, seconds), ("done", status_code, body, rss_bytes).
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [worker %(process)d] %(message)s")
+    import ml_backend  # noqa: F401  (preload TF/statsmodels before reporting ready)
+
+    # Analysis stages run on several threads and may report at the same time.
+    send_lock = threading.Lock()
+
+    def send(message: tuple[Any, ...]) -> None:
+        with send_lock:
+            conn.send(message)
+
+    send(("ready", os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        _, action, payload, profile, response_format = message
+        status_code, body = execute_job(
+            action,
+            payload,
+            lambda event: send(("progress", event)),
+            lambda stage, seconds: send(("stage", stage, seconds)),
+            profile,
+            response_format,
+            lambda resource, seconds: send(("wait", resource, seconds)),
+        )
+        send(("done", status_code, body, current_rss_bytes()))
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+class _Worker:
+    def __init__(self, process: multiprocessing.process.BaseProcess, conn: Connection) -> None:
+        self.process = process
+        self.conn = conn
+        self.jobs_done = 0
+        self.rss_bytes = 0
+
+    @property
+    def pid(self) -> int | None:
+        return self.process.pid
+
+
+class WorkerPool:
+    """
+    N spawn-started worker processes behind a local idle queue.
+
+    run() waits for an idle worker (or for one specific worker, when the job
+    needs state that only that process holds), hands it the job and awaits the
+    result; pipe traffic is handled on a small I/O thread pool so the event
+    loop never blocks. Workers are started and replaced in the background.
+    """
+
+    def __init__(
+        self,
+        size: int = SERVICE_WORKERS,
+        max_jobs: int = WORKER_MAX_JOBS,
+        max_rss_mb: int = WORKER_MAX_RSS_MB,
+        on_stage: Callable[[str, float], None] | None = None,
+        on_wait: Callable[[str, float], None] | None = None,
+    ) -> None:
+        self.size = size
+        self.on_stage = on_stage
+        self.on_wait = on_wait
+        self.max_jobs = max_jobs
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self._context = multiprocessing.get_context("spawn")
+        self._scripts_dir = os.path.dirname(os.path.abspath(__file__))
+        # Each worker may hold one thread (job exchange) and one start/stop at a time.
+        self._io_executor = ThreadPoolExecutor(max_workers=2 * size, thread_name_prefix="ml-worker-io")
+        self._idle: deque[_Worker] = deque()
+        self._busy: set[_Worker] = set()
+        self._changed = asyncio.Event()
+        self.waiting = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closed = False
+        self.stats = {"jobs": 0, "recycled": 0, "crashed": 0}
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self._scripts_dir),
+            name="ml-worker",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        if not parent_conn.poll(WORKER_START_TIMEOUT_S):
+            self._stop(worker)
+            raise WorkerCrashed("ML worker did not start in time")
+        try:
+            parent_conn.recv()
+        except (EOFError, OSError):
+            self._stop(worker)
+            raise WorkerCrashed("ML worker exited during startup")
+        logger.info("ML worker %s ready", worker.pid)
+        return worker
+
+    def _stop(self, worker: _Worker) -> None:
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.process.join(WORKER_STOP_TIMEOUT_S)
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(WORKER_STOP_TIMEOUT_S)
+        worker.conn.close()
+
+    def _start_one(self) -> None:
+        while not self._closed:
+            try:
+                worker = self._spawn()
+            except Exception as exc:
+                logger.error("Failed to start ML worker: %s", exc)
+                time.sleep(5.0)
+                continue
+            if self._closed:
+                self._stop(worker)
+                return
+            assert self._loop is not None
+            self._loop.call_soon_threadsafe(self._add_idle, worker)
+            return
+
+    def _add_idle(self, worker: _Worker) -> None:
+        self._idle.append(worker)
+        changed = self._changed
+        self._changed = asyncio.Event()
+        changed.set()
+
+    async def _acquire(self, worker_pid: int | None) -> _Worker | None:
+        self.waiting += 1
+        try:
+            while True:
+                for worker in self._idle:
+                    if worker_pid is None or worker.pid == worker_pid:
+                        self._idle.remove(worker)
+                        return worker
+                if worker_pid is not None and not any(worker.pid == worker_pid for worker in self._busy):
+                    return None
+                await self._changed.wait()
+        finally:
+            self.waiting -= 1
+
+    def _replace(self, worker: _Worker | None) -> None:
+        def run() -> None:
+            if worker is not None:
+                self._stop(worker)
+            self._start_one()
+
+        assert self._loop is not None
+        self._loop.run_in_executor(self._io_executor, run)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        logger.info("Starting %d ML worker processes", self.size)
+        for _ in range(self.size):
+            self._replace(None)
+
+    async def shutdown(self) -> None:
+        self._closed = True
+        workers = list(self._busy) + list(self._idle)
+        self._idle.clear()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._io_executor, self._stop, worker) for worker in workers))
+        self._io_executor.shutdown(wait=False)
+
+    def _exchange(
+        self,
+        worker: _Worker,
+        action: str,
+        payload: dict[str, Any],
+        on_progress: Callable[[dict[str, Any]], None] | None,
+        profile: bool,
+        response_format: str,
+    ) -> tuple[int, bytes]:
+        try:
+            worker.conn.send(("job", action, payload, profile, response_format))
+            while True:
+                message = worker.conn.recv()
+                if message[0] == "progress":
+                    if on_progress is not None:
+                        on_progress(message[1])
+                    continue
+                if message[0] == "stage":
+                    if self.on_stage is not None:
+                        self.on_stage(message[1], message[2])
+                    continue
+                if message[0] == "wait":
+                    if self.on_wait is not None:
+                        self.on_wait(message[1], message[2])
+                    continue
+                _, status_code, body, rss_bytes = message
+                worker.rss_bytes = rss_bytes
+                return status_code, body
+        except (EOFError, OSError) as exc:
+            raise WorkerCrashed(f"ML worker {worker.pid} exited during {action}") from exc
+
+    def _should_recycle(self, worker: _Worker) -> bool:
+        if self.max_jobs and worker.jobs_done >= self.max_jobs:
+            return True
+        return bool(self.max_rss_bytes) and worker.rss_bytes > self.max_rss_bytes
+
+    def _release(self, worker: _Worker, future: "asyncio.Future[tuple[int, bytes]]") -> None:
+        self._busy.discard(worker)
+        if future.cancelled() or future.exception() is not None:
+            self.stats["crashed"] += 1
+            logger.error("%s", future.exception() if not future.cancelled() else "ML worker job cancelled")
+            self._replace(worker)
+            return
+        worker.jobs_done += 1
+        self.stats["jobs"] += 1
+        if self._should_recycle(worker):
+            self.stats["recycled"] += 1
+            logger.info(
+                "Recycling ML worker %s after %d jobs (rss %.0f MB)",
+                worker.pid,
+                worker.jobs_done,
+                worker.rss_bytes / (1024 * 1024),
+            )
+            self._replace(worker)
+        else:
+            self._add_idle(worker)
+
+    async def run(
+        self,
+        action: str,
+        payload: dict[str, Any],
+        on_progress: Callable[[dict[str, Any]], None] | None = None,
+        on_start: Callable[[], None] | None = None,
+        worker_pid: int | None = None,
+        profile: bool = False,
+        response_format: str = "json",
+    ) -> tuple[int, bytes]:
+        worker = await self._acquire(worker_pid)
+        if worker is None:
+            # The owning worker was recycled or crashed, and its in-memory state went with it.
+            return 404, encode_json({"success": False, "error": "Analysis state is no longer available (its worker was restarted); run a full analysis"})
+        self._busy.add(worker)
+        if on_start is not None:
+            on_start()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._io_executor, self._exchange, worker, action, payload, on_progress, profile, response_format
+        )
+        # The worker goes back to the idle queue (or is replaced) when the job ends,
+        # even if the awaiting request has been cancelled meanwhile.
+        future.add_done_callback(lambda done: self._release(worker, done))
+        try:
+            return await asyncio.shield(future)
+        except WorkerCrashed as exc:
+            return 500, encode_json({"success": False, "error": str(exc)})
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "busy": len(self._busy),
+            "waiting": self.waiting,
+            **self.stats,
+        }
+
+    def worker_rss(self) -> dict[int, int]:
+        """Last reported resident memory of each live worker, by pid."""
+        return {
+            worker.pid: worker.rss_bytes
+            for worker in list(self._idle) + list(self._busy)
+            if worker.pid is not None
+        }
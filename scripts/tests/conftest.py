@@ -0,0 +1,25 @@
+import os
+import sys
+from typing import Any, Callable
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_payload() -> Callable[..., dict[str, Any]]:
+    """Small deterministic random-walk payload with a cheap LSTM configuration."""
+
+    def make(length: int = 160, days: int = 10, seed: int = 7, **params: Any) -> dict[str, Any]:
+        rng = np.random.default_rng(seed)
+        close = 250 + np.cumsum(rng.normal(0, 2, length))
+        return {
+            "close": close.tolist(),
+            "dates": [f"2024-01-{index:04d}" for index in range(length)],
+            "days": days,
+            "params": {"look_back": 10, "lstm_units": [4, 4], "epochs": 1, "batch_size": 32, "forecast_block": 5, **params},
+        }
+
+    return make
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import ml_backend
+
+DEFAULT = [(1, 1, 1)]
+
+
+@pytest.mark.parametrize(
+    ("spec", "expected"),
+    [
+        ("p=0-1,d=1,q=0-1", [(0, 1, 0), (0, 1, 1), (1, 1, 0), (1, 1, 1)]),
+        (" P=2, D=0-1, Q=1 ", [(2, 0, 1), (2, 1, 1)]),
+        ("", DEFAULT),
+        ("p=0-1,d=1", DEFAULT),
+        ("p=0-1,d=1,x=2", DEFAULT),
+        ("p=a,d=1,q=1", DEFAULT),
+        ("p=2-1,d=1,q=1", DEFAULT),
+    ],
+)
+def test_parse_arima_order_grid(spec, expected):
+    assert ml_backend.parse_arima_order_grid(spec, DEFAULT) == expected
+
+
+def test_screening_keeps_the_k_best_orders_in_grid_order(monkeypatch):
+    orders = [(0, 1, 0), (1, 1, 0), (0, 1, 1), (1, 1, 1)]
+    scores = {(0, 1, 0): 30.0, (1, 1, 0): 10.0, (0, 1, 1): float("inf"), (1, 1, 1): 20.0}
+    monkeypatch.setattr(ml_backend, "ARIMA_CANDIDATE_ORDERS", orders)
+    monkeypatch.setattr(ml_backend, "ARIMA_SCREEN_TOP_K", 2)
+    monkeypatch.setattr(ml_backend, "_screen_arima_candidate", lambda history, order: scores[order])
+
+    assert ml_backend.screen_arima_orders(np.zeros(10)) == [(1, 1, 0), (1, 1, 1)]
+
+
+@pytest.mark.parametrize("top_k", [0, 4, 9])
+def test_screening_is_off_unless_it_drops_orders(monkeypatch, top_k):
+    orders = [(0, 1, 0), (1, 1, 0), (0, 1, 1), (1, 1, 1)]
+    monkeypatch.setattr(ml_backend, "ARIMA_CANDIDATE_ORDERS", orders)
+    monkeypatch.setattr(ml_backend, "ARIMA_SCREEN_TOP_K", top_k)
+
+    def unexpected(history, order):
+        raise AssertionError("screening should be skipped")
+
+    monkeypatch.setattr(ml_backend, "_screen_arima_candidate", unexpected)
+
+    assert ml_backend.screen_arima_orders(np.zeros(10)) == orders
+
+
+def test_screened_fit_only_runs_the_full_mle_on_the_kept_orders(monkeypatch):
+    series = 100 + np.cumsum(np.random.default_rng(2).normal(0, 1, 150))
+    monkeypatch.setattr(ml_backend, "ARIMA_CANDIDATE_ORDERS", [(0, 1, 0), (1, 1, 0), (0, 1, 1), (1, 1, 1)])
+    monkeypatch.setattr(ml_backend, "ARIMA_SCREEN_TOP_K", 2)
+    monkeypatch.setattr(ml_backend, "ARIMA_EXECUTOR", None)
+    fitted = []
+    fit_candidate = ml_backend._fit_arima_candidate
+
+    def counting_fit(history, order):
+        fitted.append(order)
+        return fit_candidate(history, order)
+
+    monkeypatch.setattr(ml_backend, "_fit_arima_candidate", counting_fit)
+
+    model = ml_backend.fit_best_arima_model(series)
+
+    assert fitted == ml_backend.screen_arima_orders(series)
+    assert len(fitted) == 2
+    assert tuple(model.model.order) in fitted
@@ -0,0 +1,50 @@
+import json
+
+import ml_backend
+
+
+def without_request_fields(result):
+    # Everything but timings, cache flags and the per-request identifiers.
+    dropped = ("analysis_id", "lstm_cache", "timeline", "index", "id")
+    kept = {key: value for key, value in result.items() if key not in dropped}
+    kept["comparison_table"] = [
+        {key: value for key, value in row.items() if key != "Время (сек)"} for row in kept["comparison_table"]
+    ]
+    kept["stationarity"] = {**kept["stationarity"], "mode": {**kept["stationarity"]["mode"], "cached": None}}
+    return kept
+
+
+def test_batch_results_match_analyze(make_payload):
+    payloads = [make_payload(tier="balanced", seed=seed) for seed in (3, 4)]
+    expected = [ml_backend.analyze(payload) for payload in payloads]
+
+    results = list(ml_backend.analyze_batch(payloads))
+
+    assert [result["index"] for result in results] == [0, 1]
+    for result, single in zip(results, expected):
+        assert result["success"] is True
+        assert "lstm_cache" in result and result["analysis_id"]
+        assert json.dumps(without_request_fields(result), sort_keys=True) == json.dumps(
+            without_request_fields(single), sort_keys=True
+        )
+
+
+def test_batch_turns_each_failing_series_into_its_error_line(make_payload):
+    def resolve(payload):
+        if isinstance(payload, dict) and payload.get("series_id") == "missing":
+            raise LookupError("Unknown series 'missing'")
+        return payload
+
+    payloads = [
+        ["not", "an", "object"],
+        {"id": "short", "close": [1.0, 2.0, 3.0]},
+        {"id": "missing", "series_id": "missing"},
+        {"id": "ok", **make_payload(tier="fast")},
+    ]
+
+    results = list(ml_backend.analyze_batch(payloads, resolve=resolve))
+
+    assert [result["index"] for result in results] == [0, 1, 2, 3]
+    assert [result["id"] for result in results] == [None, "short", "missing", "ok"]
+    assert [result["success"] for result in results] == [False, False, False, True]
+    assert results[2]["error"] == "Unknown series 'missing'"
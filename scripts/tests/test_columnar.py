@@ -0,0 +1,59 @@
+import json
+import math
+import struct
+
+import numpy as np
+import pytest
+
+import ml_columnar
+
+
+def message(columns, body, buffers=b""):
+    header = json.dumps({"columns": columns, "body": body}).encode("utf-8")
+    header += b" " * (-(8 + len(header)) % 8)
+    return struct.pack("<4sI", ml_columnar.MAGIC, len(header)) + header + buffers
+
+
+def test_round_trip_keeps_columns_and_inline_values():
+    close = np.linspace(100.0, 120.0, 40)
+    dates = [f"2024-01-{index:02d}" for index in range(40)]
+    content = {
+        "close": close,
+        "predictions": [1.5] * 19 + [None],
+        "dates": dates,
+        "params": {"look_back": 10, "lstm_units": [4, 4]},
+    }
+
+    decoded = ml_columnar.decode(ml_columnar.encode(content))
+
+    assert np.array_equal(decoded["close"], close)
+    assert not decoded["close"].flags.writeable
+    assert decoded["predictions"][:19].tolist() == [1.5] * 19 and math.isnan(decoded["predictions"][19])
+    assert decoded["dates"] == dates
+    assert decoded["params"] == {"look_back": 10, "lstm_units": [4, 4]}
+
+
+@pytest.mark.parametrize("reference", [-1, 1, True, 0.0, "0", None])
+def test_invalid_column_reference_is_rejected(reference):
+    data = message([{"dtype": "<f8", "offset": 0, "count": 1}], {"close": {"$column": reference}}, b"\0" * 8)
+
+    with pytest.raises(ml_columnar.ColumnarError):
+        ml_columnar.decode(data)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"MLC",
+        b"XXXX" + struct.pack("<I", 0),
+        struct.pack("<4sI", ml_columnar.MAGIC, 64) + b"{}",
+        struct.pack("<4sI", ml_columnar.MAGIC, 8) + b"not json",
+        message([{"dtype": "<f8", "offset": 0, "count": 4}], {"close": {"$column": 0}}, b"\0" * 8),
+        message([{"dtype": "<f8", "offset": -8, "count": 1}], {"close": {"$column": 0}}, b"\0" * 8),
+        message([{"dtype": "<i4", "offset": 0, "count": 1}], {"close": {"$column": 0}}, b"\0" * 8),
+        message([{"dtype": "utf8", "offset": 0, "nbytes": 2}], {"dates": {"$column": 0}}, b"\xff\xfe" + b"\0" * 6),
+    ],
+)
+def test_malformed_message_raises_columnar_error(data):
+    with pytest.raises(ml_columnar.ColumnarError):
+        ml_columnar.decode(data)
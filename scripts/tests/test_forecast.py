@@ -0,0 +1,20 @@
+import numpy as np
+
+import ml_backend
+
+
+def test_forecast_matches_analyze_except_band_width(make_payload):
+    payload = make_payload(tier="balanced")
+    analysis = ml_backend.analyze(payload)
+    forecast = ml_backend.forecast_future(payload)
+
+    assert forecast["hybrid_weights"] == analysis["hybrid_weights"]
+    assert forecast["walk_forward"] == analysis["walk_forward"]
+    for key in ("dates", "hybrid", "arima"):
+        assert forecast["forecast"][key] == analysis["forecast"][key], key
+
+    # Without a test set the band is the walk-forward hybrid RMSE around the same path.
+    hybrid = np.array(forecast["forecast"]["hybrid"])
+    lower, upper = ml_backend.moving_confidence_bounds(hybrid, forecast["walk_forward"]["rmse_mean"])
+    assert np.allclose(forecast["forecast"]["conf_int_lower"], lower)
+    assert np.allclose(forecast["forecast"]["conf_int_upper"], upper)
@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+import pytest
+
+import ml_backend
+
+
+def _deterministic_part(result: dict) -> dict:
+    return {
+        "hybrid_weights": result["hybrid_weights"],
+        "forecast": result["forecast"],
+        "predictions": result["predictions"],
+        "walk_forward": result["walk_forward"],
+    }
+
+
+def _analyze_with_empty_cache(payload: dict) -> dict:
+    with ml_backend._lstm_model_cache_lock:
+        ml_backend._lstm_model_cache.clear()
+    return ml_backend.analyze(payload)
+
+
+def test_partly_cached_run_matches_cold_run(make_payload):
+    cold = _analyze_with_empty_cache(make_payload(days=10))
+
+    # Same training slice for the final LSTM, different walk-forward folds: the final model is a
+    # cache hit while the fold models are still trained.
+    _analyze_with_empty_cache(make_payload(days=30))
+    warm = ml_backend.analyze(make_payload(days=10))
+
+    assert warm["lstm_cache"]["hits"] > 0
+    assert warm["lstm_cache"]["misses"] > 0
+    assert _deterministic_part(warm) == _deterministic_part(cold)
+
+
+def test_concurrent_misses_train_the_model_once(monkeypatch):
+    with ml_backend._lstm_model_cache_lock:
+        ml_backend._lstm_model_cache.clear()
+    started = threading.Event()
+    release = threading.Event()
+    trainings = []
+
+    def slow_fit(*args):
+        trainings.append(args)
+        started.set()
+        release.wait(10)
+        return object()
+
+    monkeypatch.setattr(ml_backend, "fit_lstm_model", slow_fit)
+    train = np.arange(40, dtype=float)
+    x_train, y_train = np.zeros((30, 10, 1)), np.zeros(30)
+    entries, stats = [], []
+
+    def request():
+        with ml_backend.lstm_cache_scope() as cache_stats:
+            entries.append(ml_backend.get_or_train_lstm_model(train, x_train, y_train, 10, 4, 4, 1, 32))
+        stats.append(cache_stats)
+
+    first = threading.Thread(target=request)
+    first.start()
+    assert started.wait(10)
+    second = threading.Thread(target=request)
+    second.start()
+    release.set()
+    first.join(10)
+    second.join(10)
+
+    assert len(trainings) == 1
+    assert entries[0] is entries[1]
+    assert sorted((item["hits"], item["misses"]) for item in stats) == [(0, 1), (1, 0)]
+    assert not ml_backend._lstm_model_training
+
+
+def test_failed_training_is_neither_cached_nor_left_in_flight(monkeypatch):
+    with ml_backend._lstm_model_cache_lock:
+        ml_backend._lstm_model_cache.clear()
+    calls = []
+
+    def failing_then_working_fit(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return object()
+
+    monkeypatch.setattr(ml_backend, "fit_lstm_model", failing_then_working_fit)
+    train = np.arange(40, dtype=float)
+    x_train, y_train = np.zeros((30, 10, 1)), np.zeros(30)
+    with pytest.raises(RuntimeError):
+        ml_backend.get_or_train_lstm_model(train, x_train, y_train, 10, 4, 4, 1, 32)
+    entry = ml_backend.get_or_train_lstm_model(train, x_train, y_train, 10, 4, 4, 1, 32)
+
+    assert len(calls) == 2
+    assert entry["predictors"] == {}
+    assert not ml_backend._lstm_model_training
+
+
+def test_step_predictor_is_built_once_per_engine(monkeypatch):
+    builds = []
+    monkeypatch.setattr(ml_backend, "build_step_predictor", lambda model, engine, windows: builds.append(engine) or engine)
+    entry = {"model": object(), "predictors": {}}
+
+    first = ml_backend.cached_step_predictor(entry, "numpy", np.zeros((1, 10)))
+    second = ml_backend.cached_step_predictor(entry, "numpy", np.zeros((1, 10)))
+
+    assert first == second == "numpy"
+    assert builds == ["numpy"]
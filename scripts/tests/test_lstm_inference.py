@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import ml_backend
+
+
+def test_numpy_predictor_matches_keras():
+    rng = np.random.default_rng(3)
+    look_back = 12
+    x_train = rng.random((64, look_back, 1))
+    ml_backend.reset_seeds()
+    model = ml_backend.fit_lstm_model(x_train, x_train[:, -1, 0], look_back, 6, 4, 1, 16)
+
+    windows = rng.random((8, look_back))
+    keras_predictions = ml_backend.keras_step_predictor(model)(windows)
+    numpy_predictions = ml_backend.numpy_step_predictor(model)(windows)
+
+    assert numpy_predictions.shape == keras_predictions.shape
+    assert np.max(np.abs(numpy_predictions - keras_predictions)) <= ml_backend.LSTM_NUMPY_TOLERANCE
+
+
+@pytest.fixture
+def drifting_numpy(monkeypatch):
+    monkeypatch.setattr(ml_backend, "keras_step_predictor", lambda model: lambda windows: np.zeros(len(windows)))
+    monkeypatch.setattr(ml_backend, "numpy_step_predictor", lambda model: lambda windows: np.ones(len(windows)))
+
+
+def test_numpy_fallback_to_keras_is_reported(drifting_numpy):
+    events = []
+    with ml_backend.progress_scope(events.append):
+        predict = ml_backend.build_step_predictor(object(), "numpy", np.zeros((2, 4)))
+
+    assert np.array_equal(predict(np.zeros((3, 4))), np.zeros(3))
+    assert [event["stage"] for event in events] == ["lstm_engine"]
+    assert events[0]["engine"] == "keras"
+
+
+def test_strict_numpy_inference_raises_instead_of_falling_back(drifting_numpy, monkeypatch):
+    monkeypatch.setattr(ml_backend, "LSTM_NUMPY_STRICT", True)
+
+    with pytest.raises(RuntimeError, match="Keras"):
+        ml_backend.build_step_predictor(object(), "numpy", np.zeros((2, 4)))
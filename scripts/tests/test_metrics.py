@@ -0,0 +1,66 @@
+import pytest
+
+import ml_backend
+import ml_metrics
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    registry = ml_metrics.Registry()
+    histogram = registry.histogram("ml_stage_seconds", "Stage latency.", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="arima")
+    histogram.observe(0.5, stage="arima")
+    histogram.observe(5.0, stage="arima")
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP ml_stage_seconds Stage latency.", "# TYPE ml_stage_seconds histogram"]
+    assert lines[2:] == [
+        'ml_stage_seconds_bucket{stage="arima",le="0.1"} 1',
+        'ml_stage_seconds_bucket{stage="arima",le="1"} 2',
+        'ml_stage_seconds_bucket{stage="arima",le="+Inf"} 3',
+        'ml_stage_seconds_sum{stage="arima"} 5.55',
+        'ml_stage_seconds_count{stage="arima"} 3',
+    ]
+
+
+def test_counter_and_gauge_samples_escape_label_values():
+    registry = ml_metrics.Registry()
+    counter = registry.counter("ml_requests_total", "Requests.", ("endpoint",))
+    gauge = registry.gauge("ml_inflight", "In flight.")
+    counter.inc(endpoint='/a"b')
+    counter.inc(2, endpoint='/a"b')
+    gauge.inc()
+    gauge.dec(0.5)
+
+    assert 'ml_requests_total{endpoint="/a\\"b"} 3' in registry.render()
+    assert "ml_inflight 0.5" in registry.render()
+
+
+def test_metric_rejects_unexpected_labels():
+    counter = ml_metrics.Counter("ml_total", "Total.", ("endpoint",))
+
+    with pytest.raises(ValueError):
+        counter.inc(stage="arima")
+
+
+def test_timed_stage_reports_fold_stages_without_their_nested_stages():
+    observed = []
+    with ml_backend.stage_observer_scope(lambda stage, seconds: observed.append(stage)):
+        with ml_backend.timed_stage("walk_forward_fold"):
+            with ml_backend.timed_stage("arima_fit"):
+                pass
+        with ml_backend.timed_stage("arima_fit"):
+            pass
+
+    assert observed == ["walk_forward_fold", "arima_fit"]
+
+
+def test_wait_observer_receives_resource_waits():
+    waits = []
+    with ml_backend.wait_observer_scope(lambda resource, seconds: waits.append(resource)):
+        with ml_backend.tf_section():
+            pass
+    with ml_backend.tf_section():
+        pass
+
+    assert waits == ["tf"]
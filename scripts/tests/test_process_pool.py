@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+import ml_backend
+
+
+@pytest.fixture(scope="module")
+def series() -> np.ndarray:
+    rng = np.random.default_rng(11)
+    return 250 + np.cumsum(rng.normal(0, 2, 160))
+
+
+@pytest.fixture(scope="module")
+def process_pool():
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(ml_backend, "ML_PROCESS_WORKERS", 2)
+        pool = ml_backend.get_process_pool()
+        try:
+            yield pool
+        finally:
+            with ml_backend._process_pool_lock:
+                ml_backend._process_pool = None
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def test_walk_forward_statistical_paths_pool_matches_inline(series, process_pool, monkeypatch):
+    origins = [100, 110, 120]
+    with ml_backend.walk_forward_statistical_paths_pool(series, origins, 10, 5, None) as collect:
+        pooled = list(collect())
+    monkeypatch.setattr(ml_backend, "ML_PROCESS_WORKERS", 1)
+    inline = [ml_backend.walk_forward_statistical_paths(series, origin, 10, 5) for origin in origins]
+
+    assert len(pooled) == len(inline)
+    for pooled_paths, inline_paths in zip(pooled, inline):
+        assert pooled_paths.keys() == inline_paths.keys()
+        for model_name, path in inline_paths.items():
+            assert np.array_equal(pooled_paths[model_name], path), model_name
+
+
+def test_arima_test_blocks_on_pool_match_sequential_refit(series, process_pool, monkeypatch):
+    train, test = series[:128], series[128:]
+    pooled_blocks = ml_backend.arima_test_blocks_on_pool(process_pool, train, test, 5)
+    pooled = ml_backend.run_arima(train, test, 10, 5, update_mode="refit")
+    monkeypatch.setattr(ml_backend, "ML_PROCESS_WORKERS", 1)
+    sequential = ml_backend.run_arima(train, test, 10, 5, update_mode="refit")
+
+    assert pooled_blocks is not None
+    assert np.array_equal(np.asarray(pooled_blocks, dtype=float), sequential[0])
+    assert np.array_equal(pooled[0], sequential[0])
+    assert np.array_equal(pooled[1], sequential[1])
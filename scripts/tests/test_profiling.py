@@ -0,0 +1,73 @@
+import threading
+
+import ml_workers
+
+
+def test_profiled_run_waits_for_unprofiled_computations(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_workers, "PROFILE_DIR", str(tmp_path))
+    release = threading.Event()
+    entered = threading.Event()
+    order: list[str] = []
+
+    def unprofiled() -> None:
+        with ml_workers.unprofiled_computation():
+            entered.set()
+            release.wait(5)
+            order.append("unprofiled")
+
+    def profiled() -> None:
+        ml_workers._run_profiled("analyze", lambda: order.append("profiled") or {"success": True})
+
+    first = threading.Thread(target=unprofiled)
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=profiled)
+    second.start()
+    second.join(0.2)
+    assert order == []
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert order == ["unprofiled", "profiled"]
+
+
+def test_unprofiled_computation_waits_for_profiled_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_workers, "PROFILE_DIR", str(tmp_path))
+    release = threading.Event()
+    entered = threading.Event()
+    order: list[str] = []
+
+    def run_profiled() -> dict:
+        entered.set()
+        release.wait(5)
+        order.append("profiled")
+        return {"success": True}
+
+    profiled = threading.Thread(target=ml_workers._run_profiled, args=("analyze", run_profiled))
+    profiled.start()
+    entered.wait(5)
+
+    def unprofiled() -> None:
+        with ml_workers.unprofiled_computation():
+            order.append("unprofiled")
+
+    second = threading.Thread(target=unprofiled)
+    second.start()
+    second.join(0.2)
+    assert order == []
+
+    release.set()
+    profiled.join(5)
+    second.join(5)
+    assert order == ["profiled", "unprofiled"]
+
+
+def test_profile_entry_points_at_reports(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_workers, "PROFILE_DIR", str(tmp_path))
+    result = ml_workers._run_profiled("analyze", lambda: {"success": True, "values": [0.0] * 1000})
+
+    profile = result["profile"]
+    assert profile["pstats"].startswith(str(tmp_path))
+    assert open(profile["allocations"], encoding="utf-8").read().startswith("peak traced memory")
+    assert profile["peak_traced_bytes"] > 0
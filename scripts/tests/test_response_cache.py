@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+import ml_service
+
+
+@pytest.fixture
+def fake_compute(monkeypatch):
+    calls: list[str] = []
+
+    async def compute(action, payload, worker_pid=None, profile=False, response_format="json"):
+        calls.append(action)
+        await asyncio.sleep(0.05)
+        body = {
+            "success": True,
+            "forecast": [1.0, 2.0],
+            "analysis_id": f"id-{len(calls)}",
+            "lstm_cache": {"hits": 0, "misses": 1},
+        }
+        return 200, ml_service.ml_workers.encode_result(body, response_format)
+
+    monkeypatch.setattr(ml_service, "_compute", compute)
+    monkeypatch.setattr(ml_service, "RESPONSE_CACHE_TTL_S", 60.0)
+    ml_service._response_cache.clear()
+    monkeypatch.setattr(ml_service, "_response_cache_bytes", 0)
+    yield calls
+    ml_service._response_cache.clear()
+
+
+def _body(response) -> dict:
+    return json.loads(response.body)
+
+
+def test_coalesced_and_cached_responses_carry_no_foreign_analysis_id(fake_compute, make_payload):
+    payload = make_payload()
+
+    async def run():
+        first, second = await asyncio.gather(
+            ml_service._run_cached("forecast", payload), ml_service._run_cached("forecast", payload)
+        )
+        third = await ml_service._run_cached("forecast", payload)
+        return first, second, third
+
+    leader, follower, hit = asyncio.run(run())
+
+    assert fake_compute == ["forecast"]
+    assert [response.headers["X-Cache"] for response in (leader, follower, hit)] == ["MISS", "COALESCED", "HIT"]
+    assert _body(leader)["analysis_id"] == "id-1"
+    assert _body(leader)["lstm_cache"]["misses"] == 1
+    for response in (follower, hit):
+        body = _body(response)
+        assert body["analysis_id"] is None
+        assert body["lstm_cache"]["hits"] == 0 and body["lstm_cache"]["misses"] == 0
+        assert body["forecast"] == [1.0, 2.0]
+
+
+def test_cached_columnar_response_round_trips(fake_compute, make_payload):
+    payload = make_payload()
+
+    async def run():
+        await ml_service._run_cached("analyze", payload, response_format="columnar")
+        return await ml_service._run_cached("analyze", payload, response_format="columnar")
+
+    hit = asyncio.run(run())
+
+    body = ml_service.ml_columnar.decode(hit.body)
+    assert hit.headers["X-Cache"] == "HIT"
+    assert body["analysis_id"] is None
+    assert list(body["forecast"]) == [1.0, 2.0]
+
+
+def test_failed_computations_are_not_cached(monkeypatch, make_payload):
+    calls: list[str] = []
+
+    async def compute(action, payload, worker_pid=None, profile=False, response_format="json"):
+        calls.append(action)
+        return 500, ml_service._encode({"success": False, "error": "boom"})
+
+    monkeypatch.setattr(ml_service, "_compute", compute)
+    monkeypatch.setattr(ml_service, "RESPONSE_CACHE_TTL_S", 60.0)
+    ml_service._response_cache.clear()
+    payload = make_payload(seed=8)
+
+    async def run():
+        await ml_service._run_cached("forecast", payload)
+        return await ml_service._run_cached("forecast", payload)
+
+    second = asyncio.run(run())
+    assert calls == ["forecast", "forecast"]
+    assert second.status_code == 500
+    assert second.headers["X-Cache"] == "MISS"
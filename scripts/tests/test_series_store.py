@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+import ml_series_store
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_series_store, "STORE_DIR", str(tmp_path))
+    monkeypatch.setattr(ml_series_store, "_dates_cache", {})
+    return tmp_path
+
+
+def test_appends_are_read_back_as_a_memory_mapped_slice():
+    ml_series_store.append_series("AAPL", [1.0, 2.0, 3.0], ["d1", "d2", "d3"])
+    assert ml_series_store.append_series("AAPL", [4.0, 5.0], ["d4", "d5"]) == {
+        "series_id": "AAPL",
+        "length": 5,
+        "appended": 2,
+    }
+
+    closes, dates = ml_series_store.read_series("AAPL", -3)
+
+    assert isinstance(closes, np.memmap)
+    assert closes.tolist() == [3.0, 4.0, 5.0]
+    assert dates == ["d3", "d4", "d5"]
+    assert ml_series_store.describe_series("AAPL") == {
+        "series_id": "AAPL",
+        "length": 5,
+        "first_date": "d1",
+        "last_date": "d5",
+    }
+    assert ml_series_store.list_series() == ["AAPL"]
+
+
+def test_replace_rewrites_the_series_and_changes_its_version():
+    ml_series_store.append_series("MSFT", [1.0, 2.0], ["d1", "d2"])
+    version = ml_series_store.series_version("MSFT")
+
+    ml_series_store.append_series("MSFT", [7.0], replace=True)
+
+    assert ml_series_store.series_version("MSFT") != version
+    closes, dates = ml_series_store.read_series("MSFT")
+    assert closes.tolist() == [7.0]
+    assert dates == []
+
+
+def test_resolve_payload_fills_close_and_dates_from_the_store():
+    ml_series_store.append_series("SPY", [1.0, 2.0, 3.0, 4.0], ["a", "b", "c", "d"])
+    inline = {"close": [1.0], "days": 5}
+
+    resolved = ml_series_store.resolve_payload({"series_id": "SPY", "start": 1, "end": -1, "days": 5})
+
+    assert resolved["close"].tolist() == [2.0, 3.0]
+    assert resolved["dates"] == ["b", "c"]
+    assert resolved["days"] == 5
+    assert ml_series_store.resolve_payload(inline) is inline
+
+
+def test_orphaned_dates_of_an_interrupted_append_are_dropped(store_dir):
+    ml_series_store.append_series("QQQ", [1.0], ["d1"])
+    with open(store_dir / "QQQ.dates", "ab") as handle:
+        handle.write(b"orphan\n")
+
+    ml_series_store.append_series("QQQ", [2.0], ["d2"])
+
+    assert ml_series_store.read_series("QQQ")[1] == ["d1", "d2"]
+
+
+@pytest.mark.parametrize(
+    "call",
+    [
+        lambda: ml_series_store.append_series("../etc", [1.0]),
+        lambda: ml_series_store.append_series("X", []),
+        lambda: ml_series_store.append_series("X", [1.0, float("nan")]),
+        lambda: ml_series_store.append_series("X", [1.0, 2.0], ["d1"]),
+        lambda: ml_series_store.series_reference({"series_id": "X", "start": "1"}),
+        lambda: ml_series_store.series_reference({"series_id": "X", "end": True}),
+    ],
+)
+def test_invalid_input_raises_value_error(call):
+    with pytest.raises(ValueError):
+        call()
+
+
+def test_dates_must_be_sent_consistently_with_the_stored_series():
+    ml_series_store.append_series("IWM", [1.0], ["d1"])
+
+    with pytest.raises(ValueError):
+        ml_series_store.append_series("IWM", [2.0])
+
+
+def test_unknown_series_is_a_lookup_error():
+    with pytest.raises(LookupError):
+        ml_series_store.read_series("NOPE")
+    with pytest.raises(ml_series_store.SeriesNotFoundError):
+        ml_series_store.series_version("NOPE")
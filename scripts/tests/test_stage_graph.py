@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ml_backend
+
+
+@pytest.fixture(params=["threads", "sequential"])
+def stage_executor(request, monkeypatch):
+    if request.param == "sequential":
+        monkeypatch.setattr(ml_backend, "_stage_executor", None)
+        yield None
+        return
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        monkeypatch.setattr(ml_backend, "_stage_executor", executor)
+        yield executor
+
+
+def test_stages_run_after_their_dependencies(stage_executor):
+    order = []
+
+    def stage(name, value):
+        def run(results):
+            order.append(name)
+            return value(results)
+
+        return run
+
+    results, timeline = ml_backend.run_stage_graph(
+        [
+            {"name": "a", "resource": "thread", "after": [], "run": stage("a", lambda results: 1)},
+            {"name": "b", "resource": "thread", "after": [], "run": stage("b", lambda results: 2)},
+            {"name": "c", "resource": "thread", "after": ["a", "b"], "run": stage("c", lambda r: r["a"] + r["b"])},
+        ]
+    )
+
+    assert results == {"a": 1, "b": 2, "c": 3}
+    assert order[-1] == "c"
+    assert [item["stage"] for item in timeline][-1] == "c"
+    assert all(0 <= item["start_s"] <= item["end_s"] for item in timeline)
+
+
+def test_tf_stages_run_inside_a_tf_section(stage_executor):
+    inside = {}
+
+    def tf_stage(results):
+        inside["tf"] = ml_backend._tf_section_active.get()
+
+    def thread_stage(results):
+        inside["thread"] = ml_backend._tf_section_active.get()
+
+    ml_backend.run_stage_graph(
+        [
+            {"name": "lstm", "resource": "tf", "after": [], "run": tf_stage},
+            {"name": "arima", "resource": "thread", "after": [], "run": thread_stage},
+        ]
+    )
+
+    assert inside == {"tf": True, "thread": False}
+
+
+def test_independent_stages_overlap_on_the_executor(monkeypatch):
+    barrier = threading.Barrier(2, timeout=10)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(ml_backend, "_stage_executor", executor)
+        results, _ = ml_backend.run_stage_graph(
+            [
+                {"name": "a", "resource": "thread", "after": [], "run": lambda results: barrier.wait() >= 0},
+                {"name": "b", "resource": "thread", "after": [], "run": lambda results: barrier.wait() >= 0},
+            ]
+        )
+
+    assert results == {"a": True, "b": True}
+
+
+def test_unresolvable_dependencies_raise(monkeypatch):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(ml_backend, "_stage_executor", executor)
+        with pytest.raises(RuntimeError):
+            ml_backend.run_stage_graph([{"name": "a", "resource": "thread", "after": ["missing"], "run": lambda r: 1}])
+
+
+def test_failing_stage_propagates(stage_executor):
+    def fail(results):
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        ml_backend.run_stage_graph(
+            [
+                {"name": "a", "resource": "thread", "after": [], "run": fail},
+                {"name": "b", "resource": "thread", "after": ["a"], "run": lambda results: 1},
+            ]
+        )
+
+
+def test_analyze_reports_its_stage_timeline(make_payload):
+    result = ml_backend.analyze(make_payload(tier="fast"))
+
+    stages = {item["stage"] for item in result["timeline"]}
+    assert {"arima", "baselines", "stationarity", "walk_forward"} <= stages
+    assert all(item["resource"] in ("thread", "tf") for item in result["timeline"])
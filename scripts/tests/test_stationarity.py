@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import ml_backend
+
+
+@pytest.fixture
+def series() -> np.ndarray:
+    return 250 + np.cumsum(np.random.default_rng(5).normal(0, 2, 400))
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(ml_backend, "_stationarity_cache", ml_backend.OrderedDict())
+
+
+def test_repeated_report_is_served_from_the_cache(series):
+    first = ml_backend.stationarity_report(series, "capped", 0)
+    second = ml_backend.stationarity_report(series, "capped", 0)
+
+    assert first["mode"]["cached"] is False
+    assert second["mode"]["cached"] is True
+    assert {**second, "mode": {**second["mode"], "cached": False}} == first
+
+
+def test_cache_key_covers_lag_mode_and_window(series):
+    ml_backend.stationarity_report(series, "capped", 0)
+
+    assert ml_backend.stationarity_report(series, "auto", 0)["mode"]["cached"] is False
+    assert ml_backend.stationarity_report(series, "capped", 100)["mode"]["cached"] is False
+    # Windows differ only in the untested head: the trailing 100 values are the same.
+    assert ml_backend.stationarity_report(np.concatenate([[0.0], series]), "capped", 100)["mode"]["cached"] is True
+
+
+def test_fixed_mode_uses_exactly_the_max_lag(series, monkeypatch):
+    monkeypatch.setattr(ml_backend, "STATIONARITY_MAX_LAG", 5)
+
+    report = ml_backend.stationarity_report(series, "fixed", 0)
+
+    assert report["mode"]["max_lag"] == 5
+    assert report["adf"]["lags"] == 5
+    assert report["kpss"]["lags"] == 5
+
+
+def test_capped_mode_searches_up_to_the_max_lag(series, monkeypatch):
+    monkeypatch.setattr(ml_backend, "STATIONARITY_MAX_LAG", 3)
+
+    report = ml_backend.stationarity_report(series, "capped", 0)
+
+    assert report["mode"]["max_lag"] == 3
+    assert 0 <= report["adf"]["lags"] <= 3
+
+
+def test_window_tests_only_the_trailing_values(series):
+    report = ml_backend.stationarity_report(series, "auto", 120)
+
+    assert report["mode"]["window"] == 120
+    assert report["mode"]["observations"] == 120
+
+
+@pytest.mark.parametrize(
+    ("window", "expected"),
+    [(0, 0), (-5, 0), (10, ml_backend.STATIONARITY_MIN_WINDOW), (200, 200), ("bad", ml_backend.STATIONARITY_WINDOW)],
+)
+def test_resolve_stationarity_window(window, expected):
+    assert ml_backend.resolve_stationarity_window(window) == expected
+
+
+def test_unknown_lag_mode_falls_back_to_auto():
+    assert ml_backend.resolve_stationarity_lag_mode("bogus") == "auto"
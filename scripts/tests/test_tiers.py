@@ -0,0 +1,47 @@
+import pytest
+
+import ml_backend
+
+
+def test_fast_tier_skips_the_lstm_and_uses_cheap_defaults(make_payload, monkeypatch):
+    def no_training(*args, **kwargs):
+        raise AssertionError("the fast tier must not train an LSTM")
+
+    monkeypatch.setattr(ml_backend, "fit_lstm_model", no_training)
+    payload = make_payload(tier="fast")
+
+    options = ml_backend.parse_analysis_options(payload)
+    result = ml_backend.analyze(payload)
+
+    assert options["use_lstm"] is False
+    assert options["arima_update"] == "incremental"
+    assert result["tier"] == "fast"
+    assert result["hybrid_weights"]["lstm"] == 0.0
+    assert result["walk_forward"]["origins_planned"] <= ml_backend.ANALYSIS_TIERS["fast"]["max_origins"]
+    assert result["walk_forward"]["lstm_origins"] == 0
+    assert result["stationarity"]["mode"]["lag"] == "capped"
+    assert result["lstm_cache"]["misses"] == 0
+
+
+def test_explicit_params_override_tier_defaults(make_payload):
+    options = ml_backend.parse_analysis_options(make_payload(tier="fast", arima_update="refit", stationarity_lag="auto"))
+
+    assert options["arima_update"] == "refit"
+    assert options["stationarity_lag"] == "auto"
+
+
+@pytest.mark.parametrize(
+    ("tier", "lstm_folds", "fixed_arima_folds"),
+    [("fast", False, True), ("balanced", False, False), ("full", True, False)],
+)
+def test_walk_forward_plan_follows_the_tier(tier, lstm_folds, fixed_arima_folds):
+    plan = ml_backend.plan_walk_forward(400, 10, 10, 8, tier, "all", "fresh")
+
+    assert bool(plan["lstm_fold_origins"]) is lstm_folds
+    assert plan["fixed_arima_folds"] is fixed_arima_folds
+    assert ("lstm" in plan["model_keys"]) is ml_backend.ANALYSIS_TIERS[tier]["lstm"]
+    assert len(plan["origins"]) <= ml_backend.ANALYSIS_TIERS[tier]["max_origins"]
+
+
+def test_unknown_tier_falls_back_to_full():
+    assert ml_backend.resolve_analysis_tier("turbo") == "full"
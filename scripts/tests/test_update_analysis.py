@@ -0,0 +1,27 @@
+import ml_backend
+
+
+def test_first_update_extends_the_analysis_models(make_payload, monkeypatch):
+    full = make_payload(length=161, tier="balanced")
+    base = {**full, "close": full["close"][:160], "dates": full["dates"][:160]}
+    analysis = ml_backend.analyze(base)
+    assert analysis["analysis_id"]
+
+    # The update must neither refit ARIMA nor go back to the (evictable) LSTM model cache.
+    with ml_backend._lstm_model_cache_lock:
+        ml_backend._lstm_model_cache.clear()
+    fits: list[int] = []
+    fit_best_arima_model = ml_backend.fit_best_arima_model
+    monkeypatch.setattr(
+        ml_backend, "fit_best_arima_model", lambda history: fits.append(len(history)) or fit_best_arima_model(history)
+    )
+
+    update = ml_backend.update_analysis(
+        {"analysis_id": analysis["analysis_id"], "close": full["close"][160:], "dates": full["dates"][160:]}
+    )
+
+    assert update["success"] is True
+    assert update["update"]["arima_refit"] is False
+    assert update["update"]["lstm_finetune_epochs"] > 0
+    assert update["lstm_cache"]["misses"] == 0
+    assert fits == []
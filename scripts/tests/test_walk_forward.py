@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import ml_backend
+
+
+def test_adaptive_stop_skips_remaining_lstm_and_statistical_folds(make_payload, monkeypatch):
+    monkeypatch.setattr(ml_backend, "WALK_FORWARD_MIN_ORIGINS", 2)
+    monkeypatch.setattr(ml_backend, "WALK_FORWARD_TOLERANCE", 1.0)
+    calls = {"lstm": 0, "statistical": 0}
+    lstm_fold_path = ml_backend.walk_forward_lstm_fold_path
+    statistical_paths = ml_backend.walk_forward_statistical_paths
+
+    def counting_lstm_fold_path(*args, **kwargs):
+        calls["lstm"] += 1
+        return lstm_fold_path(*args, **kwargs)
+
+    def counting_statistical_paths(*args, **kwargs):
+        calls["statistical"] += 1
+        return statistical_paths(*args, **kwargs)
+
+    monkeypatch.setattr(ml_backend, "walk_forward_lstm_fold_path", counting_lstm_fold_path)
+    monkeypatch.setattr(ml_backend, "walk_forward_statistical_paths", counting_statistical_paths)
+
+    result = ml_backend.analyze(make_payload(tier="full", walk_forward="adaptive"))
+    summary = result["walk_forward"]
+    plan = ml_backend.plan_walk_forward(160, 10, 10, 1, "full", "adaptive", "fresh")
+
+    assert summary["stopped"] == "converged"
+    assert summary["origins"] == 2 < summary["origins_planned"]
+    assert calls["statistical"] == 2
+    assert calls["lstm"] == summary["lstm_origins"] == 2 < len(plan["lstm_fold_origins"])
+
+
+def test_pool_only_works_ahead_of_the_scoring(monkeypatch):
+    series = 250 + np.cumsum(np.random.default_rng(11).normal(0, 2, 160))
+    submitted = []
+
+    class CountingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[1])
+            return super().submit(fn, *args, **kwargs)
+
+    with CountingPool(max_workers=1) as pool:
+        monkeypatch.setattr(ml_backend, "get_process_pool", lambda: pool)
+        origins = [140, 130, 120, 110, 100]
+        with ml_backend.walk_forward_statistical_paths_pool(series, origins, 10, 5, None, ahead=1) as collect:
+            folds = collect()
+            next(folds)
+            next(folds)
+            folds.close()
+
+    assert submitted == [140, 130, 120]
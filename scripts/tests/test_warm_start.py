@@ -0,0 +1,48 @@
+import numpy as np
+
+import ml_backend
+
+
+def test_warm_plan_trains_an_lstm_at_every_origin():
+    fresh = ml_backend.plan_walk_forward(160, 10, 10, 8, "full", "all", "fresh")
+    warm = ml_backend.plan_walk_forward(160, 10, 10, 8, "full", "all", "warm")
+
+    assert warm["lstm_warm_start"] is True
+    assert warm["lstm_fold_origins"] == warm["fold_origins"]
+    assert len(fresh["lstm_fold_origins"]) < len(warm["lstm_fold_origins"])
+    assert ml_backend.plan_walk_forward(160, 10, 10, 8, "balanced", "all", "warm")["lstm_warm_start"] is False
+
+
+def test_warm_folds_continue_from_the_previous_fold_on_its_new_bars(monkeypatch):
+    series = 250 + np.cumsum(np.random.default_rng(9).normal(0, 2, 160))
+    plan = ml_backend.plan_walk_forward(160, 10, 10, 4, "full", "all", "warm")
+    plan = {**plan, "lstm_fold_origins": plan["lstm_fold_origins"][:3]}
+    trained, continued = [], []
+    fit_lstm_model = ml_backend.fit_lstm_model
+    warm_start_lstm_model = ml_backend.warm_start_lstm_model
+
+    def counting_fit(x_train, *args):
+        model = fit_lstm_model(x_train, *args)
+        trained.append(model)
+        return model
+
+    def counting_warm_start(previous, x_train, *args):
+        model = warm_start_lstm_model(previous, x_train, *args)
+        continued.append((previous, len(x_train), model))
+        return model
+
+    monkeypatch.setattr(ml_backend, "fit_lstm_model", counting_fit)
+    monkeypatch.setattr(ml_backend, "_lstm_model_cache", ml_backend.OrderedDict())
+    monkeypatch.setattr(ml_backend, "warm_start_lstm_model", counting_warm_start)
+
+    with ml_backend.tf_section():
+        lstm_path = ml_backend.walk_forward_lstm_paths(series, plan, 5, 10, 4, 4, 8)
+
+    assert len(trained) == 1
+    assert [previous for previous, _, _ in continued] == [trained[0], continued[0][2]]
+    # Each continuation trains on the bars added since the previous origin, at least one batch.
+    steps = np.diff(plan["lstm_fold_origins"])
+    assert [size for _, size, _ in continued] == [max(int(step), 8) for step in steps]
+    for origin in plan["lstm_fold_origins"]:
+        assert lstm_path(origin).shape == (plan["horizon"],)
+    assert lstm_path(plan["fold_origins"][-1]) is None
@@ -0,0 +1,28 @@
+import asyncio
+import json
+
+import ml_workers
+
+
+def test_worker_pool_forwards_stage_and_wait_observations(make_payload):
+    stages: list[str] = []
+    waits: list[str] = []
+
+    async def run() -> tuple[int, bytes]:
+        pool = ml_workers.WorkerPool(
+            size=1,
+            on_stage=lambda stage, seconds: stages.append(stage),
+            on_wait=lambda resource, seconds: waits.append(resource),
+        )
+        await pool.start()
+        try:
+            return await pool.run("analyze", make_payload(tier="balanced"))
+        finally:
+            await pool.shutdown()
+
+    status_code, body = asyncio.run(run())
+
+    assert status_code == 200, body
+    assert json.loads(body)["success"] is True
+    assert "arima" in stages
+    assert "tf" in waits
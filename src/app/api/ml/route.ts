@@ -19,6 +19,8 @@ type MlAction =
   | "analyzeStationarity"
   | "forecastFuture";
 
+type AnalysisTier = "fast" | "balanced" | "full";
+
 interface MlCache {
   close: number[];
   dates: string[];
@@ -28,18 +30,26 @@ interface MlCache {
     epochs: number;
     batch_size: number;
     forecast_block: number;
+    tier: AnalysisTier;
   };
   predictions: {
     dates: string[];
     actual: number[];
     arima: number[];
-    lstm: number[];
+    lstm: (number | null)[];
     hybrid: number[];
   };
   stationarity: {
     adf: { test_statistic: number; p_value: number; is_stationary: boolean; interpretation: string };
     kpss: { test_statistic: number; p_value: number; is_stationary: boolean };
     stationarity_type: string;
+    mode?: {
+      lag: 'auto' | 'capped' | 'fixed';
+      max_lag: number | null;
+      window: number | null;
+      observations: number;
+      cached: boolean;
+    };
   };
   forecast30: {
     dates: string[];
@@ -75,6 +85,11 @@ function toIsoDate(date: string) {
   return date.slice(0, 10);
 }
 
+// "fast" skips the LSTM (its predictions come back as nulls), "balanced" skips only its walk-forward folds.
+function parseTier(value: unknown): AnalysisTier {
+  return value === "fast" || value === "balanced" ? value : "full";
+}
+
 function clampInt(value: number, min: number, max: number) {
   if (!Number.isFinite(value)) return min;
   return Math.max(min, Math.min(max, Math.trunc(value)));
@@ -457,6 +472,7 @@ export async function POST(req: Request) {
         epochs: Number(body.params?.epochs || 30),
         batch_size: Number(body.params?.batch_size || 32),
         forecast_block: clampInt(Number(body.params?.forecast_block || 5), 1, 5),
+        tier: parseTier(body.params?.tier),
       };
 
       const startDate = (body.params?.start_date as string | undefined) || undefined;
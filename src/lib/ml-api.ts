@@ -27,6 +27,13 @@ export interface StationarityResult {
   adf: { test_statistic: number; p_value: number; is_stationary: boolean; interpretation: string };
   kpss: { test_statistic: number; p_value: number; is_stationary: boolean };
   stationarity_type: string;
+  mode?: {
+    lag: 'auto' | 'capped' | 'fixed';
+    max_lag: number | null;
+    window: number | null;
+    observations: number;
+    cached: boolean;
+  };
 }
 
 export interface FutureForecastResult {
@@ -44,6 +51,7 @@ type AnalysisParams = {
   lstm_units?: number[];
   epochs?: number;
   batch_size?: number;
+  tier?: 'fast' | 'balanced' | 'full';
 };
 
 async function callMlApi<T>(action: string, params?: Record<string, unknown>): Promise<T> {